@@ -0,0 +1,198 @@
+"""
+Headless batch solver: streams many instances through a pool of processes.
+
+Instances are read one by one from a file (or stdin with "-") as JSON lines:
+    {"id": "order-1",
+     "container": {"W": 2550, "H": 2700, "D": 13600, "Wgt": 30000},
+     "boxes": [{"w": 800, "h": 500, "d": 600, "wgt": 195, "id": 7, "count": 15}, ...]}
+("count" is optional, and so are the container "cogEnvelope": [xmin, xmax, ymin, ymax]
+the centre of gravity of the load is kept in, and "minSupport": the fraction of the base of
+each box that has to rest on the boxes below), or as CSV with one row per box and the rows of an
+instance next to each other:
+    instance,W,H,D,Wgt,w,h,d,wgt,id
+
+One JSON result line is written per instance as soon as it is solved, with the
+placements (box id, x, y, z, w, d, h), the boxes taken, the fill rate and the
+wall time (and with the ant colony, the rule that stopped it). At most 2 x workers instances are in memory at the same time.
+
+Examples:
+    python batch.py orders.jsonl -o plans.jsonl --solver greedy --workers 8
+    cat orders.csv | python batch.py - --format csv --solver aco --maxIter 10 --maxAnt 20
+"""
+
+import argparse, contextlib, csv, io, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOLVER_DIRS = {
+    "greedy": os.path.join(HERE, "greedy"),
+    "aco": os.path.join(HERE, "reinforcement_learning"),
+}
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    # Consecutive rows with the same instance column form one instance
+    record = None
+    for row in csv.DictReader(stream):
+        if record is None or row["instance"] != record["id"]:
+            if record is not None:
+                yield record
+            record = {
+                "id": row["instance"],
+                "container": {key: int(row[key]) for key in ("W", "H", "D", "Wgt")},
+                "boxes": [],
+            }
+        record["boxes"].append({key: int(row[key]) for key in ("w", "h", "d", "wgt", "id")})
+    if record is not None:
+        yield record
+
+
+def _init_worker(solver):
+    # The solver modules are then imported by the first solve of each worker,
+    # the modules shared by both solvers (common/) from the parent directory
+    sys.path.insert(0, SOLVER_DIRS[solver])
+    if HERE not in sys.path:
+        sys.path.append(HERE)
+
+
+def create_instance(ds, record):
+    w, h, d, wgt, ids = [], [], [], [], []
+    for box in record["boxes"]:
+        for _ in range(box.get("count", 1)):
+            w.append(box["w"]); h.append(box["h"]); d.append(box["d"])
+            wgt.append(box["wgt"]); ids.append(box["id"])
+    container = record["container"]
+    envelope = container.get("cogEnvelope")
+    return ds.Instance(len(w), w, h, d, wgt, ids,
+                       container["W"], container["H"], container["D"], container["Wgt"],
+                       cogEnvelope=tuple(envelope) if envelope is not None else None,
+                       minSupport=record.get("minSupport", 0.0))
+
+
+def solve(solver, options, index, record):
+    """
+    Solves one instance record in a worker and returns its result record.
+    """
+    result = {"index": index, "id": record.get("id", index), "solver": solver}
+    try:
+        import data_structures as ds
+        instance = create_instance(ds, record)
+        t = time.time()
+        # The solvers report their progress on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            if solver == "greedy" and options["multiStart"]:
+                from greedy import greedy_multi_start, greedy_order, local_search, multi_start_variants, PLACEMENTS
+                # --placement restricts the variants to that engine
+                placements = PLACEMENTS if options["placement"] is None else (options["placement"],)
+                solution, variant, _ = greedy_multi_start(instance, multi_start_variants(placements=placements))
+                result["variant"] = variant
+                if options["localSearch"] is not None:
+                    order = greedy_order(instance, variant["sort"], variant["seed"])
+                    solution = local_search(instance, order, options["localSearch"], placement=variant["placement"],
+                                            rotation=variant["rotation"], cornerOrder=variant["cornerOrder"])[0]
+                boxList = solution.boxList
+                placements = [[box.id, box.x, box.y, box.z, box.w, box.d, box.h] for box in boxList]
+            elif solver == "greedy":
+                from greedy import greedy
+                boxList = greedy(instance, placement=options["placement"] or "corners",
+                                 localSearch=options["localSearch"]).boxList
+                placements = [[box.id, box.x, box.y, box.z, box.w, box.d, box.h] for box in boxList]
+            else:
+                from ACO import ant_colony
+                seed = None if options["seed"] is None else options["seed"] + index
+                solved = ant_colony(instance, options["maxIter"], options["maxAnt"], options["rE"], options["rD"],
+                                    seed=seed, placement=options["placement"] or "corners", timeBudget=options["timeBudget"],
+                                    patience=options["patience"], cacheSize=options["cacheSize"],
+                                    localSearch=options["localSearch"], report=True)
+                boxList = solved[0]
+                result["stop"] = solved[-1]["stop"]
+                if "cache" in solved[-1]:
+                    result["cache"] = solved[-1]["cache"]
+                placements = [[box.get_id(), box.get_x(), box.get_y(), box.get_z(),
+                               box.get_w(), box.get_d(), box.get_h()] for box in boxList]
+        wall_time = time.time() - t
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+        return result
+
+    container = record["container"]
+    volume = sum(w * d * h for _, _, _, _, w, d, h in placements)
+    result.update({
+        "n_boxes": instance.n if solver == "greedy" else instance.get_n(),
+        "boxes_taken": len(placements),
+        "fill_rate": volume / (container["W"] * container["H"] * container["D"]),
+        "wall_time": wall_time,
+        "placements": [[int(value) for value in placement] for placement in placements],
+    })
+    return result
+
+
+def run(records, output, solver, workers, options):
+    """
+    Solves the records on `workers` processes and writes each result as soon
+    as it is ready. Only 2 x workers records are submitted at any time.
+    """
+    window = 2 * workers
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(solver,)) as pool:
+        pending = set()
+        for index, record in enumerate(records):
+            pending.add(pool.submit(solve, solver, options, index, record))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    output.write(json.dumps(future.result()) + "\n")
+                output.flush()
+        for future in as_completed(pending):
+            output.write(json.dumps(future.result()) + "\n")
+        output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a stream of loading instances without any display.")
+    parser.add_argument("input", help="instance file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="result file (JSON lines), or - for stdout")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None,
+                        help="input format (guessed from the file extension by default)")
+    parser.add_argument("--solver", choices=tuple(SOLVER_DIRS), default="greedy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--maxIter", type=int, default=10)
+    parser.add_argument("--maxAnt", type=int, default=10)
+    parser.add_argument("--rE", type=float, default=0.8)
+    parser.add_argument("--rD", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=None, help="seed of the ant colony (instance i uses seed + i)")
+    parser.add_argument("--timeBudget", type=float, default=None,
+                        help="seconds the ant colony may spend on each instance (best plan so far when it runs out)")
+    parser.add_argument("--patience", type=int, default=None,
+                        help="iterations without improvement after which the ant colony stops")
+    parser.add_argument("--placement", choices=("corners", "extreme_points"), default=None,
+                        help="placement engine: corners of the height map (default), or extreme points of the "
+                             "placed boxes; with --multiStart, the only engine of the variants (all of them by default)")
+    parser.add_argument("--cacheSize", type=int, default=0,
+                        help="partial solutions the ant colony keeps to resume its ants from (0: none)")
+    parser.add_argument("--localSearch", type=float, default=None,
+                        help="seconds of local search improving the loading of either solver")
+    parser.add_argument("--multiStart", action="store_true",
+                        help="greedy: keep the best of the variants of greedy_multi_start (sort orders, engines, rotation rules, corner orders, perturbations)")
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    options = {"maxIter": args.maxIter, "maxAnt": args.maxAnt, "rE": args.rE, "rD": args.rD, "seed": args.seed,
+               "placement": args.placement, "timeBudget": args.timeBudget, "patience": args.patience,
+               "cacheSize": args.cacheSize, "localSearch": args.localSearch,
+               "multiStart": args.multiStart}
+
+    with contextlib.ExitStack() as stack:
+        source = sys.stdin if args.input == "-" else stack.enter_context(open(args.input, newline=""))
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        records = read_csv(source) if input_format == "csv" else read_jsonl(source)
+        run(records, output, args.solver, args.workers, options)
+
+
+if __name__ == "__main__":
+    main()
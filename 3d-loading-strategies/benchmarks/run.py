@@ -0,0 +1,280 @@
+"""
+Performance benchmark of the solvers on instances of growing size.
+
+Cases (for each --scales factor k, every dimension is multiplied by k):
+    example        Instance.init_example
+    random-<n>     create_random_instance(n, seed) of the solver's main.py, with
+                   a container deep enough for about n boxes
+
+Phases (each run --repeat times on a fresh solver state):
+    greedy         greedy(instance)                                  (greedy)
+    ant_colony     ant_colony(instance, maxIter, maxAnt, rE, rD, seed) (aco)
+    add_box        Solution.add_box of the placed boxes, in order
+    computeCorner  Solution.computeCorner at every corner point of the solution
+
+Each case runs with every --placements engine of the Solution ("corners" of the
+height map, "extreme_points" of the placed boxes, which has no computeCorner
+phase). For each phase the result records the times, the peak memory
+(tracemalloc, measured in a separate run), the boxes placed, the boxes placed
+per second and the fill rate of the container.
+The solvers are benchmarked in separate processes (their modules have the
+same names) and the results are written as JSON:
+
+    python benchmarks/run.py -o bench.json
+    python benchmarks/run.py --solver greedy --sizes 50 100 --compare bench.json
+    python benchmarks/run.py --placements corners extreme_points --scales 1 4
+"""
+
+import argparse, contextlib, io, itertools, json, os, platform, statistics, subprocess, sys, tempfile, time, tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SOLVER_DIRS = {
+    "greedy": os.path.join(ROOT, "greedy"),
+    "aco": os.path.join(ROOT, "reinforcement_learning"),
+}
+PHASES = {
+    "greedy": ("greedy", "add_box", "computeCorner"),
+    "aco": ("ant_colony", "add_box", "computeCorner"),
+}
+
+
+class Api:
+    """ Same operations on the greedy (Python) and the aco (Cython) data structures """
+    def __init__(self, solver):
+        sys.path.insert(0, SOLVER_DIRS[solver])
+        if ROOT not in sys.path:
+            sys.path.append(ROOT)
+        import data_structures as ds
+        import main
+        self.solver = solver
+        self.ds = ds
+        self.create_random_instance = main.create_random_instance
+
+    def instance(self, boxes, container):
+        w, h, d, wgt, ids = (list(values) for values in zip(*boxes)) if boxes else ([], [], [], [], [])
+        return self.ds.Instance(len(boxes), w, h, d, wgt, ids, *container)
+
+    def boxes(self, instance):
+        if self.solver == "greedy":
+            return [(box.w, box.h, box.d, box.wgt, box.id) for box in instance.boxList]
+        return [(box.get_w(), box.get_h(), box.get_d(), box.get_wgt(), box.get_id()) for box in instance.get_boxList()]
+
+    def container(self, instance):
+        if self.solver == "greedy":
+            container = instance.container
+            return [container.W, container.H, container.D, container.Wgt]
+        container = instance.get_container()
+        return [container.get_W(), container.get_H(), container.get_D(), container.get_Wgt()]
+
+    def example(self):
+        if self.solver == "greedy":
+            return self.ds.Instance.init_example()
+        return self.ds.Instance.init_example(self.ds.Instance)
+
+    def new_solution(self, instance, placement):
+        if self.solver == "greedy":
+            return self.ds.Solution(instance, placement=placement)
+        return self.ds.Solution(instance.get_n(), instance.get_container(), placement=placement)
+
+    def solve(self, instance, options):
+        """ Placed boxes of the solver phase """
+        if self.solver == "greedy":
+            from greedy import greedy
+            return greedy(instance, placement=options["placement"]).boxList
+        from ACO import ant_colony
+        return ant_colony(instance, options["maxIter"], options["maxAnt"],
+                          options["rE"], options["rD"], seed=options["seed"], placement=options["placement"])[0]
+
+    def volume(self, boxes):
+        if self.solver == "greedy":
+            return sum(box.w * box.d * box.h for box in boxes)
+        return sum(box.get_w() * box.get_d() * box.get_h() for box in boxes)
+
+    def corner_points(self, solution):
+        if self.solver == "greedy":
+            return [(x, y) for y in solution.coordonateYList for x in solution.coordonateXList
+                    if x < solution.container.W and y < solution.container.D]
+        container = solution.get_container()
+        return [(x, y) for x, y in solution.get_coordonateCornerList()
+                if x < container.get_W() and y < container.get_D()]
+
+
+def cases(api, sizes, scales, seed):
+    """ (name, boxes, container) of every benchmark case """
+    base = [("example", api.example())]
+    for n in sizes:
+        instance = api.create_random_instance(n, seed)
+        W, H, D, Wgt = api.container(instance)
+        # About 40 random boxes fill the default container
+        base.append((f"random-{n}", api.instance(api.boxes(instance), [W, H, D * max(1, -(-n // 40)), Wgt * max(1, -(-n // 40))])))
+
+    for name, instance in base:
+        boxes = api.boxes(instance)
+        W, H, D, Wgt = api.container(instance)
+        for k in scales:
+            scaled = [(w * k, h * k, d * k, wgt, id) for w, h, d, wgt, id in boxes]
+            yield (name if k == 1 else f"{name}-x{k}"), scaled, [W * k, H * k, D * k, Wgt]
+
+
+def run_phase(api, phase, boxes, container, options):
+    """ Runs a phase once on a fresh state and returns the number of boxes it placed """
+    instance = api.instance(boxes, container)
+    if phase in ("greedy", "ant_colony"):
+        return len(api.solve(instance, options))
+
+    placed = options["placed"]
+    if phase == "add_box":
+        solution = api.new_solution(instance, options["placement"])
+        for box in placed:
+            solution.add_box(box)
+        return len(placed)
+
+    # computeCorner on the points of the solved state
+    solution = options["solved"]
+    for x, y in options["points"]:
+        solution.computeCorner(x, y)
+    return len(placed)
+
+
+def timed(api, phase, boxes, container, options):
+    t = time.perf_counter()
+    run_phase(api, phase, boxes, container, options)
+    return time.perf_counter() - t
+
+
+def benchmark_solver(solver, args):
+    api = Api(solver)
+    options = {"maxIter": args.maxIter, "maxAnt": args.maxAnt, "rE": args.rE, "rD": args.rD, "seed": args.seed}
+    results = []
+
+    # The solvers report their progress on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        for (name, boxes, container), placement in itertools.product(cases(api, args.sizes, args.scales, args.seed),
+                                                                     args.placements):
+            # Placements replayed by the add_box and computeCorner phases
+            options["placement"] = placement
+            placed = api.solve(api.instance(boxes, container), options)
+            solved = api.new_solution(api.instance(boxes, container), placement)
+            for box in placed:
+                solved.add_box(box)
+            options.update(placed=placed, solved=solved, points=api.corner_points(solved))
+            fill = api.volume(placed) / (container[0] * container[1] * container[2])
+
+            for phase in PHASES[solver]:
+                if phase == "computeCorner" and placement != "corners":
+                    continue
+                times = [timed(api, phase, boxes, container, options) for _ in range(args.repeat)]
+
+                tracemalloc.start()
+                count = run_phase(api, phase, boxes, container, options)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                median = statistics.median(times)
+                results.append({
+                    "solver": solver,
+                    "case": name,
+                    "placement": placement,
+                    "n_boxes": len(boxes),
+                    "container": container[:3],
+                    "phase": phase,
+                    "calls": len(options["points"]) if phase == "computeCorner" else len(placed) if phase == "add_box" else 1,
+                    "times": times,
+                    "min": min(times),
+                    "median": median,
+                    "peak_memory": peak,
+                    "boxes_placed": count,
+                    "boxes_per_s": count / median if median > 0 else None,
+                    "fill_rate": fill,
+                })
+            print(f"{solver:7s} {name:18s} {placement:14s} {len(boxes):5d} boxes  fill {fill:.3f}  "
+                  + "  ".join(f"{r['phase']} {r['median']:.4f}s" for r in results
+                              if r["case"] == name and r["placement"] == placement),
+                  file=sys.stderr)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Prints the phases slower than the baseline by more than threshold, returns their number """
+    previous = {(r["solver"], r["case"], r.get("placement", "corners"), r["phase"]): r["median"]
+                for r in baseline["results"]}
+    slower = 0
+    for r in results:
+        key = (r["solver"], r["case"], r["placement"], r["phase"])
+        if key in previous and previous[key] > 0:
+            ratio = r["median"] / previous[key]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                slower += 1
+            print(f"{' '.join(key):45s} {previous[key]:.4f}s -> {r['median']:.4f}s  x{ratio:.2f}{flag}")
+    return slower
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the greedy and aco solvers.")
+    parser.add_argument("-o", "--output", default="-", help="result file (JSON), or - for stdout")
+    parser.add_argument("--solver", choices=("all",) + tuple(SOLVER_DIRS), default="all")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200], help="box counts of the random cases")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2], help="dimension factors of every case")
+    parser.add_argument("--placements", nargs="+", choices=("corners", "extreme_points"), default=["corners"],
+                        help="placement engines of the Solution to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--maxIter", type=int, default=3)
+    parser.add_argument("--maxAnt", type=int, default=5)
+    parser.add_argument("--rE", type=float, default=0.8)
+    parser.add_argument("--rD", type=float, default=1.2)
+    parser.add_argument("--compare", default=None, help="previous result file to compare the medians with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown reported as a regression")
+    parser.add_argument("--part", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.part is not None:
+        # Child process of one solver
+        with open(args.part, "w") as part:
+            json.dump(benchmark_solver(args.solver, args), part)
+        return 0
+
+    results = []
+    forwarded = list(argv if argv is not None else sys.argv[1:])
+    for solver in (SOLVER_DIRS if args.solver == "all" else (args.solver,)):
+        with tempfile.TemporaryDirectory() as tmp:
+            part = os.path.join(tmp, "part.json")
+            command = [sys.executable, os.path.abspath(__file__), *forwarded, "--solver", solver, "--part", part]
+            subprocess.run(command, check=True, env=dict(os.environ, MPLBACKEND="Agg"))
+            with open(part) as f:
+                results.extend(json.load(f))
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "part")},
+        },
+        "results": results,
+    }
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        json.dump(report, output, indent=1)
+        output.write("\n")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            return 1 if compare(results, json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Serialization benchmark: the binary archives of common/serialization.py against
+pickle, on a list of solutions of random instances.
+
+For each solver, a fresh interpreter builds the solutions (boxes placed in a
+random order) and times, for pickle and for the archive,
+    size           bytes written
+    dump           writing the list to a file
+    open           opening the file (unpickling it, or mapping the archive)
+    first          opening it and getting the first solution back
+    all            opening it and getting every solution back
+and checks that every solution comes back with the same boxes. Results are
+written as JSON:
+
+    python benchmarks/serialization.py -o serialization.json
+"""
+
+import argparse, contextlib, json, os, platform, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SOLVER_DIRS = {
+    "greedy": os.path.join(ROOT, "greedy"),
+    "aco": os.path.join(ROOT, "reinforcement_learning"),
+}
+
+# Run in the fresh interpreter, prints its timings as JSON
+PROBE = """
+import json, os, pickle, random, sys, time
+sys.path.insert(0, sys.argv[1])
+sys.path.append(os.path.dirname(sys.argv[1]))
+solver, plans, boxes, repeat, directory = sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]), sys.argv[6]
+import data_structures as ds
+from common import serialization
+from main import create_random_instance
+if solver == "greedy":
+    from greedy import replay
+    new_solution = lambda instance: ds.Solution(instance)
+    boxes_of = lambda solution: [(b.x, b.y, b.z, b.w, b.d, b.h, b.id) for b in solution.boxList]
+else:
+    from ACO import replay
+    new_solution = lambda instance: ds.Solution(instance.get_n(), instance.get_container(),
+                                                step=instance.get_resolution(), minSupport=instance.get_minSupport())
+    boxes_of = lambda solution: [(b.get_x(), b.get_y(), b.get_z(), b.get_w(), b.get_d(), b.get_h(), b.get_id())
+                                 for b in solution.get_boxList()]
+
+solutions = []
+for seed in range(plans):
+    instance = create_random_instance(boxes, seed)
+    order = list(range(boxes))
+    random.Random(seed).shuffle(order)
+    solution = new_solution(instance)
+    replay(instance, order, solution)
+    solutions.append(solution)
+
+def best(f):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - t)
+    return min(times), result
+
+def dump_pickle(path):
+    with open(path, "wb") as f:
+        pickle.dump(solutions, f, pickle.HIGHEST_PROTOCOL)
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+paths = {"pickle": os.path.join(directory, "plans.pickle"), "archive": os.path.join(directory, "plans.npy")}
+formats = {
+    "pickle": (dump_pickle, load_pickle, lambda p: load_pickle(p)[0], load_pickle),
+    "archive": (lambda p: serialization.save(p, solutions), lambda p: serialization.load(p, ds),
+                lambda p: serialization.load(p, ds).solution(0), lambda p: list(serialization.load(p, ds))),
+}
+results = {}
+for name, (dump, open_, first, everything) in formats.items():
+    path = paths[name]
+    result = {"dump": best(lambda: dump(path))[0], "size": os.path.getsize(path)}
+    result["open"] = best(lambda: open_(path))[0]
+    result["first"] = best(lambda: first(path))[0]
+    result["all"], back = best(lambda: everything(path))
+    result["exact"] = [boxes_of(s) for s in back] == [boxes_of(s) for s in solutions]
+    results[name] = result
+print(json.dumps(results))
+"""
+
+
+def probe(solver, plans, boxes, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run([sys.executable, "-c", PROBE, SOLVER_DIRS[solver], solver, str(plans), str(boxes),
+                                 str(repeat), directory], check=True, capture_output=True, text=True,
+                                cwd=SOLVER_DIRS[solver], env=dict(os.environ, MPLBACKEND="Agg")).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the binary archives against pickle.")
+    parser.add_argument("-o", "--output", default="-", help="result file (JSON), or - for stdout")
+    parser.add_argument("--solver", choices=("all",) + tuple(SOLVER_DIRS), default="all")
+    parser.add_argument("--plans", type=int, default=200, help="solutions in the file")
+    parser.add_argument("--boxes", type=int, default=50, help="boxes of each instance")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measure (the best is kept)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for solver in (SOLVER_DIRS if args.solver == "all" else (args.solver,)):
+        for name, result in probe(solver, args.plans, args.boxes, args.repeat).items():
+            results.append({"solver": solver, "format": name, **result})
+            print(f"{solver:7s} {name:8s} {result['size']:>10d} B  dump {result['dump']:.4f}s  "
+                  f"open {result['open']:.4f}s  first {result['first']:.4f}s  all {result['all']:.4f}s  "
+                  f"exact: {result['exact']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "plans": args.plans,
+            "boxes": args.boxes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        json.dump(report, output, indent=1)
+        output.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Startup benchmark: time to import a solver and build its first Solution in a
+fresh headless process, as a batch or pool worker does.
+
+Each sample runs a new interpreter that times
+    import         import of data_structures and of the solver module
+    solution       construction of a Solution of Instance.init_example
+and reports whether matplotlib was loaded on the way. The import time of
+matplotlib.pyplot (which the solver no longer pays) is measured the same way
+for reference. Results are written as JSON:
+
+    python benchmarks/startup.py -o startup.json
+"""
+
+import argparse, contextlib, json, os, platform, statistics, subprocess, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SOLVER_DIRS = {
+    "greedy": os.path.join(ROOT, "greedy"),
+    "aco": os.path.join(ROOT, "reinforcement_learning"),
+}
+
+# Run in the fresh interpreter, prints its timings as JSON
+PROBE = """
+import contextlib, io, json, os, sys, time
+sys.path.insert(0, sys.argv[1])
+sys.path.append(os.path.dirname(sys.argv[1]))
+t = time.perf_counter()
+import data_structures as ds
+if sys.argv[2] == "greedy":
+    import greedy
+else:
+    import ACO
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if sys.argv[2] == "greedy":
+        ds.Solution(ds.Instance.init_example())
+    else:
+        instance = ds.Instance.init_example(ds.Instance)
+        ds.Solution(instance.get_n(), instance.get_container())
+built = time.perf_counter()
+print(json.dumps({"import": imported - t, "solution": built - imported,
+                  "matplotlib": "matplotlib" in sys.modules}))
+"""
+
+PYPLOT_PROBE = """
+import json, time
+t = time.perf_counter()
+import matplotlib.pyplot
+print(json.dumps({"import": time.perf_counter() - t}))
+"""
+
+
+def probe(code, *args):
+    output = subprocess.run([sys.executable, "-c", code, *args], check=True, capture_output=True, text=True,
+                            env=dict(os.environ, MPLBACKEND="Agg")).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summary(times):
+    return {"times": times, "min": min(times), "median": statistics.median(times)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the headless startup of the solvers.")
+    parser.add_argument("-o", "--output", default="-", help="result file (JSON), or - for stdout")
+    parser.add_argument("--solver", choices=("all",) + tuple(SOLVER_DIRS), default="all")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per measure")
+    args = parser.parse_args(argv)
+
+    results = []
+    for solver in (SOLVER_DIRS if args.solver == "all" else (args.solver,)):
+        samples = [probe(PROBE, SOLVER_DIRS[solver], solver) for _ in range(args.repeat)]
+        for phase in ("import", "solution"):
+            results.append({"solver": solver, "phase": phase, **summary([s[phase] for s in samples]),
+                            "matplotlib_loaded": any(s["matplotlib"] for s in samples)})
+        print(f"{solver:7s} import {results[-2]['median']:.4f}s  solution {results[-1]['median']:.4f}s  "
+              f"matplotlib loaded: {results[-1]['matplotlib_loaded']}", file=sys.stderr)
+
+    try:
+        pyplot = summary([probe(PYPLOT_PROBE)["import"] for _ in range(args.repeat)])
+        print(f"import matplotlib.pyplot {pyplot['median']:.4f}s", file=sys.stderr)
+    except subprocess.CalledProcessError:
+        pyplot = None
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "pyplot_import": pyplot,
+    }
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        json.dump(report, output, indent=1)
+        output.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
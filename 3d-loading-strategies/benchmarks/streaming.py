@@ -0,0 +1,93 @@
+"""
+Streaming benchmark: per-box latency of greedy.StreamLoader while a container
+fills up, boxes arriving one at a time.
+
+Random boxes (10 to 40 on each side, by steps of 10) are placed in a cube
+container of side --side until --boxes have arrived, with each --placements
+engine of the Solution and each --timeLimits per-box cap ("none" for no cap).
+The latencies are cut in --slices slices in arrival order, and each slice
+reports its p50, p90, p99 and max, so a latency that grows as the container
+fills shows up as a trend across the slices. Results are written as JSON:
+
+    python benchmarks/streaming.py -o streaming.json
+    python benchmarks/streaming.py --placements corners --timeLimits none 0.0002
+"""
+
+import argparse, contextlib, json, os, platform, sys, time
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "greedy"))
+
+from data_structures import Box, Container, PLACEMENTS, Stats
+from greedy import StreamLoader
+
+PERCENTILES = (50, 90, 99)
+
+
+def random_boxes(n, seed):
+    rng = np.random.RandomState(seed)
+    w, d, h = (10 * rng.randint(1, 5, (3, n))).tolist()
+    return [Box(0, 0, 0, w[i], h[i], d[i], 1, 1) for i in range(n)]
+
+
+def run(placement, timeLimit, args):
+    stats = Stats()
+    loader = StreamLoader(Container(args.side, args.side, args.side, 10**9), 10, placement=placement,
+                          timeLimit=timeLimit, stats=stats)
+    taken = loader.feed(random_boxes(args.boxes, args.seed))
+    slices = []
+    for k, latencies in enumerate(np.array_split(np.array(loader.latencies), args.slices)):
+        values = np.percentile(latencies, PERCENTILES)
+        slices.append({"slice": k, **{f"p{q}": float(v) for q, v in zip(PERCENTILES, values)},
+                       "max": float(latencies.max())})
+    return {
+        "placement": placement,
+        "timeLimit": timeLimit,
+        "placed": sum(taken),
+        "timed_out": stats.counters.get("timed out placements", 0),
+        "latency": loader.latency(PERCENTILES),
+        "slices": slices,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the per-box latency of the streaming loader.")
+    parser.add_argument("-o", "--output", default="-", help="result file (JSON), or - for stdout")
+    parser.add_argument("--placements", nargs="+", choices=PLACEMENTS, default=list(PLACEMENTS))
+    parser.add_argument("--timeLimits", nargs="+", default=["none"], help="per-box caps in seconds, or none")
+    parser.add_argument("--boxes", type=int, default=1000, help="boxes arriving")
+    parser.add_argument("--side", type=int, default=300, help="side of the container")
+    parser.add_argument("--slices", type=int, default=10, help="slices of the arrivals")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = []
+    for placement in args.placements:
+        for timeLimit in args.timeLimits:
+            result = run(placement, None if timeLimit == "none" else float(timeLimit), args)
+            results.append(result)
+            trend = " ".join(f"{s['p99'] * 1e3:.3f}" for s in result["slices"])
+            print(f"{placement:14s} cap {timeLimit:>8s}  placed {result['placed']:5d}  "
+                  f"timed out {result['timed_out']:5d}  p99 by slice (ms): {trend}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "boxes": args.boxes,
+            "side": args.side,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        json.dump(report, output, indent=1)
+        output.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""
+Modules shared by the greedy solver and the ant colony.
+
+The solvers run from their own directory: the modules they start from
+(greedy/data_structures.py and reinforcement_learning/ACO.py) put
+the parent of this package on sys.path. The C placement kernel is built in
+place with
+    python setup.py build_ext --inplace
+from that parent directory.
+"""
@@ -0,0 +1,171 @@
+"""
+Extreme point placement (Crainic, Perboli and Tadei, 2008).
+
+The free positions of the container are the 3D points obtained by projecting
+three corners of every placed box onto the boxes (or the walls) behind,
+beside and under them. Each point keeps its residual space: how far a box
+placed there can extend along x, y and z before it meets a placed box or a
+wall. Everything is computed from the placed boxes, so a placement costs
+O(boxes) whatever the container area, and the space under an overhang is
+still found.
+"""
+
+import copy, time
+import numpy as np
+
+class ExtremePoints:
+    """
+    Extreme points of a W x H x D container, with the interface of the
+    placement kernel: add_box, first_fit, corners, take_counters and copy.
+
+    A box fits at a point when it stays in the container, overlaps no placed
+    box and, above the floor, rests on the top of placed boxes (on at least
+    minSupport of its base). first_fit returns the first point in (y, x, z)
+    order a box fits at, as the corners of the height map are tried in
+    (y, x) order, or in (x, y, z) order with xFirst.
+    """
+    def __init__(self, W:int, H:int, D:int, minSupport:float = 0.0) -> None:
+        self.W = W
+        self.H = H
+        self.D = D
+        self.minSupport = minSupport
+        # Placed boxes as (x, y, z, w, d, h) rows, the first n of them in use
+        self.boxes = np.zeros((16, 6), dtype=np.int64)
+        self.n = 0
+        # Points as (x, y, z, residual w, d, h) rows, in (y, x, z) order
+        self.points = np.array([[0, 0, 0, W, D, H]], dtype=np.int64)
+        self.pointsEvaluated = 0
+        self.fitTests = 0
+
+    def copy(self) -> "ExtremePoints":
+        other = copy.copy(self)
+        other.boxes = self.boxes.copy()
+        other.points = self.points.copy()
+        return other
+
+    def nbytes(self) -> int:
+        return self.boxes.nbytes + self.points.nbytes
+
+    def bounds(self):
+        # Low and high corners of the placed boxes
+        placed = self.boxes[:self.n]
+        return placed[:, :3], placed[:, :3] + placed[:, 3:]
+
+    def add_box(self, x:int, y:int, z:int, w:int, d:int, h:int, wgt:int = 0) -> None:
+        if self.n == len(self.boxes):
+            self.boxes = np.concatenate((self.boxes, np.zeros_like(self.boxes)))
+        self.boxes[self.n] = (x, y, z, w, d, h)
+        self.n += 1
+        lo = np.array((x, y, z))
+        hi = lo + (w, d, h)
+
+        # The points the box covers are taken, it blocks the ones behind it
+        points = self.points[~np.all((lo <= self.points[:, :3]) & (self.points[:, :3] < hi), axis=1)]
+        self.limit(points, lo, hi)
+
+        # Corners of the box at the right, at the back and on top of it, each
+        # projected along the two other axes
+        new = np.unique([self.project((x + w, y, z), 1), self.project((x + w, y, z), 2),
+                         self.project((x, y + d, z), 0), self.project((x, y + d, z), 2),
+                         self.project((x, y, z + h), 0), self.project((x, y, z + h), 1)], axis=0)
+        new = new[np.all(new < (self.W, self.D, self.H), axis=1)]
+        known = np.all(new[:, None] == points[None, :, :3], axis=2).any(axis=1)
+        new = new[~known & ~self.covered(new)]
+        self.pointsEvaluated += len(new)
+
+        points = np.concatenate((points, np.hstack((new, self.residual(new)))))
+        self.points = points[np.lexsort((points[:, 2], points[:, 0], points[:, 1]))]
+
+    def project(self, point:tuple, axis:int) -> np.ndarray:
+        # The point moved along -axis onto the first placed box (or wall) it meets
+        lo, hi = self.bounds()
+        p = np.array(point)
+        others = [a for a in range(3) if a != axis]
+        behind = np.all((lo[:, others] <= p[others]) & (p[others] < hi[:, others]), axis=1) & (hi[:, axis] <= p[axis])
+        p[axis] = hi[behind, axis].max() if behind.any() else 0
+        return p
+
+    def covered(self, points:np.ndarray) -> np.ndarray:
+        # Whether each point is inside a placed box
+        lo, hi = self.bounds()
+        return np.all((lo[None] <= points[:, None]) & (points[:, None] < hi[None]), axis=2).any(axis=1)
+
+    def residual(self, points:np.ndarray) -> np.ndarray:
+        """ (n, 3) space from each point to the first placed box (or wall) along x, y and z """
+        lo, hi = self.bounds()
+        space = np.array((self.W, self.D, self.H)) - points
+        within = (lo[None] <= points[:, None]) & (points[:, None] < hi[None])
+        for axis in range(3):
+            others = [a for a in range(3) if a != axis]
+            front = within[:, :, others].all(axis=2) & (points[:, None, axis] <= lo[None, :, axis])
+            gaps = np.where(front, lo[None, :, axis] - points[:, None, axis], space[:, axis, None])
+            space[:, axis] = gaps.min(axis=1, initial=np.iinfo(np.int64).max)
+        return space
+
+    def limit(self, points:np.ndarray, lo:np.ndarray, hi:np.ndarray) -> None:
+        # Residual space of the points cut by a new box in front of them
+        p = points[:, :3]
+        within = (lo <= p) & (p < hi)
+        for axis in range(3):
+            others = [a for a in range(3) if a != axis]
+            front = within[:, others].all(axis=1) & (p[:, axis] <= lo[axis])
+            points[front, 3 + axis] = np.minimum(points[front, 3 + axis], lo[axis] - p[front, axis])
+
+    def fits(self, x:int, y:int, z:int, w:int, d:int, h:int) -> bool:
+        """
+        Whether a w x d x h box at (x, y, z) stays in the container, overlaps
+        no placed box and, above the floor, rests on the top of placed boxes
+        (on at least minSupport of its base).
+        """
+        self.fitTests += 1
+        if x < 0 or y < 0 or z < 0 or x + w > self.W or y + d > self.D or z + h > self.H:
+            return False
+        lo, hi = self.bounds()
+        if np.all((lo < (x + w, y + d, z + h)) & (hi > (x, y, z)), axis=1).any():
+            return False
+        if z == 0:
+            return True
+        below = hi[:, 2] == z
+        overlapX = np.minimum(hi[below, 0], x + w) - np.maximum(lo[below, 0], x)
+        overlapY = np.minimum(hi[below, 1], y + d) - np.maximum(lo[below, 1], y)
+        area = (np.clip(overlapX, 0, None) * np.clip(overlapY, 0, None)).sum()
+        return area > 0 and area >= self.minSupport * w * d
+
+    def first_fit(self, w:int, d:int, h:int, rotation:bool = False, deadline:float = None,
+                  xFirst:bool = False):
+        """
+        (x, y, z, residual w, d, h) of the first point a w x d x h box fits
+        at, or None. With `rotation`, the box may also be turned so that its
+        w goes along y. Past `deadline` (a time.perf_counter() value), no
+        other point is tried and None is returned. The points are tried in
+        (y, x, z) order, or in (x, y, z) order with `xFirst`.
+        """
+        points = self.points
+        space = points[:, 3:]
+        straight = (space[:, 0] >= w) & (space[:, 1] >= d) & (space[:, 2] >= h)
+        turned = rotation & (space[:, 0] >= d) & (space[:, 1] >= w) & (space[:, 2] >= h)
+        candidates = np.flatnonzero(straight | turned)
+        if xFirst:
+            candidates = candidates[np.lexsort((points[candidates, 2], points[candidates, 1], points[candidates, 0]))]
+        for k in candidates:
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            x, y, z = points[k, :3]
+            if (straight[k] and self.fits(x, y, z, w, d, h)) or (turned[k] and self.fits(x, y, z, d, w, h)):
+                return tuple(int(value) for value in points[k])
+        return None
+
+    def corners(self) -> list:
+        """ (x, y, z, residual w, d, h) of the points, in (y, x, z) order """
+        return [tuple(int(value) for value in point) for point in self.points]
+
+    def check(self) -> None:
+        # Debug: compare the residual spaces with a full recompute
+        if not np.array_equal(self.points[:, 3:], self.residual(self.points[:, :3])):
+            raise RuntimeError(f"Incremental residual spaces differ from full recompute after {self.n} boxes")
+
+    def take_counters(self) -> tuple:
+        """ (points evaluated, fit tests, cells scanned) since the last call, as the kernel """
+        counters = (self.pointsEvaluated, self.fitTests, 0)
+        self.pointsEvaluated = self.fitTests = 0
+        return counters
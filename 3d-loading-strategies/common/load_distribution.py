@@ -0,0 +1,26 @@
+"""
+Weight distribution of a load on the container floor, shared by both solvers.
+"""
+
+import numpy as np
+
+def envelope_gap(envelope:tuple, x:float, y:float) -> float:
+    """ Squared distance from (x, y) to the (xmin, xmax, ymin, ymax) envelope """
+    dx = max(envelope[0] - x, 0, x - envelope[1])
+    dy = max(envelope[2] - y, 0, y - envelope[3])
+    return dx * dx + dy * dy
+
+def load_grid(boxes:np.ndarray, W:int, D:int, resolution:int):
+    """
+    (xs, ys, loads) of the boxes given as (n, 5) x, y, w, d, wgt rows on the
+    W x D floor cut in resolution x resolution cells, each box spreading its
+    weight evenly over its footprint.
+    """
+    xs = np.append(np.arange(0, W, resolution), W)
+    ys = np.append(np.arange(0, D, resolution), D)
+    x, y, w, d, wgt = boxes.T
+    # Length of each box footprint inside each column (row) of cells
+    overlapX = np.clip(np.minimum((x + w)[:, None], xs[1:]) - np.maximum(x[:, None], xs[:-1]), 0, None)
+    overlapY = np.clip(np.minimum((y + d)[:, None], ys[1:]) - np.maximum(y[:, None], ys[:-1]), 0, None)
+    density = np.divide(wgt, w * d, out=np.zeros_like(wgt), where=w * d > 0)
+    return xs, ys, (overlapY * density[:, None]).T @ overlapX
@@ -0,0 +1,150 @@
+"""
+Local search on the order the boxes are placed in, shared by both solvers.
+
+A solver gives its boxes, their ids and volumes, a factory of empty
+Solutions and its compute_position(box, solution), whose result is
+whether the box was taken (the first item when it returns a tuple).
+The solution only needs add_box, snapshot and restore.
+"""
+
+import copy, random, time
+
+# Moves of local_search on the order the boxes are placed in
+NEIGHBOURHOODS = ("retry", "reinsert", "swap")
+
+
+def taken(result) -> bool:
+    """ Whether compute_position took the box, from its result """
+    return result[0] if isinstance(result, tuple) else result
+
+
+def replay(boxes:list, order:list, solution, computePosition, states:list = None, maxRejected:int = None) -> list:
+    """
+    Places a copy of boxes[i] for each i of the order on the solution and
+    returns the results of computePosition. With `states`, the snapshot of
+    the solution after each box is appended to it. With maxRejected, returns
+    None as soon as more boxes are rejected.
+    """
+    results = []
+    rejected = 0
+    for i in order:
+        box = copy.copy(boxes[i])
+        result = computePosition(box, solution)
+        if taken(result):
+            solution.add_box(box)
+        else:
+            rejected += 1
+            if maxRejected is not None and rejected > maxRejected:
+                return None
+        results.append(result)
+        if states is not None:
+            states.append(solution.snapshot())
+    return results
+
+
+def local_search(boxes:list, ids:list, volumes:list, order:list, timeLimit:float, newSolution, computePosition,
+                 neighbourhoods:tuple = NEIGHBOURHOODS, seed:int = None, stats = None, start:tuple = None) -> tuple:
+    """
+    Improves the loading obtained by placing boxes[i] for each i of the order
+    on newSolution(), each with computePosition.
+
+    Parameters:
+     - ids, volumes: id and volume of each box
+     - timeLimit: seconds the search may take
+     - neighbourhoods: moves tried on the order, among NEIGHBOURHOODS:
+       "retry" a rejected box at an earlier position, "reinsert" any box at
+       another position, "swap" two boxes of different ids
+     - seed: seed of the order the moves are tried in
+     - stats: the Stats the moves are counted in (None: not instrumented)
+     - start: (solution, states, results) of the order already placed, the
+       snapshots of the solution after each of its first k boxes in states;
+       placed here when None
+
+    The moves of the first neighbourhood are tried in a random order, then
+    those of the next ones, and the first move that takes more boxes (or as
+    many, with more volume) is kept before starting again. A move only
+    places again the boxes after the first position it changes, from the
+    snapshot of the solution at that position, and is dropped as soon as it
+    rejects more boxes than the current order. The search ends when no move
+    improves the loading, or after timeLimit.
+
+    Returns (solution, order, results): the improved loading, its order and
+    the results of computePosition along it.
+    """
+    rng = random.Random(seed)
+    end = time.perf_counter() + timeLimit
+    if stats is not None:
+        begin = time.perf_counter()
+    order = list(order)
+    if start is None:
+        solution = newSolution()
+        states = [solution.snapshot()]
+        results = replay(boxes, order, solution, computePosition, states)
+    else:
+        solution, states, results = start
+        states, results = list(states), list(results)
+    score = lambda order, results: (sum(map(taken, results)),
+                                    sum(volumes[i] for i, result in zip(order, results) if taken(result)))
+    best = score(order, results)
+
+    # Nothing to improve once every box is taken
+    improved = best[0] < len(order)
+    while improved and time.perf_counter() < end:
+        improved = False
+        for neighbourhood in neighbourhoods:
+            moves = _moves(ids, order, results, neighbourhood)
+            rng.shuffle(moves)
+            for first, newOrder in (_apply(order, move, neighbourhood) for move in moves):
+                if time.perf_counter() >= end:
+                    break
+                if stats is not None:
+                    stats.count("local search moves")
+                    stats.count("local search suffix boxes", len(order) - first)
+                solution.restore(states[first])
+                takenBefore = sum(map(taken, results[:first]))
+                newResults = replay(boxes, newOrder[first:], solution, computePosition,
+                                    maxRejected=(len(order) - best[0]) - (first - takenBefore))
+                if newResults is None:
+                    continue
+                newScore = score(newOrder, results[:first] + newResults)
+                if newScore > best:
+                    # Snapshots of the new order after the first position it changes
+                    solution.restore(states[first])
+                    del states[first + 1:]
+                    results = results[:first] + replay(boxes, newOrder[first:], solution, computePosition, states)
+                    order, best = newOrder, newScore
+                    improved = True
+                    if stats is not None:
+                        stats.count("local search improvements")
+                    break
+            if improved:
+                break
+
+    solution.restore(states[-1])
+    if stats is not None:
+        stats.lap("local_search", begin)
+    return solution, order, results
+
+
+def _moves(ids:list, order:list, results:list, neighbourhood:str) -> list:
+    # (i, j) pairs of positions of the order
+    n = len(order)
+    if neighbourhood == "retry":
+        return [(i, j) for i in range(n) if not taken(results[i]) for j in range(i)]
+    if neighbourhood == "reinsert":
+        return [(i, j) for i in range(n) for j in range(n) if i != j]
+    if neighbourhood == "swap":
+        orderIds = [ids[i] for i in order]
+        return [(i, j) for i in range(n) for j in range(i + 1, n) if orderIds[i] != orderIds[j]]
+    raise ValueError(f"neighbourhood must be one of {NEIGHBOURHOODS}, not {neighbourhood!r}")
+
+
+def _apply(order:list, move:tuple, neighbourhood:str) -> tuple:
+    # First position the move changes, and the new order
+    i, j = move
+    newOrder = list(order)
+    if neighbourhood == "swap":
+        newOrder[i], newOrder[j] = newOrder[j], newOrder[i]
+    else:
+        newOrder.insert(j, newOrder.pop(i))
+    return min(i, j), newOrder
@@ -0,0 +1,105 @@
+cdef struct Corner_t:
+    int x, y, z, w, d, h
+
+cdef struct Slot:
+    # Corner of a corner point, with its right end and the last y it sampled
+    Corner_t corner
+    int right, reach
+    char valid, fresh
+
+cdef struct Support_t:
+    # Highest and lowest height under a footprint, and the footprint area at the highest
+    int zmax, zmin
+    double area
+
+cdef struct Grid:
+    # Coordinate-compressed map of the container floor: cell (i, j) covers
+    # [xs[j], xs[j+1]) x [ys[i], ys[i+1]), stored row-major
+    int W, D
+    int nx, ny
+    int capX, capY
+    int *xs
+    int *ys
+    int *cells
+    # End (exclusive) of the run of equal values starting at each cell,
+    # along x and along y (only with runs)
+    int *runX
+    int *runY
+    bint runs
+
+cdef class Kernel:
+    cdef int W, H, D
+    # Step of the corner scans, a divisor of every floor dimension
+    cdef int step
+    cdef bint grid, incremental
+    cdef Grid height
+
+    # Placed boxes (x, y, z, w, d, h, wgt), replayed to pickle the kernel
+    cdef int nBoxes, capBoxes
+    cdef int *boxes
+
+    # Slot mode: corner points in insertion order, one slot each
+    cdef int nPoints, capPoints
+    cdef int *px
+    cdef int *py
+
+    # Grid mode: coordinates in insertion order, and the sorted ones inside
+    # the container whose cross product holds the slots, in (y, x) order
+    cdef int nX, capXList, nY, capYList
+    cdef int *xList
+    cdef int *yList
+    cdef int nVX, capVX, nVY, capVY
+    cdef int *vx
+    cdef int *vy
+
+    cdef int nSlots, capSlots
+    cdef Slot *slots
+
+    # Segment tree of the maximum w, d and h of the slots
+    cdef int size
+    cdef bint rebuild
+    cdef int *maxW
+    cdef int *maxD
+    cdef int *maxH
+    # Grid mode, once a search in (x, y) order asked for it: the same tree
+    # over the slots in (x, y) order, slot r * nVX + c at leaf c * nVY + r
+    cdef bint xOrder
+    cdef int *colW
+    cdef int *colD
+    cdef int *colH
+
+    # Support index: 2D segment tree (rows of 2 x cells nodes) of the max,
+    # the min and the area at the max of the height map cells. A placement
+    # updates the nodes over its footprint; when it adds grid lines, the
+    # index is rebuilt on the next query
+    cdef double minSupport
+    cdef bint supportDirty
+    cdef int supRows, supCols
+    cdef int *supMax
+    cdef int *supMin
+    cdef double *supArea
+
+    cdef long long cellsScanned, fitTests, cornersEvaluated
+
+    cdef int reserve_slots(self, int need) noexcept nogil
+    cdef void slot_point(self, int k, int *x, int *y) noexcept nogil
+    cdef int add_point(self, int x, int y) noexcept nogil
+    cdef int add_column(self, int x) noexcept nogil
+    cdef int add_row(self, int y) noexcept nogil
+    cdef void set_leaf(self, int k) noexcept nogil
+    cdef void pull(self, int node) noexcept nogil
+    cdef int build_tree(self) noexcept nogil
+    cdef void update_leaf(self, int k) noexcept nogil
+    cdef void store_corner(self, int k) noexcept nogil
+    cdef object export(self, Grid *g)
+    cdef int place(self, int x, int y, int z, int w, int d, int h, int wgt) noexcept nogil
+    cdef int build_support(self) noexcept nogil
+    cdef void pull_support(self, int node, int a, int b) noexcept nogil
+    cdef void update_support(self, int i0, int i1, int j0, int j1) noexcept nogil
+    cdef void query_support(self, int i0, int i1, int j0, int j1, double scale, Support_t *acc) noexcept nogil
+    cdef Support_t footprint_support(self, int x, int y, int w, int d) noexcept nogil
+    cdef bint supported(self, int x, int y, int w, int d, int h, Support_t *s) noexcept nogil
+    cdef bint first_fit_corner(self, int w, int d, int h, bint rotation, Corner_t *corner,
+                               double timeLimit=*, bint xFirst=*) noexcept nogil
+    cdef Corner_t corner_at(self, int x, int y, int *reach) noexcept nogil
+    cdef int recompute_all(self) noexcept nogil
@@ -0,0 +1,1088 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+"""
+Placement kernel: the height map, the corners and the first-fit search of a
+Solution in C arrays, so that placing a box and finding the first corner a
+box fits in run without the GIL.
+
+Two corner layouts are supported:
+ - slot mode (the ant colony): the 4 corner points of every box, in the
+   order they were added; first_fit returns the first of them.
+ - grid mode (the greedy solver): every (x, y) of the box coordinates, in
+   (y, x) order.
+"""
+
+from libc.stdlib cimport malloc, realloc, free
+from libc.string cimport memcpy, memmove
+from posix.time cimport clock_gettime, timespec, CLOCK_MONOTONIC
+import numpy as np
+
+
+cdef int reserve(int **array, int *capacity, int need) noexcept nogil:
+    # Room for `need` ints in *array, -1 when out of memory
+    cdef int newCapacity = capacity[0] if capacity[0] > 0 else 8
+    cdef int *grown
+    if need <= capacity[0]:
+        return 0
+    while newCapacity < need:
+        newCapacity *= 2
+    grown = <int*>realloc(array[0], newCapacity * sizeof(int))
+    if grown == NULL:
+        return -1
+    array[0] = grown
+    capacity[0] = newCapacity
+    return 0
+
+cdef int copy_ints(int **target, const int *source, int n) noexcept nogil:
+    target[0] = <int*>malloc((n if n > 0 else 1) * sizeof(int))
+    if target[0] == NULL:
+        return -1
+    if n > 0:
+        memcpy(target[0], source, n * sizeof(int))
+    return 0
+
+cdef inline int bisect_left(const int *values, int n, int x) noexcept nogil:
+    cdef int lo = 0
+    cdef int hi = n
+    cdef int mid
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+cdef inline int bisect_right(const int *values, int lo, int n, int x) noexcept nogil:
+    cdef int hi = n
+    cdef int mid
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if x < values[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+cdef int insert_sorted(int **values, int *n, int *capacity, int x) noexcept nogil:
+    # Inserts x in the sorted array and returns its rank, -1 when out of memory
+    cdef int k = bisect_left(values[0], n[0], x)
+    if reserve(values, capacity, n[0] + 1):
+        return -1
+    memmove(values[0] + k + 1, values[0] + k, (n[0] - k) * sizeof(int))
+    values[0][k] = x
+    n[0] += 1
+    return k
+
+cdef bint contains(const int *values, int n, int x) noexcept nogil:
+    cdef int k
+    for k in range(n):
+        if values[k] == x:
+            return True
+    return False
+
+
+# Height map
+
+cdef int grid_init(Grid *g, int W, int D, bint runs) noexcept nogil:
+    g.W = W
+    g.D = D
+    g.runs = runs
+    g.nx = g.ny = 2
+    g.capX = g.capY = 0
+    g.xs = g.ys = g.cells = g.runX = g.runY = NULL
+    if reserve(&g.xs, &g.capX, 2) or reserve(&g.ys, &g.capY, 2):
+        return -1
+    g.xs[0] = 0
+    g.xs[1] = W
+    g.ys[0] = 0
+    g.ys[1] = D
+    g.cells = <int*>malloc(sizeof(int))
+    if g.cells == NULL:
+        return -1
+    g.cells[0] = 0
+    if runs:
+        g.runX = <int*>malloc(sizeof(int))
+        g.runY = <int*>malloc(sizeof(int))
+        if g.runX == NULL or g.runY == NULL:
+            return -1
+        g.runX[0] = g.runY[0] = 1
+    return 0
+
+cdef void grid_free(Grid *g) noexcept nogil:
+    free(g.xs)
+    free(g.ys)
+    free(g.cells)
+    free(g.runX)
+    free(g.runY)
+    g.xs = g.ys = g.cells = g.runX = g.runY = NULL
+
+cdef int grid_copy(Grid *target, Grid *source) noexcept nogil:
+    cdef int nCells = (source.nx - 1) * (source.ny - 1)
+    target[0] = source[0]
+    target.runX = target.runY = NULL
+    target.capX = source.nx
+    target.capY = source.ny
+    if (copy_ints(&target.xs, source.xs, source.nx) or copy_ints(&target.ys, source.ys, source.ny)
+            or copy_ints(&target.cells, source.cells, nCells)):
+        return -1
+    if source.runs:
+        if copy_ints(&target.runX, source.runX, nCells) or copy_ints(&target.runY, source.runY, nCells):
+            return -1
+    return 0
+
+cdef long grid_nbytes(Grid *g) noexcept nogil:
+    return 4 * (g.capX + g.capY + (g.nx - 1) * (g.ny - 1) * (3 if g.runs else 1))
+
+cdef int insert_column(int **array, int nRows, int nCols, int j) noexcept nogil:
+    # New column j, a copy of column j - 1
+    cdef int *grown = <int*>malloc(nRows * (nCols + 1) * sizeof(int))
+    cdef int i
+    if grown == NULL:
+        return -1
+    for i in range(nRows):
+        memcpy(grown + i * (nCols + 1), array[0] + i * nCols, j * sizeof(int))
+        grown[i * (nCols + 1) + j] = array[0][i * nCols + j - 1]
+        memcpy(grown + i * (nCols + 1) + j + 1, array[0] + i * nCols + j, (nCols - j) * sizeof(int))
+    free(array[0])
+    array[0] = grown
+    return 0
+
+cdef int insert_row(int **array, int nRows, int nCols, int i) noexcept nogil:
+    # New row i, a copy of row i - 1
+    cdef int *grown = <int*>realloc(array[0], (nRows + 1) * nCols * sizeof(int))
+    if grown == NULL:
+        return -1
+    memmove(grown + (i + 1) * nCols, grown + i * nCols, (nRows - i) * nCols * sizeof(int))
+    memcpy(grown + i * nCols, grown + (i - 1) * nCols, nCols * sizeof(int))
+    array[0] = grown
+    return 0
+
+cdef int split_x(Grid *g, int x) noexcept nogil:
+    # Cut the columns at x and return the index of the column starting at x
+    cdef int j = bisect_left(g.xs, g.nx, x)
+    cdef int nRows = g.ny - 1
+    cdef int nCols = g.nx - 1
+    cdef int k
+    if j < g.nx and g.xs[j] == x:
+        return j
+    if reserve(&g.xs, &g.capX, g.nx + 1):
+        return -1
+    memmove(g.xs + j + 1, g.xs + j, (g.nx - j) * sizeof(int))
+    g.xs[j] = x
+    g.nx += 1
+    if insert_column(&g.cells, nRows, nCols, j):
+        return -1
+    if g.runs:
+        # The new column belongs to the same runs as the one it was cut from
+        for k in range(nRows * nCols):
+            if g.runX[k] >= j:
+                g.runX[k] += 1
+        if insert_column(&g.runX, nRows, nCols, j) or insert_column(&g.runY, nRows, nCols, j):
+            return -1
+    return j
+
+cdef int split_y(Grid *g, int y) noexcept nogil:
+    cdef int i = bisect_left(g.ys, g.ny, y)
+    cdef int nRows = g.ny - 1
+    cdef int nCols = g.nx - 1
+    cdef int k
+    if i < g.ny and g.ys[i] == y:
+        return i
+    if reserve(&g.ys, &g.capY, g.ny + 1):
+        return -1
+    memmove(g.ys + i + 1, g.ys + i, (g.ny - i) * sizeof(int))
+    g.ys[i] = y
+    g.ny += 1
+    if insert_row(&g.cells, nRows, nCols, i):
+        return -1
+    if g.runs:
+        for k in range(nRows * nCols):
+            if g.runY[k] >= i:
+                g.runY[k] += 1
+        if insert_row(&g.runY, nRows, nCols, i) or insert_row(&g.runX, nRows, nCols, i):
+            return -1
+    return i
+
+cdef void update_runs(Grid *g, int i0, int i1, int j0, int j1) noexcept nogil:
+    # Only the stamped rows can change along x and the stamped columns along y
+    cdef int nRows = g.ny - 1
+    cdef int nCols = g.nx - 1
+    cdef int i, j, k
+    for i in range(i0, i1):
+        k = i * nCols + nCols - 1
+        g.runX[k] = nCols
+        for j in range(nCols - 2, -1, -1):
+            k = i * nCols + j
+            g.runX[k] = g.runX[k + 1] if g.cells[k + 1] == g.cells[k] else j + 1
+    for j in range(j0, j1):
+        k = (nRows - 1) * nCols + j
+        g.runY[k] = nRows
+        for i in range(nRows - 2, -1, -1):
+            k = i * nCols + j
+            g.runY[k] = g.runY[k + nCols] if g.cells[k + nCols] == g.cells[k] else i + 1
+
+cdef int stamp(Grid *g, int x_start, int x_end, int y_start, int y_end, int value) noexcept nogil:
+    # Sets value on the area, cutting the map along its edges first, or its
+    # highest cell when that is higher: a box never lowers its neighbours
+    cdef int j0 = split_x(g, x_start)
+    cdef int j1 = split_x(g, x_end)
+    cdef int i0 = split_y(g, y_start)
+    cdef int i1 = split_y(g, y_end)
+    cdef int nCols = g.nx - 1
+    cdef int i, j
+    if j0 < 0 or j1 < 0 or i0 < 0 or i1 < 0:
+        return -1
+    for i in range(i0, i1):
+        for j in range(j0, j1):
+            if g.cells[i * nCols + j] > value:
+                value = g.cells[i * nCols + j]
+    for i in range(i0, i1):
+        for j in range(j0, j1):
+            g.cells[i * nCols + j] = value
+    if g.runs:
+        update_runs(g, i0, i1, j0, j1)
+    return 0
+
+cdef inline int cell_row(Grid *g, int y) noexcept nogil:
+    cdef int i = bisect_right(g.ys, 0, g.ny, y) - 1
+    return i if i < g.ny - 1 else g.ny - 2
+
+cdef inline int cell_column(Grid *g, int x) noexcept nogil:
+    cdef int j = bisect_right(g.xs, 0, g.nx, x) - 1
+    return j if j < g.nx - 1 else g.nx - 2
+
+cdef inline int value_at(Grid *g, int x, int y) noexcept nogil:
+    return g.cells[cell_row(g, y) * (g.nx - 1) + cell_column(g, x)]
+
+cdef int split_span(const int *values, int n, int start, int end, int *bounds, double *fractions) noexcept nogil:
+    # Cells [bounds[2k], bounds[2k+1]) under [start, end), as at most 3 spans: the
+    # first and the last cell with the fraction of them it covers, and the ones between
+    cdef int first = bisect_right(values, 0, n, start) - 1
+    cdef int last = bisect_left(values, n, end) - 1
+    cdef int count = 1
+    bounds[0] = first
+    bounds[1] = first + 1
+    if first == last:
+        fractions[0] = (end - start) / <double>(values[first + 1] - values[first])
+        return 1
+    fractions[0] = (values[first + 1] - start) / <double>(values[first + 1] - values[first])
+    if last > first + 1:
+        bounds[2] = first + 1
+        bounds[3] = last
+        fractions[1] = 1.0
+        count = 2
+    bounds[2 * count] = last
+    bounds[2 * count + 1] = last + 1
+    fractions[count] = (end - values[last]) / <double>(values[last + 1] - values[last])
+    return count + 1
+
+cdef inline void merge_support(Support_t *acc, int zmax, int zmin, double area) noexcept nogil:
+    if zmax > acc.zmax:
+        acc.zmax = zmax
+        acc.area = area
+    elif zmax == acc.zmax:
+        acc.area += area
+    if zmin < acc.zmin:
+        acc.zmin = zmin
+
+cdef inline void pull_max(int *maxW, int *maxD, int *maxH, int node) noexcept nogil:
+    # Node of a (w, d, h) maximum tree from its two children
+    cdef int left = 2 * node
+    cdef int right = left + 1
+    maxW[node] = maxW[left] if maxW[left] > maxW[right] else maxW[right]
+    maxD[node] = maxD[left] if maxD[left] > maxD[right] else maxD[right]
+    maxH[node] = maxH[left] if maxH[left] > maxH[right] else maxH[right]
+
+cdef int scan_x(Grid *g, int x_start, int y, int level, int step, long long *scanned) noexcept nogil:
+    # Width reached by stepping `step` units to the right of (x_start, y)
+    # while the value stays equal to `level`, as the dense while-loop did
+    cdef int nCols = g.nx - 1
+    cdef int i = cell_row(g, y)
+    cdef int j = cell_column(g, x_start)
+    cdef int w = 0
+    cdef int k
+    while x_start + w < g.W:
+        scanned[0] += 1
+        k = i * nCols + j
+        if g.cells[k] != level:
+            break
+        # Jump to the first step sample after the run of equal values
+        w += (g.xs[g.runX[k]] - x_start - w + step - 1) // step * step
+        j = bisect_right(g.xs, j, g.nx, x_start + w) - 1
+    return w
+
+cdef int scan_y(Grid *g, int x, int y_start, int level, int step, long long *scanned) noexcept nogil:
+    cdef int nCols = g.nx - 1
+    cdef int i = cell_row(g, y_start)
+    cdef int j = cell_column(g, x)
+    cdef int d = 0
+    cdef int k
+    while y_start + d < g.D:
+        scanned[0] += 1
+        k = i * nCols + j
+        if g.cells[k] != level:
+            break
+        d += (g.ys[g.runY[k]] - y_start - d + step - 1) // step * step
+        i = bisect_right(g.ys, i, g.ny, y_start + d) - 1
+    return d
+
+
+cdef inline double seconds_since(timespec *start) noexcept nogil:
+    cdef timespec now
+    clock_gettime(CLOCK_MONOTONIC, &now)
+    return (now.tv_sec - start.tv_sec) + (now.tv_nsec - start.tv_nsec) * 1e-9
+
+cdef inline void store_row(long long[:, ::1] rows, int n, Corner_t *c) noexcept:
+    rows[n, 0] = c.x
+    rows[n, 1] = c.y
+    rows[n, 2] = c.z
+    rows[n, 3] = c.w
+    rows[n, 4] = c.d
+    rows[n, 5] = c.h
+
+cdef class Kernel:
+    """
+    Kernel(W, H, D, grid=False, incremental=True, step=1, minSupport=0.0)
+
+    `step` is the step of the corner scans: any divisor of W, D and of the
+    w and d of the boxes gives the exact corners (Instance resolution).
+
+    first_fit only returns a corner where the box, lowered onto the highest
+    cell under its whole footprint, fits under the roof and rests on at
+    least `minSupport` of its base, so that it never cuts into a taller
+    neighbour the corner scans did not see. The footprints are
+    checked with range max queries on the support index, in O(log^2) of the
+    height map cells. A placement updates the index over its footprint only,
+    and it is rebuilt when a placement adds grid lines to the height map.
+
+    The Python methods release the GIL around the C code. C callers can use
+    place, first_fit_corner and corner_at directly, without the GIL.
+    """
+    def __cinit__(self, int W, int H, int D, bint grid=False, bint incremental=True, int step=1,
+                  double minSupport=0.0):
+        if step <= 0:
+            raise ValueError("step must be positive")
+        if not 0 <= minSupport <= 1:
+            raise ValueError("minSupport must be between 0 and 1")
+        self.W = W
+        self.H = H
+        self.D = D
+        self.step = step
+        self.grid = grid
+        self.incremental = incremental
+        self.minSupport = minSupport
+        self.supportDirty = True
+        if grid_init(&self.height, W, D, True):
+            raise MemoryError()
+        self.size = 1
+        self.rebuild = True
+
+    def __dealloc__(self):
+        grid_free(&self.height)
+        free(self.boxes)
+        free(self.px)
+        free(self.py)
+        free(self.xList)
+        free(self.yList)
+        free(self.vx)
+        free(self.vy)
+        free(self.slots)
+        free(self.maxW)
+        free(self.maxD)
+        free(self.maxH)
+        free(self.colW)
+        free(self.colD)
+        free(self.colH)
+        free(self.supMax)
+        free(self.supMin)
+        free(self.supArea)
+
+    def __reduce__(self):
+        # Rebuilt by replaying the placed boxes
+        return (_kernel_from_boxes, (self.W, self.H, self.D, self.grid, self.incremental, self.step,
+                                     self.get_boxes(), self.minSupport))
+
+    def copy(self):
+        # The support index of the copy is rebuilt on its first query
+        cdef Kernel other = Kernel.__new__(Kernel, self.W, self.H, self.D, self.grid, self.incremental, self.step,
+                                           self.minSupport)
+        cdef int failed = 0
+        grid_free(&other.height)
+        with nogil:
+            failed = (grid_copy(&other.height, &self.height)
+                      or copy_ints(&other.boxes, self.boxes, 7 * self.nBoxes)
+                      or copy_ints(&other.px, self.px, self.nPoints) or copy_ints(&other.py, self.py, self.nPoints)
+                      or copy_ints(&other.xList, self.xList, self.nX) or copy_ints(&other.yList, self.yList, self.nY)
+                      or copy_ints(&other.vx, self.vx, self.nVX) or copy_ints(&other.vy, self.vy, self.nVY))
+            if not failed:
+                other.slots = <Slot*>malloc((self.nSlots if self.nSlots > 0 else 1) * sizeof(Slot))
+                failed = other.slots == NULL
+            if not failed:
+                memcpy(other.slots, self.slots, self.nSlots * sizeof(Slot))
+            if not failed and self.maxW != NULL:
+                failed = (copy_ints(&other.maxW, self.maxW, 2 * self.size) or copy_ints(&other.maxD, self.maxD, 2 * self.size)
+                          or copy_ints(&other.maxH, self.maxH, 2 * self.size))
+            if not failed and self.colW != NULL:
+                failed = (copy_ints(&other.colW, self.colW, 2 * self.size) or copy_ints(&other.colD, self.colD, 2 * self.size)
+                          or copy_ints(&other.colH, self.colH, 2 * self.size))
+        if failed:
+            raise MemoryError()
+        other.nBoxes = self.nBoxes
+        other.capBoxes = 7 * self.nBoxes
+        other.nPoints = other.capPoints = self.nPoints
+        other.nX = other.capXList = self.nX
+        other.nY = other.capYList = self.nY
+        other.nVX = other.capVX = self.nVX
+        other.nVY = other.capVY = self.nVY
+        other.nSlots = other.capSlots = self.nSlots
+        other.size = self.size
+        other.rebuild = self.rebuild
+        other.xOrder = self.xOrder
+        return other
+
+    # Slots
+
+    cdef int reserve_slots(self, int need) noexcept nogil:
+        cdef int newCapacity = self.capSlots if self.capSlots > 0 else 8
+        cdef Slot *grown
+        if need <= self.capSlots:
+            return 0
+        while newCapacity < need:
+            newCapacity *= 2
+        grown = <Slot*>realloc(self.slots, newCapacity * sizeof(Slot))
+        if grown == NULL:
+            return -1
+        self.slots = grown
+        self.capSlots = newCapacity
+        return 0
+
+    cdef void slot_point(self, int k, int *x, int *y) noexcept nogil:
+        if self.grid:
+            x[0] = self.vx[k % self.nVX]
+            y[0] = self.vy[k // self.nVX]
+        else:
+            x[0] = self.px[k]
+            y[0] = self.py[k]
+
+    cdef int add_point(self, int x, int y) noexcept nogil:
+        # Slot mode: a new corner point, unless it is already known
+        cdef int k, capacity
+        for k in range(self.nPoints):
+            if self.px[k] == x and self.py[k] == y:
+                return 0
+        k = self.nPoints
+        # px and py grow together
+        capacity = self.capPoints
+        if (reserve(&self.px, &capacity, k + 1) or reserve(&self.py, &self.capPoints, k + 1)
+                or self.reserve_slots(k + 1)):
+            return -1
+        self.px[k] = x
+        self.py[k] = y
+        self.nPoints += 1
+        self.nSlots += 1
+        self.slots[k].valid = x < self.W and y < self.D
+        self.slots[k].fresh = True
+        self.slots[k].right = self.slots[k].reach = 0
+        if self.nSlots > self.size:
+            self.rebuild = True
+        return 0
+
+    cdef int add_column(self, int x) noexcept nogil:
+        # Grid mode: a new x coordinate, and a column of slots when inside the container
+        cdef int r, i, nCols
+        cdef Slot *grown
+        if contains(self.xList, self.nX, x):
+            return 0
+        if reserve(&self.xList, &self.capXList, self.nX + 1):
+            return -1
+        self.xList[self.nX] = x
+        self.nX += 1
+        if x >= self.W:
+            return 0
+        r = insert_sorted(&self.vx, &self.nVX, &self.capVX, x)
+        if r < 0:
+            return -1
+        nCols = self.nVX - 1
+        grown = <Slot*>malloc((self.nVY * self.nVX if self.nVY > 0 else 1) * sizeof(Slot))
+        if grown == NULL:
+            return -1
+        for i in range(self.nVY):
+            memcpy(grown + i * self.nVX, self.slots + i * nCols, r * sizeof(Slot))
+            grown[i * self.nVX + r].valid = True
+            grown[i * self.nVX + r].fresh = True
+            memcpy(grown + i * self.nVX + r + 1, self.slots + i * nCols + r, (nCols - r) * sizeof(Slot))
+        free(self.slots)
+        self.slots = grown
+        self.capSlots = self.nVY * self.nVX
+        self.nSlots = self.nVY * self.nVX
+        self.rebuild = True
+        return 0
+
+    cdef int add_row(self, int y) noexcept nogil:
+        cdef int r, j
+        if contains(self.yList, self.nY, y):
+            return 0
+        if reserve(&self.yList, &self.capYList, self.nY + 1):
+            return -1
+        self.yList[self.nY] = y
+        self.nY += 1
+        if y >= self.D:
+            return 0
+        r = insert_sorted(&self.vy, &self.nVY, &self.capVY, y)
+        if r < 0 or self.reserve_slots(self.nVY * self.nVX):
+            return -1
+        memmove(self.slots + (r + 1) * self.nVX, self.slots + r * self.nVX,
+                (self.nVY - 1 - r) * self.nVX * sizeof(Slot))
+        for j in range(self.nVX):
+            self.slots[r * self.nVX + j].valid = True
+            self.slots[r * self.nVX + j].fresh = True
+        self.nSlots = self.nVY * self.nVX
+        self.rebuild = True
+        return 0
+
+    # Segment tree
+
+    cdef void set_leaf(self, int k) noexcept nogil:
+        cdef int node = k + self.size
+        cdef int w = -1
+        cdef int d = -1
+        cdef int h = -1
+        if self.slots[k].valid:
+            w = self.slots[k].corner.w
+            d = self.slots[k].corner.d
+            h = self.slots[k].corner.h
+        self.maxW[node] = w
+        self.maxD[node] = d
+        self.maxH[node] = h
+        if self.xOrder:
+            node = (k % self.nVX) * self.nVY + k // self.nVX + self.size
+            self.colW[node] = w
+            self.colD[node] = d
+            self.colH[node] = h
+
+    cdef void pull(self, int node) noexcept nogil:
+        pull_max(self.maxW, self.maxD, self.maxH, node)
+        if self.xOrder:
+            pull_max(self.colW, self.colD, self.colH, node)
+
+    cdef int build_tree(self) noexcept nogil:
+        # Room for twice the slots, so that the next points only update leaves
+        cdef int k
+        self.size = 1
+        while self.size < 2 * self.nSlots:
+            self.size *= 2
+        free(self.maxW)
+        free(self.maxD)
+        free(self.maxH)
+        self.maxW = <int*>malloc(2 * self.size * sizeof(int))
+        self.maxD = <int*>malloc(2 * self.size * sizeof(int))
+        self.maxH = <int*>malloc(2 * self.size * sizeof(int))
+        if self.maxW == NULL or self.maxD == NULL or self.maxH == NULL:
+            return -1
+        if self.xOrder:
+            free(self.colW)
+            free(self.colD)
+            free(self.colH)
+            self.colW = <int*>malloc(2 * self.size * sizeof(int))
+            self.colD = <int*>malloc(2 * self.size * sizeof(int))
+            self.colH = <int*>malloc(2 * self.size * sizeof(int))
+            if self.colW == NULL or self.colD == NULL or self.colH == NULL:
+                return -1
+        for k in range(2 * self.size):
+            self.maxW[k] = self.maxD[k] = self.maxH[k] = -1
+            if self.xOrder:
+                self.colW[k] = self.colD[k] = self.colH[k] = -1
+        for k in range(self.nSlots):
+            self.set_leaf(k)
+        for k in range(self.size - 1, 0, -1):
+            self.pull(k)
+        self.rebuild = False
+        return 0
+
+    cdef void update_leaf(self, int k) noexcept nogil:
+        cdef int node = (k + self.size) // 2
+        self.set_leaf(k)
+        while node:
+            pull_max(self.maxW, self.maxD, self.maxH, node)
+            node //= 2
+        if self.xOrder:
+            node = ((k % self.nVX) * self.nVY + k // self.nVX + self.size) // 2
+            while node:
+                pull_max(self.colW, self.colD, self.colH, node)
+                node //= 2
+
+    cdef bint first_fit_corner(self, int w, int d, int h, bint rotation, Corner_t *corner,
+                               double timeLimit=-1.0, bint xFirst=False) noexcept nogil:
+        """
+        First corner with w, d and h at least as large as the box. With
+        `rotation`, the box may also be turned so that its w goes along the
+        corner depth. z and h of the corner are the ones of the box on top
+        of its footprint at the corner point (the highest cell under it),
+        which has to support at least minSupport of its base. With a
+        `timeLimit` (seconds, negative: none), the search gives up (False)
+        once it has run that long, the clock being read every few nodes.
+        The corners are tried in (y, x) order, or in (x, y) order with
+        `xFirst` once the (x, y) tree is kept (see first_fit).
+        """
+        cdef int stack[128]
+        cdef int top = 1
+        cdef int node
+        cdef int visited = 0
+        cdef Corner_t c
+        cdef Support_t support
+        cdef timespec start
+        cdef int *maxW = self.maxW
+        cdef int *maxD = self.maxD
+        cdef int *maxH = self.maxH
+        cdef int k
+        xFirst = xFirst and self.xOrder
+        if xFirst:
+            maxW, maxD, maxH = self.colW, self.colD, self.colH
+        if timeLimit >= 0:
+            clock_gettime(CLOCK_MONOTONIC, &start)
+        if self.nBoxes == 0:
+            # Only the empty container
+            corner[0] = Corner_t(0, 0, 0, self.W, self.D, self.H)
+            self.fitTests += 1
+            return h <= self.H and ((w <= self.W and d <= self.D) or (rotation and d <= self.W and w <= self.D))
+        stack[0] = 1
+        while top:
+            if timeLimit >= 0 and visited % 16 == 0 and seconds_since(&start) > timeLimit:
+                return False
+            visited += 1
+            top -= 1
+            node = stack[top]
+            self.fitTests += 1
+            if maxH[node] < h:
+                continue
+            if not ((maxW[node] >= w and maxD[node] >= d)
+                    or (rotation and maxW[node] >= d and maxD[node] >= w)):
+                continue
+            if node >= self.size:
+                k = node - self.size
+                if xFirst:
+                    k = (k % self.nVY) * self.nVX + k // self.nVY
+                c = self.slots[k].corner
+                # The box goes on top of its footprint, which has to support it
+                if ((c.w >= w and c.d >= d and self.supported(c.x, c.y, w, d, h, &support))
+                        or (rotation and c.w >= d and c.d >= w and self.supported(c.x, c.y, d, w, h, &support))):
+                    corner[0] = Corner_t(c.x, c.y, support.zmax, c.w, c.d, self.H - support.zmax)
+                    return True
+                continue
+            stack[top] = 2 * node + 1
+            stack[top + 1] = 2 * node
+            top += 2
+        return False
+
+    # Support index
+
+    cdef int build_support(self) noexcept nogil:
+        # Leaves of row node R + i, column node C + j hold cell (i, j), then
+        # each row is reduced along x and the rows are reduced along y
+        cdef Grid *g = &self.height
+        cdef int R = g.ny - 1
+        cdef int C = g.nx - 1
+        cdef int cols = 2 * C
+        cdef int r, c, node, a, b
+        free(self.supMax)
+        free(self.supMin)
+        free(self.supArea)
+        self.supMax = <int*>malloc(4 * R * C * sizeof(int))
+        self.supMin = <int*>malloc(4 * R * C * sizeof(int))
+        self.supArea = <double*>malloc(4 * R * C * sizeof(double))
+        if self.supMax == NULL or self.supMin == NULL or self.supArea == NULL:
+            return -1
+        self.supRows = R
+        self.supCols = C
+        for r in range(R):
+            for c in range(C):
+                node = (R + r) * cols + C + c
+                self.supMax[node] = self.supMin[node] = g.cells[r * C + c]
+                self.supArea[node] = <double>(g.xs[c + 1] - g.xs[c]) * (g.ys[r + 1] - g.ys[r])
+        for r in range(R, 2 * R):
+            for c in range(C - 1, 0, -1):
+                node = r * cols + c
+                self.pull_support(node, node + c, node + c + 1)
+        for r in range(R - 1, 0, -1):
+            for c in range(1, cols):
+                node = r * cols + c
+                self.pull_support(node, 2 * r * cols + c, (2 * r + 1) * cols + c)
+        self.supportDirty = False
+        return 0
+
+    cdef void pull_support(self, int node, int a, int b) noexcept nogil:
+        # Node from its two children a and b
+        self.supMax[node] = self.supMax[a] if self.supMax[a] > self.supMax[b] else self.supMax[b]
+        self.supMin[node] = self.supMin[a] if self.supMin[a] < self.supMin[b] else self.supMin[b]
+        self.supArea[node] = ((self.supArea[a] if self.supMax[a] == self.supMax[node] else 0)
+                              + (self.supArea[b] if self.supMax[b] == self.supMax[node] else 0))
+
+    cdef void update_support(self, int i0, int i1, int j0, int j1) noexcept nogil:
+        # Cells of rows [i0, i1) and columns [j0, j1) changed (the grid lines
+        # did not): only the leaves of the block and their ancestors, along x
+        # then along y, are reduced again
+        cdef Grid *g = &self.height
+        cdef int R = self.supRows
+        cdef int C = self.supCols
+        cdef int cols = 2 * C
+        cdef int r, c, node, lo, hi, rlo, rhi
+        for r in range(R + i0, R + i1):
+            for c in range(C + j0, C + j1):
+                node = r * cols + c
+                self.supMax[node] = self.supMin[node] = g.cells[(r - R) * C + c - C]
+            lo = (C + j0) >> 1
+            hi = (C + j1 - 1) >> 1
+            while lo >= 1:
+                for c in range(lo, hi + 1):
+                    node = r * cols + c
+                    self.pull_support(node, node + c, node + c + 1)
+                lo >>= 1
+                hi >>= 1
+        rlo = (R + i0) >> 1
+        rhi = (R + i1 - 1) >> 1
+        while rlo >= 1:
+            for r in range(rlo, rhi + 1):
+                lo = C + j0
+                hi = C + j1 - 1
+                while lo >= 1:
+                    for c in range(lo, hi + 1):
+                        self.pull_support(r * cols + c, 2 * r * cols + c, (2 * r + 1) * cols + c)
+                    lo >>= 1
+                    hi >>= 1
+            rlo >>= 1
+            rhi >>= 1
+
+    cdef void query_support(self, int i0, int i1, int j0, int j1, double scale, Support_t *acc) noexcept nogil:
+        # Merges the cells of rows [i0, i1) and columns [j0, j1) into acc, their areas times scale
+        cdef int cols = 2 * self.supCols
+        cdef int rlo = i0 + self.supRows
+        cdef int rhi = i1 + self.supRows
+        cdef int row, lo, hi
+        while rlo < rhi:
+            if rlo & 1:
+                row = rlo
+                rlo += 1
+            elif rhi & 1:
+                rhi -= 1
+                row = rhi
+            else:
+                rlo >>= 1
+                rhi >>= 1
+                continue
+            lo = j0 + self.supCols
+            hi = j1 + self.supCols
+            while lo < hi:
+                if lo & 1:
+                    merge_support(acc, self.supMax[row * cols + lo], self.supMin[row * cols + lo],
+                                  scale * self.supArea[row * cols + lo])
+                    lo += 1
+                if hi & 1:
+                    hi -= 1
+                    merge_support(acc, self.supMax[row * cols + hi], self.supMin[row * cols + hi],
+                                  scale * self.supArea[row * cols + hi])
+                lo >>= 1
+                hi >>= 1
+
+    cdef Support_t footprint_support(self, int x, int y, int w, int d) noexcept nogil:
+        """
+        Highest and lowest cell under the w x d footprint at (x, y), which
+        must be inside the container, and the footprint area at the highest.
+        zmax is -1 when the index could not be built.
+        """
+        cdef Support_t acc = Support_t(-1, self.H + 1, 0.0)
+        cdef int colBounds[6]
+        cdef int rowBounds[6]
+        cdef double colFractions[3]
+        cdef double rowFractions[3]
+        cdef int nCols, nRows, a, b
+        if self.supportDirty and self.build_support():
+            return acc
+        nCols = split_span(self.height.xs, self.height.nx, x, x + w, colBounds, colFractions)
+        nRows = split_span(self.height.ys, self.height.ny, y, y + d, rowBounds, rowFractions)
+        for a in range(nRows):
+            for b in range(nCols):
+                self.query_support(rowBounds[2 * a], rowBounds[2 * a + 1], colBounds[2 * b], colBounds[2 * b + 1],
+                                   rowFractions[a] * colFractions[b], &acc)
+        return acc
+
+    cdef bint supported(self, int x, int y, int w, int d, int h, Support_t *s) noexcept nogil:
+        """
+        Whether a w x d x h box at (x, y), lowered onto the highest cell under
+        its footprint (s.zmax), fits under the roof and rests on at least
+        minSupport of its base.
+        """
+        s[0] = self.footprint_support(x, y, w, d)
+        return (s.zmax >= 0 and s.zmax + h <= self.H
+                and s.area >= (self.minSupport - 1e-9) * w * d)
+
+    # Corners
+
+    cdef Corner_t corner_at(self, int x_start, int y_start, int *reach) noexcept nogil:
+        """
+        Corner at (x_start, y_start); `reach` receives the last y it sampled,
+        which bounds the area a later placement has to touch to change it.
+        """
+        cdef int ground_level = value_at(&self.height, x_start, y_start)
+        cdef int w, d1, d2
+        self.cornersEvaluated += 1
+
+        # Free space at the right side and at the back of the corner
+        w = scan_x(&self.height, x_start, y_start, ground_level, self.step, &self.cellsScanned)
+        d1 = scan_y(&self.height, x_start, y_start, ground_level, self.step, &self.cellsScanned)
+        d2 = scan_y(&self.height, x_start + w - 1, y_start, ground_level, self.step, &self.cellsScanned)
+
+        reach[0] = y_start + (d1 if d1 > d2 else d2)
+        return Corner_t(x_start, y_start, ground_level, w, d1 if d1 < d2 else d2, self.H - ground_level)
+
+    cdef void store_corner(self, int k) noexcept nogil:
+        cdef int x, y
+        self.slot_point(k, &x, &y)
+        self.slots[k].corner = self.corner_at(x, y, &self.slots[k].reach)
+        self.slots[k].right = x + self.slots[k].corner.w
+        self.slots[k].fresh = False
+
+    cdef int recompute_all(self) noexcept nogil:
+        cdef int k
+        for k in range(self.nSlots):
+            if self.slots[k].valid:
+                self.store_corner(k)
+        return self.build_tree()
+
+    cdef int place(self, int x, int y, int z, int w, int d, int h, int wgt) noexcept nogil:
+        cdef int k, px, py
+        cdef int nx, ny
+        cdef bint stale
+
+        if reserve(&self.boxes, &self.capBoxes, 7 * (self.nBoxes + 1)):
+            return -1
+        self.boxes[7 * self.nBoxes + 0] = x
+        self.boxes[7 * self.nBoxes + 1] = y
+        self.boxes[7 * self.nBoxes + 2] = z
+        self.boxes[7 * self.nBoxes + 3] = w
+        self.boxes[7 * self.nBoxes + 4] = d
+        self.boxes[7 * self.nBoxes + 5] = h
+        self.boxes[7 * self.nBoxes + 6] = wgt
+        self.nBoxes += 1
+
+        # New corner points
+        if self.grid:
+            if (self.add_column(x) or self.add_column(x + w)
+                    or self.add_row(y) or self.add_row(y + d)):
+                return -1
+        else:
+            if (self.add_point(x, y) or self.add_point(x + w, y)
+                    or self.add_point(x, y + d) or self.add_point(x + w, y + d)):
+                return -1
+
+        # The support index follows the stamp, unless it adds grid lines: it
+        # is then rebuilt on the next query
+        nx = self.height.nx
+        ny = self.height.ny
+        if stamp(&self.height, x, x + w, y, y + d, z + h):
+            return -1
+        if self.height.nx != nx or self.height.ny != ny:
+            self.supportDirty = True
+        elif not self.supportDirty:
+            self.update_support(bisect_left(self.height.ys, ny, y), bisect_left(self.height.ys, ny, y + d),
+                                bisect_left(self.height.xs, nx, x), bisect_left(self.height.xs, nx, x + w))
+
+        if not self.incremental:
+            return self.recompute_all()
+
+        # Only the corners whose scanned area meets the footprint (or its
+        # edge lines) change, plus the new ones
+        for k in range(self.nSlots):
+            if not self.slots[k].valid:
+                continue
+            stale = self.slots[k].fresh
+            if not stale:
+                self.slot_point(k, &px, &py)
+                stale = (x <= self.slots[k].right and px < x + w
+                         and y <= self.slots[k].reach and py < y + d)
+            if stale:
+                self.store_corner(k)
+                if not self.rebuild:
+                    self.update_leaf(k)
+        if self.rebuild:
+            return self.build_tree()
+        return 0
+
+    # Python interface
+
+    def add_box(self, int x, int y, int z, int w, int d, int h, int wgt):
+        cdef int failed
+        with nogil:
+            failed = self.place(x, y, z, w, d, h, wgt)
+        if failed:
+            raise MemoryError()
+
+    def first_fit(self, int w, int d, int h, bint rotation=False, double timeLimit=-1.0, bint xFirst=False):
+        """
+        (x, y, z, w, d, h) of the first corner a w x d x h box fits in, or None
+        (also when the search runs longer than `timeLimit` seconds, if given).
+        The corners are tried in (y, x) order, or in (x, y) order with
+        `xFirst` (grid mode only): the kernel then keeps a second tree, in
+        that order, from this call on.
+        """
+        cdef Corner_t corner
+        cdef bint found
+        cdef int failed = 0
+        if xFirst and not self.xOrder:
+            if not self.grid:
+                raise ValueError("the (x, y) order needs the grid mode")
+            self.xOrder = True
+            if self.nBoxes:
+                with nogil:
+                    failed = self.build_tree()
+                if failed:
+                    raise MemoryError()
+        with nogil:
+            found = self.first_fit_corner(w, d, h, rotation, &corner, timeLimit, xFirst)
+        if not found:
+            return None
+        return (corner.x, corner.y, corner.z, corner.w, corner.d, corner.h)
+
+    def computeCorner(self, int x, int y):
+        """
+        ((x, y, z, w, d, h), last y sampled) of the corner at (x, y).
+        """
+        cdef int reach
+        cdef Corner_t corner = self.corner_at(x, y, &reach)
+        return (corner.x, corner.y, corner.z, corner.w, corner.d, corner.h), reach
+
+    def support(self, int x, int y, int w, int d):
+        """
+        (highest, lowest, area at the highest) of the height map under the
+        w x d footprint at (x, y).
+        """
+        cdef Support_t s
+        if w <= 0 or d <= 0 or x < 0 or y < 0 or x + w > self.W or y + d > self.D:
+            raise ValueError(f"footprint {w} x {d} at ({x}, {y}) is not inside the container")
+        with nogil:
+            s = self.footprint_support(x, y, w, d)
+        if s.zmax < 0:
+            raise MemoryError()
+        return s.zmax, s.zmin, s.area
+
+    def is_supported(self, int x, int y, int w, int d, int h):
+        """
+        (whether the box fits on top of its footprint with minSupport, z it rests at).
+        """
+        cdef Support_t s
+        cdef bint ok
+        if w <= 0 or d <= 0 or x < 0 or y < 0 or x + w > self.W or y + d > self.D:
+            return False, -1
+        with nogil:
+            ok = self.supported(x, y, w, d, h, &s)
+        if s.zmax < 0:
+            raise MemoryError()
+        return ok, s.zmax
+
+    def recompute(self):
+        if self.recompute_all():
+            raise MemoryError()
+
+    def corners(self):
+        """
+        (x, y, z, w, d, h) of the corners, in corner list order: insertion
+        order of the points (slot mode), or y then x in insertion order of
+        the coordinates (grid mode).
+        """
+        cdef int i, j, k
+        cdef Corner_t c
+        if self.nBoxes == 0:
+            return [(0, 0, 0, self.W, self.D, self.H)]
+        result = []
+        if not self.grid:
+            for k in range(self.nSlots):
+                if self.slots[k].valid:
+                    c = self.slots[k].corner
+                    result.append((c.x, c.y, c.z, c.w, c.d, c.h))
+            return result
+        for i in range(self.nY):
+            if self.yList[i] >= self.D:
+                continue
+            for j in range(self.nX):
+                if self.xList[j] >= self.W:
+                    continue
+                k = (bisect_left(self.vy, self.nVY, self.yList[i]) * self.nVX
+                     + bisect_left(self.vx, self.nVX, self.xList[j]))
+                c = self.slots[k].corner
+                result.append((c.x, c.y, c.z, c.w, c.d, c.h))
+        return result
+
+    def corner_array(self):
+        """
+        The corners as an (n, 6) int64 array of x, y, z, w, d, h rows, in the
+        order of corners().
+        """
+        cdef int i, j, k, n = 0
+        cdef long long[:, ::1] rows
+        if self.nBoxes == 0:
+            return np.array([[0, 0, 0, self.W, self.D, self.H]], dtype=np.int64)
+        array = np.empty((self.nX * self.nY if self.grid else self.nSlots, 6), dtype=np.int64)
+        rows = array
+        if not self.grid:
+            for k in range(self.nSlots):
+                if self.slots[k].valid:
+                    store_row(rows, n, &self.slots[k].corner)
+                    n += 1
+            return array[:n]
+        for i in range(self.nY):
+            if self.yList[i] >= self.D:
+                continue
+            for j in range(self.nX):
+                if self.xList[j] >= self.W:
+                    continue
+                k = (bisect_left(self.vy, self.nVY, self.yList[i]) * self.nVX
+                     + bisect_left(self.vx, self.nVX, self.xList[j]))
+                store_row(rows, n, &self.slots[k].corner)
+                n += 1
+        return array[:n]
+
+    def points(self):
+        """
+        Corner points in insertion order (slot mode), or the x and the y
+        coordinates in insertion order (grid mode).
+        """
+        cdef int k
+        if self.grid:
+            return [self.xList[k] for k in range(self.nX)], [self.yList[k] for k in range(self.nY)]
+        return [(self.px[k], self.py[k]) for k in range(self.nPoints)]
+
+    def get_boxes(self):
+        cdef int k
+        return [tuple(self.boxes[7 * k + i] for i in range(7)) for k in range(self.nBoxes)]
+
+    cdef object export(self, Grid *g):
+        cdef int k
+        cells = np.array([g.cells[k] for k in range((g.nx - 1) * (g.ny - 1))], dtype=np.int64)
+        return [g.xs[k] for k in range(g.nx)], [g.ys[k] for k in range(g.ny)], cells.reshape(g.ny - 1, g.nx - 1)
+
+    def height_map(self):
+        """ (xs, ys, cells): cell (i, j) covers [xs[j], xs[j+1]) x [ys[i], ys[i+1]) """
+        return self.export(&self.height)
+
+    def value_at(self, int x, int y):
+        return value_at(&self.height, x, y)
+
+    def take_counters(self):
+        """
+        (corners evaluated, fit tests, cells scanned) since the last call.
+        """
+        counters = (self.cornersEvaluated, self.fitTests, self.cellsScanned)
+        self.cornersEvaluated = self.fitTests = self.cellsScanned = 0
+        return counters
+
+    def nbytes(self):
+        return (grid_nbytes(&self.height)
+                + 4 * (self.capBoxes + 2 * self.capPoints + self.capXList + self.capYList + self.capVX + self.capVY
+                       + (12 if self.xOrder else 6) * self.size) + self.capSlots * sizeof(Slot)
+                + (0 if self.supMax == NULL else 16 * 4 * self.supRows * self.supCols))
+
+
+def _kernel_from_boxes(W, H, D, grid, incremental, step, boxes, minSupport=0.0):
+    kernel = Kernel(W, H, D, grid, incremental, step, minSupport)
+    for box in boxes:
+        kernel.add_box(*box)
+    return kernel
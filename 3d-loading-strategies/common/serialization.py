@@ -0,0 +1,191 @@
+"""
+Compact binary archives of instances and solutions, of either solver.
+
+An archive is two arrays in the .npy format, written one after the other:
+one PLAN_DTYPE row per instance or solution (its container and settings),
+then one BOX_DTYPE row per box, the boxes of a plan being the rows
+start:start + count. A solution keeps its placed boxes, in the order they
+were added, an instance all its boxes (at 0, 0, 0). The height map, the
+corners and the rest of a Solution are rebuilt from the boxes on load.
+
+Archives are read without copying: load memory-maps the file and loads
+wraps the bytes, so opening a large archive only reads the two headers.
+The same archive reads back into the classes of either solver: load and
+loads take the data_structures module to build them with.
+"""
+
+import io, os
+import numpy as np
+
+# Placement engines of the solvers, by their index in the "placement" field
+PLACEMENTS = ("corners", "extreme_points")
+# A placed box: position, dimensions as placed (w along x, d along y) and type
+BOX_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("z", "<i4"), ("w", "<i4"), ("d", "<i4"), ("h", "<i4"),
+                      ("id", "<i4"), ("wgt", "<i4")])
+# An instance or a solution: its container and the settings of its Solution
+PLAN_DTYPE = np.dtype([("kind", "u1"), ("placement", "u1"), ("W", "<i4"), ("H", "<i4"), ("D", "<i4"),
+                       ("Wgt", "<i4"), ("cogEnvelope", "<f8", (4,)), ("resolution", "<i4"),
+                       ("minSupport", "<f8"), ("nTotalBox", "<i4"), ("start", "<i8"), ("count", "<i4")])
+INSTANCE, SOLUTION = 0, 1
+
+
+class Archive:
+    """
+    Instances and solutions read from an archive. The arrays `plans` and
+    `boxes` are the ones of the archive (memory-mapped or on its bytes),
+    each plan is only rebuilt when asked for, with the classes of the
+    solver module `ds`.
+    """
+    def __init__(self, plans:np.ndarray, boxes:np.ndarray, ds) -> None:
+        self.plans = plans
+        self.boxes = boxes
+        self.ds = ds
+        # The ant colony's Cython classes are set through their methods
+        self.cython = hasattr(ds.Box, "set_centerPoint")
+
+    def __len__(self) -> int:
+        return len(self.plans)
+
+    def boxes_of(self, k:int) -> np.ndarray:
+        """ BOX_DTYPE rows of plan k (a view of the archive) """
+        plan = self.plans[k]
+        return self.boxes[plan["start"]:plan["start"] + plan["count"]]
+
+    def is_solution(self, k:int) -> bool:
+        return self.plans[k]["kind"] == SOLUTION
+
+    def container(self, k:int):
+        plan = self.plans[k]
+        cogEnvelope = None if np.isnan(plan["cogEnvelope"]).any() else tuple(float(v) for v in plan["cogEnvelope"])
+        return self.ds.Container(int(plan["W"]), int(plan["H"]), int(plan["D"]), int(plan["Wgt"]), cogEnvelope)
+
+    def instance(self, k:int):
+        """ Instance of plan k: its boxes, unplaced, in its container """
+        plan = self.plans[k]
+        boxes = self.boxes_of(k)
+        cogEnvelope = None if np.isnan(plan["cogEnvelope"]).any() else tuple(float(v) for v in plan["cogEnvelope"])
+        return self.ds.Instance(len(boxes), *(boxes[name].tolist() for name in ("w", "h", "d", "wgt", "id")),
+                                int(plan["W"]), int(plan["H"]), int(plan["D"]), int(plan["Wgt"]),
+                                int(plan["resolution"]), cogEnvelope, float(plan["minSupport"]))
+
+    def solution(self, k:int):
+        """ Solution of plan k, its boxes added again in their order """
+        plan = self.plans[k]
+        placement = PLACEMENTS[plan["placement"]]
+        if self.cython:
+            solution = self.ds.Solution(int(plan["nTotalBox"]), self.container(k), step=int(plan["resolution"]),
+                                        minSupport=float(plan["minSupport"]), placement=placement)
+        else:
+            solution = self.ds.Solution(self.instance(k), placement=placement)
+            solution.nTotalBox = int(plan["nTotalBox"])
+        for x, y, z, w, d, h, id, wgt in self.boxes_of(k).tolist():
+            box = self.ds.Box(x, y, z, w, h, d, wgt, id)
+            if self.cython:
+                box.set_centerPoint([x + (w/2), y + (d/2)])
+            else:
+                box.centerPoint = [x + (w/2), y + (d/2)]
+            solution.add_box(box)
+        return solution
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.solution(k) if self.is_solution(k) else self.instance(k)
+
+
+def _plan(plan, item) -> list:
+    # Fills the plan row of an Instance or a Solution and returns its boxes
+    if hasattr(item, "get_boxList"):
+        # Cython classes of the ant colony
+        if hasattr(item, "get_nTotalBox"):
+            plan["kind"] = SOLUTION
+            plan["placement"] = PLACEMENTS.index(item.get_placement())
+            plan["resolution"] = item.get_step()
+            plan["nTotalBox"] = item.get_nTotalBox()
+        else:
+            plan["kind"] = INSTANCE
+            plan["resolution"] = item.get_resolution()
+            plan["nTotalBox"] = item.get_n()
+        plan["minSupport"] = item.get_minSupport()
+        container = item.get_container()
+        plan["W"], plan["H"], plan["D"], plan["Wgt"] = container.get_W(), container.get_H(), container.get_D(), container.get_Wgt()
+        cogEnvelope = container.get_cogEnvelope()
+        plan["cogEnvelope"] = cogEnvelope if cogEnvelope is not None else (np.nan,) * 4
+        return [(box.get_x(), box.get_y(), box.get_z(), box.get_w(), box.get_d(), box.get_h(), box.get_id(), box.get_wgt())
+                for box in item.get_boxList()]
+    if hasattr(item, "nTotalBox"):
+        plan["kind"] = SOLUTION
+        plan["placement"] = PLACEMENTS.index(item.placement)
+        plan["nTotalBox"] = item.nTotalBox
+    else:
+        plan["kind"] = INSTANCE
+        plan["nTotalBox"] = item.n
+    plan["resolution"] = item.resolution
+    plan["minSupport"] = item.minSupport
+    container = item.container
+    plan["W"], plan["H"], plan["D"], plan["Wgt"] = container.W, container.H, container.D, container.Wgt
+    plan["cogEnvelope"] = container.cogEnvelope if container.cogEnvelope is not None else (np.nan,) * 4
+    return [(box.x, box.y, box.z, box.w, box.d, box.h, box.id, box.wgt) for box in item.boxList]
+
+
+def to_arrays(items:list) -> tuple:
+    """ (plans, boxes) arrays of a list of Instance and Solution """
+    plans = np.zeros(len(items), dtype=PLAN_DTYPE)
+    rows = []
+    start = 0
+    for plan, item in zip(plans, items):
+        boxes = _plan(plan, item)
+        plan["start"] = start
+        plan["count"] = len(boxes)
+        start += len(boxes)
+        rows.extend(boxes)
+    return plans, np.array(rows, dtype=BOX_DTYPE)
+
+
+def save(file, items:list) -> None:
+    """ Writes the instances and solutions to an archive (a path or a binary file) """
+    plans, boxes = to_arrays(items)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "wb") as f:
+            np.lib.format.write_array(f, plans)
+            np.lib.format.write_array(f, boxes)
+        return
+    np.lib.format.write_array(file, plans)
+    np.lib.format.write_array(file, boxes)
+
+
+def dumps(items:list) -> bytes:
+    """ Archive of the instances and solutions, as bytes """
+    f = io.BytesIO()
+    save(f, items)
+    return f.getvalue()
+
+
+def _layout(f) -> list:
+    # (dtype, shape, offset) of the two arrays, read from their headers
+    arrays = []
+    for _ in range(2):
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+        arrays.append((dtype, shape, offset))
+        f.seek(offset + dtype.itemsize * int(np.prod(shape)))
+    return arrays
+
+
+def load(path, ds) -> Archive:
+    """ Archive of a file, memory-mapped (read-only), read into the classes of `ds` """
+    with open(path, "rb") as f:
+        layout = _layout(f)
+    # An empty array cannot be mapped
+    return Archive(*(np.memmap(path, dtype, "r", offset, shape) if np.prod(shape) else np.zeros(shape, dtype)
+                     for dtype, shape, offset in layout), ds)
+
+
+def loads(data:bytes, ds) -> Archive:
+    """ Archive of bytes, read in place into the classes of `ds` """
+    layout = _layout(io.BytesIO(data))
+    return Archive(*(np.frombuffer(data, dtype, int(np.prod(shape)), offset).reshape(shape)
+                     for dtype, shape, offset in layout), ds)
@@ -0,0 +1,49 @@
+"""
+Instrumentation of a solve, shared by both solvers.
+"""
+
+import time
+
+class Stats:
+    """
+    Calls and time of the instrumented phases of a solve, and its counters
+    (corners evaluated, fit tests, failed placements, cells scanned).
+    Instrumented code only touches it when it is given one, so a solve
+    without Stats pays a single `is not None` test per phase.
+    """
+    def __init__(self) -> None:
+        self.calls = {}
+        self.times = {}
+        self.counters = {}
+
+    def add(self, phase:str, seconds:float) -> None:
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+
+    def lap(self, phase:str, start:float) -> float:
+        # Adds the time since `start` to the phase and returns the current time
+        now = time.perf_counter()
+        self.add(phase, now - start)
+        return now
+
+    def count(self, name:str, k:int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    def merge(self, other:"Stats") -> None:
+        for phase, calls in other.calls.items():
+            self.calls[phase] = self.calls.get(phase, 0) + calls
+            self.times[phase] = self.times.get(phase, 0.0) + other.times[phase]
+        for name, k in other.counters.items():
+            self.count(name, k)
+
+    def as_dict(self) -> dict:
+        return {"phases": {phase: {"calls": self.calls[phase], "time": self.times[phase]} for phase in self.calls},
+                "counters": dict(self.counters)}
+
+    def __str__(self) -> str:
+        result = "Stats:\n"
+        for phase in sorted(self.times, key=self.times.get, reverse=True):
+            result += f" > {phase}: {self.calls[phase]} calls, {self.times[phase]:.4f} s\n"
+        for name, k in self.counters.items():
+            result += f" > {name}: {k}\n"
+        return result
@@ -0,0 +1,12 @@
+# Both solvers have modules of the same names (data_structures, main, ...):
+# the tests of this directory import the ones next to them
+import os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for name in ("data_structures", "main", "utils"):
+    sys.modules.pop(name, None)
+sys.path.insert(0, HERE)
+# The modules shared by both solvers (common/) are in the parent directory
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -1,14 +1,41 @@
-import numpy as np 
-import matplotlib.pyplot as plt 
-from utils import create_cube
-import time, random
+import numpy as np
+import time, random, bisect, copy, math, os, sys, warnings
+
+# The modules shared with the ant colony (common/) are in the parent directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from common.extreme_points import ExtremePoints
+from common.load_distribution import envelope_gap, load_grid
+from common.stats import Stats
+
+# C placement kernel (common/placement_kernel.pyx) when it is built, else
+# None and the Solution computes the corners in pure Python
+try:
+    from common.placement_kernel import Kernel
+except ImportError as error:
+    warnings.warn(f"placement kernel not available ({error}), the corners are computed in pure Python: "
+                  f"build it with `python setup.py build_ext --inplace` in {ROOT}", RuntimeWarning)
+    Kernel = None
+
+# Placement engines of a Solution: the corners of the height map, or the
+# extreme points of the placed boxes
+PLACEMENTS = ("corners", "extreme_points")
+# Rotation rules of compute_position: turn a box when it lowers the loading
+# meters, whenever it fits turned, or never
+ROTATIONS = ("best", "always", "never")
+# Orders the corners are tried in: y then x, or x then y
+CORNER_ORDERS = ("yx", "xy")
 
 class Container:
-    def __init__(self,W:int,H:int,D:int,Wgt:int) -> None:
+    def __init__(self,W:int,H:int,D:int,Wgt:int, cogEnvelope:tuple = None) -> None:
         self.W = W
         self.H = H
         self.D = D
         self.Wgt = Wgt
+        # (xmin, xmax, ymin, ymax) the centre of gravity of the load must stay in (None: anywhere)
+        self.cogEnvelope = cogEnvelope
 
 class Corner:
     def __init__(self,
@@ -58,14 +85,29 @@ class Box:
         return result
 
 class Instance:
-    def __init__(self,n:int,w,h,d,wgt,ids,W:int,H:int,D:int,Wgt:int):
-        self.container = Container(W,H,D,Wgt)
+    def __init__(self,n:int,w,h,d,wgt,ids,W:int,H:int,D:int,Wgt:int, resolution:int = None,
+                 cogEnvelope:tuple = None, minSupport:float = 0.0):
+        self.container = Container(W,H,D,Wgt,cogEnvelope)
         self.n = n
         self.boxList = []
 
         for i in range(n):
             self.boxList.append(Box(0,0,0,w[i],h[i],d[i],wgt[i],ids[i]))
 
+        # Step of the corner computation: the largest one that divides every
+        # floor dimension (W, D and the w and d of the boxes), or the given one
+        common = math.gcd(W, D, *(box.w for box in self.boxList), *(box.d for box in self.boxList))
+        if resolution is None:
+            resolution = common
+        elif resolution <= 0 or common % resolution:
+            raise ValueError(f"resolution {resolution} does not divide the floor dimensions (their gcd is {common})")
+        self.resolution = max(int(resolution), 1)
+
+        # Fraction of the base of a box that has to rest on the boxes below (0: off)
+        if not 0 <= minSupport <= 1:
+            raise ValueError(f"minSupport {minSupport} is not between 0 and 1")
+        self.minSupport = minSupport
+
     @classmethod
     def init_example(self):
         W = 2550; H = 2700; D = 3950; Wgt = 30000
@@ -95,31 +137,458 @@ class Instance:
 
         return result
 
+def run_ends(values: np.ndarray) -> np.ndarray:
+    """
+    For every cell of a 2D array, the column index where its run of equal
+    values along axis 1 ends (exclusive).
+    """
+    n_rows, n_cols = values.shape
+    ends = np.full((n_rows, n_cols), n_cols)
+    ends[:, :-1] = np.where(values[:, 1:] != values[:, :-1], np.arange(1, n_cols), n_cols)
+    return np.minimum.accumulate(ends[:, ::-1], axis=1)[:, ::-1]
+
+class HeightMap:
+    """
+    Coordinate-compressed map of the container floor.
+
+    The floor is only cut along the box edges placed so far: `xs` and `ys`
+    are the sorted cut coordinates and `cells[i, j]` holds the value of the
+    area [xs[j], xs[j+1]) x [ys[i], ys[i+1]). Memory therefore grows with the
+    number of placed boxes and not with the container area.
+
+    With `runs` enabled, `runX[i, j]` (`runY[i, j]`) is the column (row)
+    index where the run of equal values starting at cell (i, j) ends along
+    x (y). They are refreshed in bulk when a footprint is stamped, so free
+    extents are answered without walking the cells.
+
+    The support index is the 2D segment tree of the C kernel: `supMax`,
+    `supMin` and `supArea` hold, for row node r and column node c, the max,
+    the min and the area at the max of the cells below them (leaves at
+    rows R..2R-1 and columns C..2C-1 for R x C cells). A footprint is then
+    answered in O(log^2) of the cells. A fill updates the nodes over its
+    block only; when it adds grid lines, the index is rebuilt on the next
+    query.
+    """
+    def __init__(self, W:int, D:int, runs:bool = True) -> None:
+        self.W = W
+        self.D = D
+        self.xs = [0, W]
+        self.ys = [0, D]
+        self.cells = np.zeros((1, 1))
+        self.runs = runs
+        if runs:
+            self.runX = np.ones((1, 1), dtype=np.intp)
+            self.runY = np.ones((1, 1), dtype=np.intp)
+        self.supMax = self.supMin = self.supArea = None
+        self.supportDirty = True
+
+    def _split_x(self, x:int) -> int:
+        # Cut the columns at x and return the index of the column starting at x
+        j = bisect.bisect_left(self.xs, x)
+        if self.xs[j] != x:
+            self.xs.insert(j, x)
+            self.cells = np.insert(self.cells, j, self.cells[:, j-1], axis=1)
+            self.supportDirty = True
+            if self.runs:
+                # The new column belongs to the same runs as the one it was cut from
+                self.runX[self.runX >= j] += 1
+                self.runX = np.insert(self.runX, j, self.runX[:, j-1], axis=1)
+                self.runY = np.insert(self.runY, j, self.runY[:, j-1], axis=1)
+        return j
+
+    def _split_y(self, y:int) -> int:
+        i = bisect.bisect_left(self.ys, y)
+        if self.ys[i] != y:
+            self.ys.insert(i, y)
+            self.cells = np.insert(self.cells, i, self.cells[i-1, :], axis=0)
+            self.supportDirty = True
+            if self.runs:
+                self.runY[self.runY >= i] += 1
+                self.runY = np.insert(self.runY, i, self.runY[i-1, :], axis=0)
+                self.runX = np.insert(self.runX, i, self.runX[i-1, :], axis=0)
+        return i
+
+    def _block(self, x_start:int, x_end:int, y_start:int, y_end:int):
+        j0 = self._split_x(x_start)
+        j1 = self._split_x(x_end)
+        i0 = self._split_y(y_start)
+        i1 = self._split_y(y_end)
+        return slice(i0, i1), slice(j0, j1)
+
+    def _update_runs(self, rows:slice, columns:slice) -> None:
+        # Only the stamped rows can change along x and the stamped columns along y
+        self.runX[rows] = run_ends(self.cells[rows])
+        self.runY[:, columns] = run_ends(self.cells[:, columns].T).T
+
+    def fill(self, x_start:int, x_end:int, y_start:int, y_end:int, value) -> None:
+        # Cut first: splitting reallocates `cells`
+        block = self._block(x_start, x_end, y_start, y_end)
+        self.cells[block] = value
+        self._changed(*block)
+
+    def stamp(self, x_start:int, x_end:int, y_start:int, y_end:int, value) -> None:
+        """
+        Sets value on the area, or its highest cell when that is higher: a
+        box never lowers its neighbours, as the stamp of the C kernel.
+        """
+        block = self._block(x_start, x_end, y_start, y_end)
+        self.cells[block] = max(value, self.cells[block].max())
+        self._changed(*block)
+
+    def _changed(self, rows:slice, columns:slice) -> None:
+        if self.runs:
+            self._update_runs(rows, columns)
+        if not self.supportDirty:
+            self._update_support(rows, columns)
+
+    def cell_index(self, x:int, y:int):
+        return bisect.bisect_right(self.ys, y) - 1, bisect.bisect_right(self.xs, x) - 1
+
+    def value_at(self, x:int, y:int):
+        i, j = self.cell_index(x, y)
+        return self.cells[i, j]
+
+    # Support index
+
+    def _pull_support(self, node:tuple, a:tuple, b:tuple) -> None:
+        # Nodes from their children a and b (indices of the same shape)
+        zmax = np.maximum(self.supMax[a], self.supMax[b])
+        self.supArea[node] = (np.where(self.supMax[a] == zmax, self.supArea[a], 0)
+                              + np.where(self.supMax[b] == zmax, self.supArea[b], 0))
+        self.supMin[node] = np.minimum(self.supMin[a], self.supMin[b])
+        self.supMax[node] = zmax
+
+    def _build_support(self) -> None:
+        # Leaves hold the cells, then each row is reduced along x and the
+        # rows are reduced along y, the nodes [lo, hi) of a pass having all
+        # their children in [hi, 2 x cells)
+        R, C = self.cells.shape
+        self.supMax = np.zeros((2 * R, 2 * C), dtype=self.cells.dtype)
+        self.supMin = np.zeros((2 * R, 2 * C), dtype=self.cells.dtype)
+        self.supArea = np.zeros((2 * R, 2 * C))
+        self.supMax[R:, C:] = self.supMin[R:, C:] = self.cells
+        self.supArea[R:, C:] = np.outer(np.diff(self.ys), np.diff(self.xs))
+        leaves = slice(R, 2 * R)
+        hi = C
+        while hi > 1:
+            c = np.arange((hi + 1) // 2, hi)
+            self._pull_support((leaves, c), (leaves, 2 * c), (leaves, 2 * c + 1))
+            hi = (hi + 1) // 2
+        columns = slice(1, 2 * C)
+        hi = R
+        while hi > 1:
+            r = np.arange((hi + 1) // 2, hi)
+            self._pull_support((r, columns), (2 * r, columns), (2 * r + 1, columns))
+            hi = (hi + 1) // 2
+        self.supportDirty = False
+
+    def _update_support(self, rows:slice, columns:slice) -> None:
+        # Cells of the block changed (the grid lines did not): only its
+        # leaves and their ancestors, along x then along y, are reduced again
+        R, C = self.cells.shape
+        leaves = slice(R + rows.start, R + rows.stop)
+        self.supMax[leaves, C + columns.start:C + columns.stop] = self.cells[rows, columns]
+        self.supMin[leaves, C + columns.start:C + columns.stop] = self.cells[rows, columns]
+        ancestors = [np.arange(C + columns.start, C + columns.stop)]
+        lo, hi = (C + columns.start) >> 1, (C + columns.stop - 1) >> 1
+        while lo >= 1:
+            c = np.arange(lo, hi + 1)
+            self._pull_support((leaves, c), (leaves, 2 * c), (leaves, 2 * c + 1))
+            ancestors.append(c)
+            lo, hi = lo >> 1, hi >> 1
+        c = np.concatenate(ancestors)
+        lo, hi = (R + rows.start) >> 1, (R + rows.stop - 1) >> 1
+        while lo >= 1:
+            r = np.arange(lo, hi + 1)[:, None]
+            self._pull_support((r, c), (2 * r, c), (2 * r + 1, c))
+            lo, hi = lo >> 1, hi >> 1
+
+    @staticmethod
+    def _spans(values:list, start:int, end:int) -> list:
+        # Cells (lo, hi, fraction) under [start, end), as at most 3 spans: the
+        # first and the last cell with the fraction of them it covers, and the ones between
+        first = bisect.bisect_right(values, start) - 1
+        last = bisect.bisect_left(values, end) - 1
+        if first == last:
+            return [(first, first + 1, (end - start) / (values[first + 1] - values[first]))]
+        spans = [(first, first + 1, (values[first + 1] - start) / (values[first + 1] - values[first]))]
+        if last > first + 1:
+            spans.append((first + 1, last, 1.0))
+        spans.append((last, last + 1, (end - values[last]) / (values[last + 1] - values[last])))
+        return spans
+
+    def _query_support(self, i0:int, i1:int, j0:int, j1:int, scale:float, acc:list) -> None:
+        # Merges the cells of rows [i0, i1) and columns [j0, j1) into acc, their areas times scale
+        R, C = self.cells.shape
+        rlo, rhi = i0 + R, i1 + R
+        while rlo < rhi:
+            if rlo & 1:
+                row = rlo
+                rlo += 1
+            elif rhi & 1:
+                rhi -= 1
+                row = rhi
+            else:
+                rlo >>= 1
+                rhi >>= 1
+                continue
+            lo, hi = j0 + C, j1 + C
+            nodes = []
+            while lo < hi:
+                if lo & 1:
+                    nodes.append(lo)
+                    lo += 1
+                if hi & 1:
+                    hi -= 1
+                    nodes.append(hi)
+                lo >>= 1
+                hi >>= 1
+            for node in nodes:
+                zmax = self.supMax[row, node]
+                if zmax > acc[0]:
+                    acc[0], acc[2] = zmax, scale * self.supArea[row, node]
+                elif zmax == acc[0]:
+                    acc[2] += scale * self.supArea[row, node]
+                acc[1] = min(acc[1], self.supMin[row, node])
+
+    def support(self, x:int, y:int, w:int, d:int):
+        """
+        (highest, lowest, area at the highest) of the values under the w x d
+        footprint at (x, y), the cells it partly covers counting for the
+        covered part, from the support index in O(log^2) of the cells.
+        """
+        if self.supportDirty:
+            self._build_support()
+        acc = [-np.inf, np.inf, 0.0]
+        for i0, i1, rowFraction in self._spans(self.ys, y, y + d):
+            for j0, j1, colFraction in self._spans(self.xs, x, x + w):
+                self._query_support(i0, i1, j0, j1, rowFraction * colFraction, acc)
+        return acc[0], acc[1], float(acc[2])
+
+    def scan_x(self, x_start:int, y:int, level, step:int, stats:"Stats" = None) -> int:
+        """
+        Width reached by stepping `step` units to the right of (x_start, y)
+        while the value stays equal to `level`, as the dense while-loop did.
+        """
+        i, j = self.cell_index(x_start, y)
+        w = 0
+        cells = 0
+        while x_start + w < self.W:
+            cells += 1
+            if self.cells[i, j] != level:
+                break
+            # Jump to the first step sample after the run of equal values
+            w += -(-(self.xs[self.runX[i, j]] - x_start - w) // step) * step
+            j = bisect.bisect_right(self.xs, x_start + w, j) - 1
+        if stats is not None:
+            stats.count("cells scanned", cells)
+        return w
+
+    def scan_y(self, x:int, y_start:int, level, step:int, stats:"Stats" = None) -> int:
+        i, j = self.cell_index(x, y_start)
+        d = 0
+        cells = 0
+        while y_start + d < self.D:
+            cells += 1
+            if self.cells[i, j] != level:
+                break
+            d += -(-(self.ys[self.runY[i, j]] - y_start - d) // step) * step
+            i = bisect.bisect_right(self.ys, y_start + d, i) - 1
+        if stats is not None:
+            stats.count("cells scanned", cells)
+        return d
+
+    def copy(self) -> "HeightMap":
+        other = copy.copy(self)
+        other.xs = list(self.xs)
+        other.ys = list(self.ys)
+        other.cells = self.cells.copy()
+        if self.runs:
+            other.runX = self.runX.copy()
+            other.runY = self.runY.copy()
+        if self.supMax is not None:
+            other.supMax, other.supMin, other.supArea = self.supMax.copy(), self.supMin.copy(), self.supArea.copy()
+        return other
+
+    def nbytes(self) -> int:
+        size = self.cells.nbytes + 8 * (len(self.xs) + len(self.ys))
+        if self.runs:
+            size += self.runX.nbytes + self.runY.nbytes
+        if self.supMax is not None:
+            size += self.supMax.nbytes + self.supMin.nbytes + self.supArea.nbytes
+        return size
+
+class CornerIndex:
+    """
+    Corners in the order they are tried in, stored at the leaves of a segment tree whose
+    nodes keep the maximum w, d and h found below them. `first_fit` skips
+    every subtree whose maxima already rule a box out, so the first corner
+    a box fits in is found without sorting or scanning the corner list.
+    """
+    def __init__(self, corners:list, sizes) -> None:
+        self.build(corners, sizes)
+
+    def build(self, corners:list, sizes) -> None:
+        # sizes: (w, d, h) of each corner, in the same order as `corners`
+        self.corners = corners
+        n = len(corners)
+        self.size = 1 << max(n - 1, 0).bit_length()
+
+        tree = np.full((2 * self.size, 3), -1.0)
+        tree[self.size:self.size + n] = sizes
+        level = self.size
+        while level > 1:
+            tree[level // 2:level] = np.maximum(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+            level //= 2
+        self.maxW, self.maxD, self.maxH = (tree[:, k].tolist() for k in range(3))
+
+    def update(self, position:int, corner:Corner) -> None:
+        self.corners[position] = corner
+        node = position + self.size
+        self.maxW[node], self.maxD[node], self.maxH[node] = corner.w, corner.d, corner.h
+        node //= 2
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            self.maxW[node] = max(self.maxW[left], self.maxW[right])
+            self.maxD[node] = max(self.maxD[left], self.maxD[right])
+            self.maxH[node] = max(self.maxH[left], self.maxH[right])
+            node //= 2
+
+    def copy(self) -> "CornerIndex":
+        other = copy.copy(self)
+        other.corners = list(self.corners)
+        other.maxW, other.maxD, other.maxH = list(self.maxW), list(self.maxD), list(self.maxH)
+        return other
+
+    def first_fit(self, w, d, h, rotation:bool = False, stats:"Stats" = None, accept = None,
+                  deadline:float = None):
+        """
+        First corner (in the index order) with w, d and h at least as large as
+        the box, or None. With `rotation`, the box may also be turned so that
+        its w goes along the corner depth. `accept(corner)` can refuse such a
+        corner (None) or return the corner to use instead. Past `deadline` (a
+        time.perf_counter() value), no other corner is accepted.
+        """
+        maxW, maxD, maxH = self.maxW, self.maxD, self.maxH
+        stack = [1]
+        corner = None
+        tests = 0
+        while stack:
+            node = stack.pop()
+            tests += 1
+            if maxH[node] < h:
+                continue
+            if not ((maxW[node] >= w and maxD[node] >= d)
+                    or (rotation and maxW[node] >= d and maxD[node] >= w)):
+                continue
+            if node >= self.size:
+                if deadline is not None and time.perf_counter() > deadline:
+                    corner = None
+                    break
+                corner = self.corners[node - self.size]
+                if accept is not None:
+                    corner = accept(corner)
+                    if corner is None:
+                        continue
+                break
+            stack.append(2 * node + 1)
+            stack.append(2 * node)
+        if stats is not None:
+            stats.count("fit tests", tests)
+        return corner
+
 class Solution:
-    def __init__(self,instance:Instance, vizualisation: bool = False) -> None:
+    # Attributes changed by add_box, shared copy-on-write between snapshots
+    STATE = ("totalWeight", "totalHeight", "totalDeep", "totalWidth", "boxList",
+             "heightMatrix", "cornerList", "coordonateXList", "coordonateYList",
+             "cornerGrid", "cornerRight", "cornerReach", "cornerSize", "cornerLeaf", "cornerIndex",
+             "colors_dict", "gravityCenter")
+    # Same with the placement kernel, which holds the height maps and the corners
+    KERNEL_STATE = ("totalWeight", "totalHeight", "totalDeep", "totalWidth", "boxList",
+                    "coordonateXList", "coordonateYList", "kernel", "colors_dict", "gravityCenter")
+    # Same with the extreme points
+    EXTREME_POINTS_STATE = ("totalWeight", "totalHeight", "totalDeep", "totalWidth", "boxList",
+                            "coordonateXList", "coordonateYList", "extremePoints", "colors_dict", "gravityCenter")
+
+    def __init__(self,instance:Instance, vizualisation: bool = False,
+                 incremental: bool = True, debugCorners: bool = False, undo: bool = False,
+                 stats: Stats = None, useKernel: bool = True, placement: str = "corners",
+                 rotation: str = "best", cornerOrder: str = "yx") -> None:
+        if placement not in PLACEMENTS:
+            raise ValueError(f"placement must be one of {PLACEMENTS}, not {placement!r}")
+        if rotation not in ROTATIONS:
+            raise ValueError(f"rotation must be one of {ROTATIONS}, not {rotation!r}")
+        if cornerOrder not in CORNER_ORDERS:
+            raise ValueError(f"cornerOrder must be one of {CORNER_ORDERS}, not {cornerOrder!r}")
         self.nTotalBox = instance.n
         self.container = instance.container
+        self.resolution = instance.resolution
+        self.minSupport = instance.minSupport
         self.totalWeight = 0
         self.totalHeight = 0
         self.totalDeep = 0
         self.totalWidth = 0
         self.boxList = []
-        self.heightMatrix = np.zeros((self.container.D, self.container.W))
-        self.wheightMatrix = np.zeros((self.container.D, self.container.W))
+        self.coordonateXList = []
+        self.coordonateYList = []
+        # Rules of compute_position: when a box is turned, and the order
+        # first_fit_corner tries the corners in
+        self.rotation = rotation
+        self.cornerOrder = cornerOrder
+
+        # Extreme points (placement="extreme_points"), else the corners of the
+        # height map: C kernel (without the GIL) when it is built, else the
+        # structures below
+        self.placement = placement
+        self.extremePoints = None
+        self.kernel = None
+        if placement == "extreme_points":
+            self.extremePoints = ExtremePoints(self.container.W, self.container.H, self.container.D, self.minSupport)
+            self.state = self.EXTREME_POINTS_STATE
+        else:
+            if useKernel and Kernel is not None:
+                self.kernel = Kernel(self.container.W, self.container.H, self.container.D, True, incremental,
+                                     self.resolution, self.minSupport)
+            self.state = self.STATE if self.kernel is None else self.KERNEL_STATE
+
+        # Height map of the Python corner engine (the kernel keeps its own, the
+        # extreme points build one on demand with top_view)
+        self.heightMatrix = None
+        if self.kernel is None and self.extremePoints is None:
+            self.heightMatrix = HeightMap(self.container.W, self.container.D)
 
         self.cornerList = []
         self.cornerList.append(Corner(
             x = 0, y = 0, z = 0,
             w = self.container.W, d = self.container.D, h = self.container.H))
-        self.coordonateXList = []
-        self.coordonateYList = []
+        # Corners on the coordonateYList x coordonateXList grid, with the
+        # right end and the last y sampled by each of them
+        self.cornerGrid = np.full((0, 0), None, dtype=object)
+        self.cornerRight = np.zeros((0, 0), dtype=np.int64)
+        self.cornerReach = np.zeros((0, 0), dtype=np.int64)
+        self.cornerSize = np.zeros((0, 0, 3))
+        self.cornerLeaf = np.zeros((0, 0), dtype=np.int64)
+        self.cornerIndex = CornerIndex(list(self.cornerList), [[self.container.W, self.container.D, self.container.H]])
+        self.incremental = incremental
+        self.debugCorners = debugCorners
+        # Instrumentation of add_box and the corner computation (None: off)
+        self.stats = stats
         self.colors_dict = {} 
 
         self.gravityCenter = [np.array([0,0]),0]
+
+        # True while the state is shared with a snapshot or a clone
+        self.shared = False
+        # Snapshots taken before each add_box, to undo them
+        self.undoLog = [] if undo else None
         
-        if vizualisation :
-            self.fig = plt.figure()
-            self.ax = self.fig.add_subplot(111, projection='3d')
+        # Figure of vizualise_3D_dynamic, created by its first call (matplotlib
+        # is only imported by the vizualise_* methods)
+        self.fig = None
+        self.ax = None
+        # Boxes already drawn on it, and the bounding box of the load drawn last
+        self.drawn = 0
+        self.loadCube = None
         
     def evaluate(self) :
         # Number of boxes taken
@@ -129,7 +598,64 @@ class Solution:
         goodCenterPoint = np.array([self.container.W/2, self.container.D/2])
         return np.linalg.norm(goodCenterPoint - self.gravityCenter[0])
     
+    def snapshot(self) -> dict:
+        """
+        Returns the current state of the solution. It stays shared with the
+        solution until one of them is changed (copy-on-write), so taking a
+        snapshot does not copy anything.
+        """
+        self.shared = True
+        return {name: getattr(self, name) for name in self.state}
+
+    def restore(self, snapshot:dict) -> None:
+        for name, value in snapshot.items():
+            setattr(self, name, value)
+        self.shared = True
+
+    def clone(self) -> "Solution":
+        other = copy.copy(self)
+        other.restore(self.snapshot())
+        other.undoLog = [] if self.undoLog is not None else None
+        return other
+
+    def unshare(self) -> None:
+        # Copy the state shared with snapshots before changing it
+        self.boxList = list(self.boxList)
+        self.coordonateXList = list(self.coordonateXList)
+        self.coordonateYList = list(self.coordonateYList)
+        self.colors_dict = dict(self.colors_dict)
+        self.shared = False
+        if self.extremePoints is not None:
+            self.extremePoints = self.extremePoints.copy()
+            return
+        if self.kernel is not None:
+            self.kernel = self.kernel.copy()
+            return
+        self.heightMatrix = self.heightMatrix.copy()
+        self.cornerGrid = self.cornerGrid.copy()
+        self.cornerRight = self.cornerRight.copy()
+        self.cornerReach = self.cornerReach.copy()
+        self.cornerSize = self.cornerSize.copy()
+        self.cornerIndex = self.cornerIndex.copy()
+
+    def undo(self) -> Box:
+        """
+        Removes the last box added and returns it (needs Solution(undo=True)).
+        """
+        box = self.boxList[-1]
+        self.restore(self.undoLog.pop())
+        return box
+
     def add_box(self, box:Box) -> None:
+        stats = self.stats
+        if stats is not None:
+            start = t = time.perf_counter()
+
+        if self.undoLog is not None:
+            self.undoLog.append(self.snapshot())
+        if self.shared:
+            self.unshare()
+
         self.boxList.append(box)
 
         self.totalWeight += box.wgt
@@ -147,59 +673,349 @@ class Solution:
             self.colors_dict[box.id] = (random.random(), random.random(), random.random())
 
         # Add corners of the box to compute corners
-        self.coordonateXList.append(box.x) if box.x not in self.coordonateXList else None
-        self.coordonateXList.append(box.x + box.w) if box.x + box.w not in self.coordonateXList else None
-        self.coordonateYList.append(box.y) if box.y not in self.coordonateYList else None 
-        self.coordonateYList.append(box.y + box.d) if box.y + box.d not in self.coordonateYList else None
+        newXList = [x for x in dict.fromkeys((box.x, box.x + box.w)) if x not in self.coordonateXList]
+        newYList = [y for y in dict.fromkeys((box.y, box.y + box.d)) if y not in self.coordonateYList]
+        self.coordonateXList.extend(newXList)
+        self.coordonateYList.extend(newYList)
         
+        if stats is not None:
+            t = stats.lap("add_box bookkeeping", t)
+
+        engine = self.kernel if self.extremePoints is None else self.extremePoints
+        if engine is not None:
+            engine.add_box(box.x, box.y, box.z, box.w, box.d, box.h, box.wgt)
+            if stats is not None:
+                t = stats.lap("place", t)
+                self.count_kernel()
+            if self.debugCorners:
+                self.check_cornerList()
+            if stats is not None:
+                stats.lap("add_box", start)
+            return
+
         self.update_heightMatrix(box)
-        self.recompute_cornerList()
+        if stats is not None:
+            t = stats.lap("update_heightMatrix", t)
+
+        if self.incremental:
+            self.update_cornerList(box)
+            if stats is not None:
+                t = stats.lap("update_cornerList", t)
+        else:
+            self.recompute_cornerList()
+            if stats is not None:
+                t = stats.lap("recompute_cornerList", t)
+
+        if self.debugCorners:
+            self.check_cornerList()
+
+        if stats is not None:
+            stats.lap("add_box", start)
+
+    def first_fit_corner(self, w:int, d:int, h:int, rotation:bool = False, deadline:float = None) -> Corner:
+        """
+        First corner (in (y, x) order, (x, y) with cornerOrder="xy") a
+        w x d x h box fits in, or None.
+        z and h of the corner are the ones of the box on top of its footprint
+        at the corner point, which has to support at least minSupport of its
+        base (see is_supported). With the extreme points, the
+        corner is the first point the box fits at and its residual space.
+        Past `deadline` (a time.perf_counter() value) the search gives up and
+        returns None.
+        """
+        xFirst = self.cornerOrder == "xy"
+        if self.extremePoints is not None:
+            corner = self.extremePoints.first_fit(w, d, h, rotation, deadline, xFirst)
+            if self.stats is not None:
+                self.count_kernel()
+            return None if corner is None else Corner(*corner)
+        if self.kernel is None:
+            accept = lambda corner: self.supported_corner(corner, w, d, h, rotation)
+            return self.cornerIndex.first_fit(w, d, h, rotation, self.stats, accept, deadline)
+        if deadline is None:
+            corner = self.kernel.first_fit(w, d, h, rotation, xFirst=xFirst)
+        else:
+            # The kernel is given the time left
+            timeLeft = deadline - time.perf_counter()
+            corner = self.kernel.first_fit(w, d, h, rotation, timeLeft, xFirst) if timeLeft > 0 else None
+        if self.stats is not None:
+            self.count_kernel()
+        return None if corner is None else Corner(*corner)
+
+    def corner_array(self) -> np.ndarray:
+        """ (n, 6) int64 array of the x, y, z, w, d, h of the corners, in the order of get_cornerList """
+        if self.extremePoints is not None:
+            return self.extremePoints.points.copy()
+        if self.kernel is not None:
+            return self.kernel.corner_array()
+        return np.array([(c.x, c.y, c.z, c.w, c.d, c.h) for c in self.cornerList], dtype=np.int64).reshape(-1, 6)
+
+    def fit_matrix(self, boxes) -> tuple:
+        """
+        Every box against every corner of corner_array() in one call. boxes is
+        a list of Box or an (m, 3) array of their w, d, h. Returns (m, n)
+        arrays (fits, fitsRotated, score): whether the box fits in the space
+        of the corner as it is (fitInCorner) and turned so that its w goes
+        along y, and the loading meters (totalWidth + totalDeep) with the box
+        at the corner in the best orientation that fits (inf if none does).
+        As with fitInCorner, the support of the box is not checked.
+        """
+        corners = self.corner_array()
+        if not isinstance(boxes, np.ndarray):
+            boxes = np.array([(box.w, box.d, box.h) for box in boxes], dtype=np.int64).reshape(-1, 3)
+        w, d, h = (boxes[:, k, None] for k in range(3))
+        x, y, cw, cd, ch = (corners[None, :, k] for k in (0, 1, 3, 4, 5))
+        fits = (w <= cw) & (d <= cd) & (h <= ch)
+        fitsRotated = (d <= cw) & (w <= cd) & (h <= ch)
+        score = np.where(fits, np.maximum(self.totalWidth, x + w) + np.maximum(self.totalDeep, y + d), np.inf)
+        scoreRotated = np.where(fitsRotated, np.maximum(self.totalWidth, x + d) + np.maximum(self.totalDeep, y + w), np.inf)
+        return fits, fitsRotated, np.minimum(score, scoreRotated)
+
+    def supported_corner(self, corner:Corner, w:int, d:int, h:int, rotation:bool = False) -> Corner:
+        # The corner with the box on top of its footprint, None if it is not supported
+        for boxW, boxD in ((w, d), (d, w)) if rotation else ((w, d),):
+            if corner.w >= boxW and corner.d >= boxD:
+                supported, z = self.is_supported(corner.x, corner.y, boxW, boxD, h)
+                if supported:
+                    return Corner(corner.x, corner.y, z, corner.w, corner.d, self.container.H - z)
+        return None
+
+    def support(self, x:int, y:int, w:int, d:int) -> tuple:
+        """
+        (highest, lowest, area at the highest) of the height map under the
+        w x d footprint at (x, y). From the support index of the C kernel
+        when it is used, else from the one of the height map (see
+        HeightMap.support), or of the top view built on demand with the
+        extreme points (which check support in ExtremePoints.fits).
+        """
+        if self.kernel is not None:
+            return self.kernel.support(x, y, w, d)
+        return (self.heightMatrix if self.extremePoints is None else self.top_view()).support(x, y, w, d)
+
+    def is_supported(self, x:int, y:int, w:int, d:int, h:int) -> tuple:
+        """
+        (whether a w x d x h box at (x, y), lowered onto the highest cell under
+        its footprint, fits under the roof and rests on at least minSupport of
+        its base, the z it rests at).
+        """
+        if self.kernel is not None:
+            return self.kernel.is_supported(x, y, w, d, h)
+        if w <= 0 or d <= 0 or x < 0 or y < 0 or x + w > self.container.W or y + d > self.container.D:
+            return False, -1
+        zmax, _, area = self.support(x, y, w, d)
+        return zmax + h <= self.container.H and area >= (self.minSupport - 1e-9) * w * d, zmax
+
+    def turns(self, box:Box, corner:Corner) -> bool:
+        """ Whether compute_position turns the box at the corner, by the rotation rule """
+        if self.rotation == "never" or not box.possible_rotation(corner):
+            return False
+        return self.rotation == "always" or corner.is_betterWithRotation(self, box)
+
+    def settle(self, box:Box) -> bool:
+        """
+        Lowers the box onto the highest cell under its footprint and returns
+        whether it is supported (see is_supported), so that it never cuts
+        into a taller neighbour. With the extreme points, whether the box
+        fits where it is (see ExtremePoints.fits).
+        """
+        if self.extremePoints is not None:
+            return self.extremePoints.fits(box.x, box.y, box.z, box.w, box.d, box.h)
+        supported, z = self.is_supported(box.x, box.y, box.w, box.d, box.h)
+        if supported:
+            box.z = z
+        return supported
+
+    def count_kernel(self) -> None:
+        engine = self.kernel if self.extremePoints is None else self.extremePoints
+        cornersEvaluated, fitTests, cellsScanned = engine.take_counters()
+        if cornersEvaluated:
+            self.stats.count("corners evaluated", cornersEvaluated)
+            self.stats.count("cells scanned", cellsScanned)
+        if fitTests:
+            self.stats.count("fit tests", fitTests)
+
+    def get_cornerList(self) -> list:
+        if self.extremePoints is not None:
+            return [Corner(*corner) for corner in self.extremePoints.corners()]
+        if self.kernel is None:
+            return self.cornerList
+        return [Corner(*corner) for corner in self.kernel.corners()]
+
+    def get_heightMatrix(self):
+        """ (xs, ys, cells) of the coordinate-compressed height map """
+        if self.extremePoints is not None:
+            heightMap = self.top_view()
+            return heightMap.xs, heightMap.ys, heightMap.cells
+        if self.kernel is None:
+            return self.heightMatrix.xs, self.heightMatrix.ys, self.heightMatrix.cells
+        return self.kernel.height_map()
+
+    def top_view(self) -> HeightMap:
+        # Height map of the placed boxes, built on demand for the extreme points
+        heightMap = HeightMap(self.container.W, self.container.D, runs=False)
+        for box in sorted(self.boxList, key= lambda box : box.z + box.h):
+            heightMap.fill(box.x, box.x + box.w, box.y, box.y + box.d, box.z + box.h)
+        return heightMap
+
+    def get_wheightMatrix(self):
+        return self.load_distribution()
+
+    def load_distribution(self, resolution:int = None):
+        """
+        (xs, ys, loads) of the floor cut in resolution x resolution cells (the
+        resolution of the instance by default): cell (i, j) covers
+        [xs[j], xs[j+1]) x [ys[i], ys[i+1]) and carries the weight of the boxes
+        spread evenly over their footprint. Computed from boxList on each call;
+        loads.sum(axis=1) is the load profile along the depth.
+        """
+        boxes = np.array([(box.x, box.y, box.w, box.d, box.wgt) for box in self.boxList], dtype=float).reshape(-1, 5)
+        return load_grid(boxes, self.container.W, self.container.D, resolution or self.resolution)
+
+    def axle_loads(self, front:float, rear:float) -> tuple:
+        """
+        (front load, rear load) on two supports at depths front < rear (e.g.
+        kingpin and rear axle group), from the centre of gravity of the load.
+        """
+        rearLoad = self.totalWeight * (self.gravityCenter[0][1] - front) / (rear - front)
+        return self.totalWeight - rearLoad, rearLoad
+
+    def can_carry(self, box:Box) -> bool:
+        """
+        Whether the load stays within the weight limit of the container with
+        box at its position, and its centre of gravity within the envelope of
+        the container (or no further from it than without the box), in O(1).
+        """
+        weight = self.totalWeight + box.wgt
+        if weight > self.container.Wgt:
+            return False
+        envelope = self.container.cogEnvelope
+        if envelope is None or weight == 0:
+            return True
+        gcCdnt, gcWgt = self.gravityCenter
+        x = (gcCdnt[0] * gcWgt + box.centerPoint[0] * box.wgt) / weight
+        y = (gcCdnt[1] * gcWgt + box.centerPoint[1] * box.wgt) / weight
+        # The first boxes start outside: they may not move it away from the envelope
+        return gcWgt == 0 or envelope_gap(envelope, x, y) <= envelope_gap(envelope, gcCdnt[0], gcCdnt[1])
 
     def recompute_cornerList(self) -> None:
-        self.cornerList = []
+        nY, nX = len(self.coordonateYList), len(self.coordonateXList)
+        self.cornerGrid = np.full((nY, nX), None, dtype=object)
+        self.cornerRight = np.zeros((nY, nX), dtype=np.int64)
+        self.cornerReach = np.zeros((nY, nX), dtype=np.int64)
+        self.cornerSize = np.zeros((nY, nX, 3))
 
-        for y in self.coordonateYList:
-            for x in self.coordonateXList:
+        for iy, y in enumerate(self.coordonateYList):
+            for ix, x in enumerate(self.coordonateXList):
                 if (y<self.container.D and x<self.container.W):
-                    self.computeCorner(x,y)
-                    
+                    self.store_corner(iy, ix)
 
-    def computeCorner(self,x_start:int,y_start:int) -> None :
-        ground_level = self.heightMatrix[y_start,x_start]
-        w = 0
-        d = 0
-        # d_min = self.container.D
-
-        # # Space at right side
-        # while ((x_start+w)<=(self.container.W-10)
-        #         and self.heightMatrix[y_start+d, x_start+w] == ground_level
-        #        ):
-        #     while ((y_start+d)<=(self.container.D-10)
-        #         and self.heightMatrix[y_start+d, x_start+w] == ground_level
-        #        ):
-        #         d += 10
-                
-        #     if d < d_min :
-        #         d_min = d
-
-        #     d = 0
-        #     w += 10
+        self.collect_cornerList()
 
-        w = 0
-        d1 = 0
-        d2 = 0
-        while (x_start + w) < self.container.W and self.heightMatrix[y_start,x_start+w] == ground_level:
-            w+=10
-            
-        while (y_start + d1) < self.container.D and self.heightMatrix[y_start + d1, x_start] == ground_level:
-            d1 += 10
+    def update_cornerList(self, box:Box) -> None:
+        """
+        Recompute only the corners whose scanned area meets the footprint of
+        `box` (or its edge lines), plus the corners created by its new
+        coordinates. The other corners keep their previous values.
+        """
+        nY, nX = len(self.coordonateYList), len(self.coordonateXList)
+        oldY, oldX = self.cornerGrid.shape
+        grow = ((0, nY - oldY), (0, nX - oldX))
+        self.cornerGrid = np.pad(self.cornerGrid, grow, constant_values=None)
+        self.cornerRight = np.pad(self.cornerRight, grow)
+        self.cornerReach = np.pad(self.cornerReach, grow)
+        self.cornerSize = np.pad(self.cornerSize, grow + ((0, 0),))
+
+        X = np.array(self.coordonateXList)
+        Y = np.array(self.coordonateYList)
+        stale = ((box.x <= self.cornerRight) & (X < box.x + box.w)
+                 & (box.y <= self.cornerReach) & (Y < box.y + box.d)[:, None])
+        stale[oldY:, :] = True
+        stale[:, oldX:] = True
+        stale &= (Y < self.container.D)[:, None] & (X < self.container.W)
+
+        staleCells = list(zip(*np.nonzero(stale)))
+        for iy, ix in staleCells:
+            self.store_corner(iy, ix)
+
+        if nY > oldY or nX > oldX:
+            self.collect_cornerList()
+        else:
+            # Same corner positions: only refresh the changed leaves of the index
+            valid = np.ix_(Y < self.container.D, X < self.container.W)
+            self.cornerList = self.cornerGrid[valid].ravel().tolist()
+            for iy, ix in staleCells:
+                self.cornerIndex.update(self.cornerLeaf[iy, ix], self.cornerGrid[iy, ix])
+
+    def store_corner(self, iy:int, ix:int) -> None:
+        corner, y_reach = self.computeCorner(self.coordonateXList[ix], self.coordonateYList[iy])
+        self.cornerGrid[iy, ix] = corner
+        self.cornerRight[iy, ix] = corner.x + corner.w
+        self.cornerReach[iy, ix] = y_reach
+        self.cornerSize[iy, ix] = (corner.w, corner.d, corner.h)
+
+    def collect_cornerList(self) -> None:
+        X = np.array(self.coordonateXList)
+        Y = np.array(self.coordonateYList)
+        validX = np.flatnonzero(X < self.container.W)
+        validY = np.flatnonzero(Y < self.container.D)
+        valid = np.ix_(validY, validX)
+
+        # Same order as a full recompute: coordonateYList major, then coordonateXList
+        corners = self.cornerGrid[valid].ravel()
+        self.cornerList = corners.tolist()
+
+        # The index keeps them in the order first_fit_corner tries them
+        keys = (np.tile(X[validX], len(validY)), np.repeat(Y[validY], len(validX)))
+        order = np.lexsort(keys if self.cornerOrder == "yx" else keys[::-1])
+        self.cornerIndex.build(corners[order].tolist(), self.cornerSize[valid].reshape(-1, 3)[order])
+        self.cornerLeaf = np.full(self.cornerGrid.shape, -1, dtype=np.int64)
+        self.cornerLeaf[valid] = np.argsort(order).reshape(len(validY), len(validX))
+
+    def check_cornerList(self) -> None:
+        # Debug: compare the current corners with a full recompute
+        if self.extremePoints is not None:
+            self.extremePoints.check()
+            return
+        if self.kernel is not None:
+            current = self.kernel.corners()
+            self.kernel.recompute()
+            if current != self.kernel.corners():
+                raise RuntimeError(f"Incremental corner list differs from full recompute after {len(self.boxList)} boxes")
+            return
+        current = [(c.x, c.y, c.z, c.w, c.d, c.h) for c in self.cornerList]
+        self.recompute_cornerList()
+        expected = [(c.x, c.y, c.z, c.w, c.d, c.h) for c in self.cornerList]
+        if current != expected:
+            raise RuntimeError(f"Incremental corner list differs from full recompute after {len(self.boxList)} boxes")
+
+    def computeCorner(self,x_start:int,y_start:int):
+        """
+        Returns the corner at (x_start, y_start) and the last y it sampled,
+        which bounds the area a later placement has to touch to change it.
+        """
+        if self.kernel is not None:
+            corner, y_reach = self.kernel.computeCorner(x_start, y_start)
+            return Corner(*corner), y_reach
+
+        stats = self.stats
+        if stats is not None:
+            t = time.perf_counter()
+            stats.count("corners evaluated")
+
+        ground_level = self.heightMatrix.value_at(x_start, y_start)
+
+        # Free space at the right side and at the back of the corner
+        w = self.heightMatrix.scan_x(x_start, y_start, ground_level, self.resolution, stats)
+        d1 = self.heightMatrix.scan_y(x_start, y_start, ground_level, self.resolution, stats)
 
         new_start = x_start + w -1
-        while (y_start + d2) < self.container.D and self.heightMatrix[y_start + d2, new_start] == ground_level:
-            d2 += 10
+        d2 = self.heightMatrix.scan_y(new_start, y_start, ground_level, self.resolution, stats)
 
         d_min = min(d1,d2)
-        self.cornerList.append(Corner(x_start,y_start,ground_level,w,d_min,self.container.H - ground_level))
+        corner = Corner(x_start,y_start,ground_level,w,d_min,self.container.H - ground_level)
+        if stats is not None:
+            stats.lap("computeCorner", t)
+        return corner, y_start + max(d1, d2)
     
     def update_heightMatrix(self, box:Box) -> None:
 
@@ -209,70 +1025,64 @@ class Solution:
         y_end = y_start + box.d 
         height = box.z + box.h 
 
-        self.heightMatrix[y_start:y_end,x_start:x_end] = max(height,self.heightMatrix[y_start,x_start])
-        self.wheightMatrix[y_start:y_end,x_start:x_end] += box.wgt
+        self.heightMatrix.stamp(x_start, x_end, y_start, y_end, height)
 
     def vizualise_3D(self) -> None:
-        fig = plt.figure()
+        import matplotlib.pyplot as plt
+        from utils import box_array, create_cubes, setup_axes
 
+        fig = plt.figure()
         ax = fig.add_subplot(111, projection='3d')
-        W = self.container.W
-        D = self.container.D
-        H = self.container.H
-        
-        # Add limits on each axes
-        l = max(W,D,H)
-        ax.auto_scale_xyz([0,l], [0,l], [0,l])
-        # Add labels to axes
-        ax.set_xlabel('X')
-        ax.set_ylabel('Y')
-        ax.set_zlabel('Z')
- 
-        # Create each cubes
-        for box in self.boxList:
-            ax = create_cube(box.w, box.d, box.h, box.x, box.y, box.z, ax, 0.9, self.colors_dict[box.id])
+        setup_axes(ax, self.container.W, self.container.D, self.container.H)
 
-        # Create container
-        ax = create_cube(W,D,H,0,0,0,ax,0,(0,0,0))
+        # All the boxes in one collection
+        if self.boxList:
+            create_cubes(box_array(self.boxList), ax, 0.9, [self.colors_dict[box.id] for box in self.boxList])
 
-        
         plt.show()
 
     def vizualise_3D_dynamic(self) -> None:
-        self.ax.clear()  # Effacez le contenu précédent du graphique
+        """
+        Draws the boxes added since the last call on the figure of the
+        previous calls (created by the first one), and the bounding box of
+        the load.
+        """
+        import matplotlib.pyplot as plt
+        from utils import box_array, create_cubes, setup_axes
 
-        W = self.container.W
-        D = self.container.D
-        H = self.container.H
-        
-        # Ajouter des limites sur chaque axe
-        l = max(W, D, H)
-        self.ax.auto_scale_xyz([0, l], [0, l], [0, l])
-
-        # Ajouter des labels aux axes
-        self.ax.set_xlabel('X')
-        self.ax.set_ylabel('Y')
-        self.ax.set_zlabel('Z')
-        
-  
+        if self.ax is None:
+            self.fig = plt.figure()
+            self.ax = self.fig.add_subplot(111, projection='3d')
+            setup_axes(self.ax, self.container.W, self.container.D, self.container.H)
 
-        # Créer chaque cube
-        for box in self.boxList:
-            self.ax = create_cube(
-                box.w, box.d, box.h, box.x, box.y, box.z, self.ax, 0.9, self.colors_dict[box.id]
-                )
+        newBoxes = self.boxList[self.drawn:]
+        if newBoxes:
+            create_cubes(box_array(newBoxes), self.ax, 0.9, [self.colors_dict[box.id] for box in newBoxes])
+            self.drawn = len(self.boxList)
 
-        # Create the container
-        self.ax = create_cube(W, D, H, 0, 0, 0,self.ax, 0, (0, 0, 0))
-        
-        self.ax = create_cube(self.totalWidth,self.totalDeep,self.totalHeight,0,0,0,self.ax,0,(0,0,0))
+        if self.loadCube is not None:
+            self.loadCube.remove()
+        self.loadCube = create_cubes(np.array([[0, 0, 0, self.totalWidth, self.totalDeep, self.totalHeight]]),
+                                     self.ax, 0, [(0, 0, 0)])
 
         plt.draw()
         plt.waitforbuttonpress()
+
+    def export(self, path:str, dpi:int = 150) -> None:
+        """
+        Writes the solution without any display: a mesh (.obj) or an image
+        (.png, .svg, ...), see utils.export_boxes.
+        """
+        from utils import box_array, export_boxes
+
+        export_boxes(path, self.container.W, self.container.D, self.container.H,
+                     box_array(self.boxList), [self.colors_dict[box.id] for box in self.boxList], dpi)
         
     def vizualise_heightMatrix(self) -> None:
+        import matplotlib.pyplot as plt
 
-        plt.imshow(self.heightMatrix, aspect="auto")
+        plt.pcolormesh(*self.get_heightMatrix())
+        plt.gca().invert_yaxis()
         plt.colorbar(label='Height')
         plt.xlabel('X')
         plt.ylabel('Y')
@@ -281,8 +1091,10 @@ class Solution:
 
 
     def vizualise_wheightMatrix(self) -> None:
+        import matplotlib.pyplot as plt
 
-        plt.imshow(self.wheightMatrix)
+        plt.pcolormesh(*self.get_wheightMatrix())
+        plt.gca().invert_yaxis()
         plt.colorbar(label='Roof view')
         plt.xlabel('X')
         plt.ylabel('Y')
@@ -292,7 +1104,7 @@ class Solution:
     def vizualise_cornerList(self) -> None:
         result = "Corner List :\n"
         i = 0
-        for corner in self.cornerList:
+        for corner in self.get_cornerList():
             result += f"Corner {i}\n"
             result += f"{corner}"
             i+=1
@@ -310,3 +1122,33 @@ class Solution:
 
         return result
 
+
+class Fleet:
+    """
+    Containers used to load the boxes of an instance, one Solution per truck,
+    and the boxes too large for every container type.
+    """
+    def __init__(self, solutions: list, unplaced: list) -> None:
+        self.solutions = solutions
+        self.unplaced = unplaced
+
+    @property
+    def nTrucks(self) -> int:
+        return len(self.solutions)
+
+    def assignments(self) -> list:
+        """ (box, index of its container in self.solutions) for every loaded box """
+        return [(box, i) for i, solution in enumerate(self.solutions) for box in solution.boxList]
+
+    def __str__(self) -> str:
+        result = "Fleet:\n"
+
+        for i, solution in enumerate(self.solutions):
+            container = solution.container
+            result += (f" > Truck {i}: ({container.W}, {container.H}, {container.D}) "
+                       f"{len(solution.boxList)} boxes, {solution.totalWeight}/{container.Wgt}\n")
+
+        result += f"Number of Trucks: {self.nTrucks}\n"
+        result += f"Boxes Not Loaded: {len(self.unplaced)}\n"
+
+        return result
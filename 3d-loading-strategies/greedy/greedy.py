@@ -1,49 +1,421 @@
 from data_structures import *
+from concurrent.futures import ProcessPoolExecutor
 import copy
+import math
+import numpy as np
+import random
 import sys
+import time
+from common.local_search import NEIGHBOURHOODS, local_search as search_order, replay as replay_order
 
-def greedy(instance:Instance, vizualisation : bool = False) -> Solution: 
-    solution = Solution(instance,vizualisation)
-    boxList = copy.deepcopy(instance.boxList)
-    
-    boxList = sorted(boxList, key= lambda box :  (box.id))
+def greedy(instance:Instance, vizualisation : bool = False, profile : bool = False,
+           placement : str = "corners", localSearch : float = None, sort : str = "id",
+           seed : int = None, rotation : str = "best", cornerOrder : str = "yx") -> Solution: 
+    """
+    Places the boxes by id, each in the first corner it fits in. With
+    `profile`, returns (solution, stats) where stats is the Stats of the solve.
+    `placement` is the placement engine of the Solution: "corners" of the
+    height map, or "extreme_points" of the placed boxes. With `localSearch`,
+    the loading is then improved by local_search during that many seconds.
+    `sort` and `seed` choose another order of the boxes, see greedy_order.
+    `rotation` (ROTATIONS) and `cornerOrder` (CORNER_ORDERS) are the rules
+    of the Solution: when a box is turned, and the order the corners are
+    tried in.
+    """
+    stats = Stats() if profile else None
+    if stats is not None:
+        start = time.perf_counter()
+
+    solution = Solution(instance,vizualisation,stats=stats,placement=placement,rotation=rotation,cornerOrder=cornerOrder)
+    order = greedy_order(instance, sort, seed)
+    boxList = [copy.deepcopy(instance.boxList[i]) for i in order]
+    # The local search starts from this pass: snapshots after each box, and whether it was taken
+    states = [solution.snapshot()] if localSearch is not None else None
+    taken = []
 
     while(boxList): 
         newBox = boxList[0]
         del boxList[0]
+        if stats is not None:
+            t = time.perf_counter()
         isPossible = compute_position(newBox,solution)
+        if stats is not None:
+            stats.lap("compute_position", t)
         
         if isPossible:
             solution.add_box(newBox)
             print("*",end="")
             sys.stdout.flush()
             if vizualisation : solution.vizualise_3D_dynamic()
+        taken.append(isPossible)
+        if states is not None:
+            states.append(solution.snapshot())
 
+    if localSearch is not None:
+        solution = local_search(instance, order, localSearch, placement=placement, stats=stats,
+                                start=(solution, states, taken), rotation=rotation, cornerOrder=cornerOrder)[0]
+
+    if stats is not None:
+        stats.lap("greedy", start)
+        return solution, stats
     return solution
 
 
+# Sort keys of greedy_order: the largest boxes first, except by id
+SORT_KEYS = {
+    "id": lambda box : box.id,
+    "volume": lambda box : -box.w * box.d * box.h,
+    "base": lambda box : -box.w * box.d,
+    "height": lambda box : -box.h,
+    "weight": lambda box : -box.wgt,
+}
+
+def greedy_order(instance:Instance, sort:str = "id", seed:int = None, window:float = 3.0) -> list:
+    """
+    Indices of the boxes of the instance sorted by SORT_KEYS[sort], then by
+    id. With a seed, the order is perturbed: each box moves by up to about
+    `window` positions at random.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {tuple(SORT_KEYS)}, not {sort!r}")
+    key = SORT_KEYS[sort]
+    order = sorted(range(instance.n), key= lambda i : (key(instance.boxList[i]), instance.boxList[i].id))
+    if seed is not None:
+        rng = random.Random(seed)
+        order = [i for _, i in sorted((rank + window * rng.random(), i) for rank, i in enumerate(order))]
+    return order
+
+
+def multi_start_variants(perturbations:int = 4, placements:tuple = PLACEMENTS, seed:int = 0,
+                         rotations:tuple = ROTATIONS, cornerOrders:tuple = CORNER_ORDERS) -> list:
+    """
+    Variants of greedy_multi_start: every sort key with every placement
+    engine, then every sort key with the first engine and each other pair
+    of rotation rule and corner order, then `perturbations` seeded
+    perturbations of every sort key with the first engine and rules.
+    """
+    rules = [(rotation, cornerOrder) for cornerOrder in cornerOrders for rotation in rotations]
+    variant = lambda sort, placement, seed, rule : {"sort": sort, "placement": placement, "seed": seed,
+                                                    "rotation": rule[0], "cornerOrder": rule[1]}
+    variants = [variant(sort, placement, None, rules[0]) for placement in placements for sort in SORT_KEYS]
+    variants += [variant(sort, placements[0], None, rule) for rule in rules[1:] for sort in SORT_KEYS]
+    variants += [variant(sort, placements[0], seed + k, rules[0]) for k in range(perturbations) for sort in SORT_KEYS]
+    return variants
+
+
+def greedy_multi_start(instance:Instance, variants:list = None, workers:int = 1):
+    """
+    Runs the greedy with several variants (dicts of the sort, placement,
+    seed, rotation and cornerOrder arguments of greedy,
+    multi_start_variants() by default) on `workers` processes and keeps the
+    best one: the one that takes the most boxes, then the most volume, then
+    the first one.
+
+    Returns (solution, variant, scores): the best solution, its variant and
+    the (boxes taken, volume) of the variants run, in order.
+    """
+    variants = variants if variants is not None else multi_start_variants()
+    tasks = [(instance, variant) for variant in variants]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            scores = list(pool.map(_run_variant, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        # Without workers, the variants stop at the first one that takes every box
+        scores = []
+        for task in tasks:
+            scores.append(_run_variant(task))
+            if scores[-1][0] == instance.n:
+                break
+
+    # The winner is placed again here rather than sent back by its worker
+    best = max(range(len(scores)), key= lambda k : (scores[k], -k))
+    variant = variants[best]
+    solution = _variant_solution(instance, variant)
+    replay(instance, greedy_order(instance, variant.get("sort", "id"), variant.get("seed")), solution)
+    return solution, variant, scores
+
+
+def _variant_solution(instance:Instance, variant:dict) -> Solution:
+    return Solution(instance, placement=variant.get("placement", "corners"), rotation=variant.get("rotation", "best"),
+                    cornerOrder=variant.get("cornerOrder", "yx"))
+
+
+def _run_variant(task) -> tuple:
+    instance, variant = task
+    solution = _variant_solution(instance, variant)
+    taken = replay(instance, greedy_order(instance, variant.get("sort", "id"), variant.get("seed")), solution)
+    return sum(taken), _volume(solution)
+
+
+def local_search(instance:Instance, order:list, timeLimit:float, neighbourhoods:tuple = NEIGHBOURHOODS,
+                 placement:str = "corners", seed:int = None, stats:Stats = None, start:tuple = None,
+                 rotation:str = "best", cornerOrder:str = "yx"):
+    """
+    Improves the loading obtained by placing the boxes of instance.boxList in
+    the given order (list of indices), each with compute_position, during
+    timeLimit seconds: see common/local_search.py for the neighbourhoods,
+    seed and start (solution, states, taken) of the order already placed.
+    The Solutions have the given placement, rotation and cornerOrder.
+
+    Returns (solution, order), the improved loading and its order.
+    """
+    boxes = instance.boxList
+    solution, order, _ = search_order(boxes, [box.id for box in boxes], [box.w * box.d * box.h for box in boxes],
+                                      order, timeLimit,
+                                      lambda : Solution(instance, placement=placement, rotation=rotation,
+                                                        cornerOrder=cornerOrder),
+                                      compute_position, neighbourhoods, seed, stats, start)
+    return solution, order
+
+
+def replay(instance:Instance, order:list, solution:Solution, states:list = None, maxRejected:int = None) -> list:
+    """
+    Places the boxes of the order (indices of instance.boxList) on the
+    solution and returns whether each one was taken. With `states`, the
+    snapshot of the solution after each box is appended to it. With
+    maxRejected, returns None as soon as more boxes are rejected.
+    """
+    return replay_order(instance.boxList, order, solution, compute_position, states, maxRejected)
+
+
+def _volume(solution:Solution) -> int:
+    return sum(box.w * box.d * box.h for box in solution.boxList)
+
+
+def greedy_lookahead(instance:Instance, placement:str = "corners") -> Solution:
+    """
+    Places at each step the box and the corner, among all the boxes left and
+    all the corners, with the smallest loading meters (Solution.fit_matrix),
+    in the orientation that gives them. Ties go to the first box by id and
+    the first corner of the corner list. A pair the solution rejects (support, centre of
+    gravity) is skipped, and a box that fits in no corner or over the weight
+    limit is left out.
+    """
+    solution = Solution(instance, placement=placement)
+    order = greedy_order(instance)
+    boxes = [instance.boxList[i] for i in order]
+    sizes = np.array([(box.w, box.d, box.h) for box in boxes], dtype=np.int64).reshape(-1, 3)
+    left = np.ones(len(boxes), dtype=bool)
+
+    while left.any():
+        rows = np.flatnonzero(left)
+        fits, fitsRotated, score = solution.fit_matrix(sizes[rows])
+        corners = solution.corner_array()
+        heavy = np.array([solution.totalWeight + boxes[i].wgt > solution.container.Wgt for i in rows])
+        score[heavy] = np.inf
+        left[rows[np.isinf(score).all(axis=1)]] = False
+
+        while not np.isinf(score).all():
+            k, c = np.unravel_index(np.argmin(score), score.shape)
+            box = copy.deepcopy(boxes[rows[k]])
+            x, y, z = (int(value) for value in corners[c, :3])
+            straight = fits[k, c] and max(solution.totalWidth, x + box.w) + max(solution.totalDeep, y + box.d) == score[k, c]
+            if not straight:
+                box.w, box.d = box.d, box.w
+            box.x, box.y, box.z = x, y, z
+            box.centerPoint = [x + (box.w/2), y + (box.d/2)]
+            if solution.settle(box) and solution.can_carry(box):
+                solution.add_box(box)
+                left[rows[k]] = False
+                break
+            score[k, c] = np.inf
+        else:
+            break
+
+    return solution
+
+
+class StreamLoader:
+    """
+    Loads boxes as they arrive, without the rest of the instance: each box
+    goes in the first corner it fits in and is added to the solution at once,
+    or is refused. With `timeLimit` (seconds), a box whose position is not
+    found within that time is refused (compute_position); the add_box of a
+    box placed in time always completes. The time each box took (search and
+    add_box) is kept in `latencies`.
+
+    The floor dimensions of the boxes have to be multiples of `resolution`,
+    the step of the corner computation (see Instance): the largest one that
+    divides them makes the search faster.
+    """
+    def __init__(self, container:Container, resolution:int = 1, minSupport:float = 0.0,
+                 placement:str = "corners", timeLimit:float = None, stats:Stats = None) -> None:
+        instance = Instance(0, [], [], [], [], [], container.W, container.H, container.D, container.Wgt,
+                            resolution, container.cogEnvelope, minSupport)
+        self.resolution = instance.resolution
+        self.solution = Solution(instance, stats=stats, placement=placement)
+        self.timeLimit = timeLimit
+        self.latencies = []
+        self.refused = []
+
+    def place(self, box:Box) -> bool:
+        """ Places the box (its position and orientation are set) and returns whether it is loaded """
+        if box.w % self.resolution or box.d % self.resolution:
+            raise ValueError(f"box {box.w} x {box.d} is not a multiple of the resolution {self.resolution}")
+        start = time.perf_counter()
+        solution = self.solution
+        solution.nTotalBox += 1
+        placed = compute_position(box, solution, None if self.timeLimit is None else start + self.timeLimit)
+        if placed:
+            solution.add_box(box)
+        else:
+            self.refused.append(box)
+        self.latencies.append(time.perf_counter() - start)
+        return placed
+
+    def feed(self, boxes) -> list:
+        """ Places the boxes of an iterable in turn, returns whether each one is loaded """
+        return [self.place(box) for box in boxes]
+
+    def latency(self, percentiles:tuple = (50, 90, 99)) -> dict:
+        """ {"p50": seconds, ..., "max": seconds} of the time taken by the boxes so far """
+        if not self.latencies:
+            return {}
+        values = np.percentile(self.latencies, percentiles)
+        result = {f"p{q:g}": float(value) for q, value in zip(percentiles, values)}
+        result["max"] = max(self.latencies)
+        return result
+
+
+def greedy_fleet(instance:Instance, containers:list = None, workers:int = 1) -> Fleet:
+    """
+    Loads every box of the instance, opening a new container when a box fits
+    in none of the open ones.
+
+    Parameters:
+     - instance: boxes to load (its container is the default container type)
+     - containers: container types a new truck can be chosen among
+     - workers: number of processes packing the trucks
+
+    The boxes are first split between the trucks: a box goes to the first
+    open truck it fits in (compute_position checks its weight limit), otherwise to a new truck of the largest type it
+    fits in. Each truck is then packed again on its own, in parallel, in the
+    smallest container type that takes all its boxes.
+    """
+    types = sorted(containers or [instance.container], key= lambda c : c.W * c.H * c.D)
+    order = sorted(range(instance.n), key= lambda i : instance.boxList[i].id)
+
+    solutions = []
+    split = []
+    unplaced = []
+    for i in order:
+        box = copy.deepcopy(instance.boxList[i])
+        for solution, indices in zip(solutions, split):
+            if compute_position(box, solution):
+                solution.add_box(box)
+                indices.append(i)
+                break
+        else:
+            for container in reversed(types):
+                solution = Solution(sub_instance(instance, [], container))
+                if compute_position(box, solution):
+                    solution.add_box(box)
+                    solutions.append(solution)
+                    split.append([i])
+                    break
+            else:
+                unplaced.append(instance.boxList[i])
+
+    # Container types to try for each truck, ending with the type of the split
+    # which loads all its boxes again
+    tasks = []
+    for solution, indices in zip(solutions, split):
+        volume = sum(box.w * box.d * box.h for box in solution.boxList)
+        candidates = [c for c in types if volume <= c.W * c.H * c.D and solution.totalWeight <= c.Wgt
+                      and c is not solution.container]
+        tasks.append((instance, indices, candidates + [solution.container]))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            solutions = list(pool.map(_pack_container, tasks))
+    else:
+        solutions = [_pack_container(task) for task in tasks]
+
+    return Fleet(solutions, unplaced)
+
+
+def _pack_container(task) -> Solution:
+    instance, indices, candidates = task
+    for container in candidates:
+        solution = greedy(sub_instance(instance, indices, container))
+        if len(solution.boxList) == len(indices):
+            break
+    return solution
+
+
+def sub_instance(instance:Instance, indices:list, container:Container) -> Instance:
+    """
+    Instance with the boxes of the given indices loaded in container, at the
+    resolution of the instance (reduced to divide the container)
+    """
+    boxes = [instance.boxList[i] for i in indices]
+    return Instance(len(boxes),
+                    [box.w for box in boxes], [box.h for box in boxes], [box.d for box in boxes],
+                    [box.wgt for box in boxes], [box.id for box in boxes],
+                    container.W, container.H, container.D, container.Wgt,
+                    math.gcd(instance.resolution, container.W, container.D), container.cogEnvelope)
+
+
 def compute_position(
     box:Box,
     solution:Solution,
+    deadline:float = None,
         ) -> bool:
+    """
+    Sets the position (and orientation) of the box in the first corner it
+    fits in, and returns whether there is one. Past `deadline` (a
+    time.perf_counter() value), the search for that corner gives up and a
+    box placed too late is refused.
+    """
     
-    sorted_corner = sorted(solution.cornerList, key = lambda corner: (corner.y, corner.x))
+    # Weight limit of the container
+    if solution.totalWeight + box.wgt > solution.container.Wgt:
+        if solution.stats is not None:
+            solution.stats.count("failed placements")
+        return False
 
-    for corner in sorted_corner :
-        if box.fitInCorner(corner) :
-            if box.possible_rotation(corner) and corner.is_betterWithRotation(solution,box):
-                temp = box.w
-                box.w = box.d
-                box.d = temp
+    # First corner the box fits in, in the corner order of the solution
+    corner = solution.first_fit_corner(box.w, box.d, box.h, deadline=deadline)
+    if corner is None:
+        if solution.stats is not None:
+            timedOut = deadline is not None and time.perf_counter() > deadline
+            solution.stats.count("timed out placements" if timedOut else "failed placements")
+        return False
 
-            box.x = corner.x
-            box.y = corner.y
-            box.z = corner.z
-            box.centerPoint = [corner.x + (box.w/2),corner.y + (box.d/2)]
+    # The box is left as it was when it is refused below
+    original = (box.x, box.y, box.z, box.w, box.d, box.centerPoint)
+    w, d = box.w, box.d
+    if solution.turns(box, corner):
+        temp = box.w
+        box.w = box.d
+        box.d = temp
 
-            return True
-    
-    return False
+    box.x = corner.x
+    box.y = corner.y
+    box.z = corner.z
+    box.centerPoint = [corner.x + (box.w/2),corner.y + (box.d/2)]
+
+    # The footprint checked by first_fit_corner is the fallback when the
+    # rotated one does not fit
+    if not solution.settle(box):
+        box.w, box.d = w, d
+        box.centerPoint = [corner.x + (box.w/2),corner.y + (box.d/2)]
+        solution.settle(box)
+
+    # Centre of gravity envelope of the container, at the chosen position
+    if not solution.can_carry(box):
+        if solution.stats is not None:
+            solution.stats.count("failed placements")
+        box.x, box.y, box.z, box.w, box.d, box.centerPoint = original
+        return False
+
+    if deadline is not None and time.perf_counter() > deadline:
+        if solution.stats is not None:
+            solution.stats.count("timed out placements")
+        box.x, box.y, box.z, box.w, box.d, box.centerPoint = original
+        return False
+
+    return True
 
 
 
@@ -18,11 +18,30 @@ def create_instance(nb_boxes):
     ########################## 
     return Instance(nb_boxes,w,h,d,wgt,ids,W,H,D,Wgt)
 
+def create_random_instance(nb_boxes, seed=None):
+    # Generate random dimensions and weights for boxes (the same ones for a given seed)
+    rng = np.random.RandomState(seed)
+    d = 10*rng.randint(2, 5, nb_boxes)
+    w = 10*rng.randint(2, 5, nb_boxes)
+    h = 10*rng.randint(2, 5, nb_boxes)
+    wgt = 10*rng.randint(2, 5, nb_boxes)
+    ids = rng.randint(2, 5, nb_boxes)
+
+    # Define container dimensions and weight
+    W = 100
+    H = 120
+    D = 100
+    Wgt = 3000
+
+    return Instance(nb_boxes, w.tolist(), h.tolist(), d.tolist(), wgt.tolist(), ids.tolist(), W, H, D, Wgt)
+
 
 def main():
     # Choose an instance to solve
     instance = create_instance(nb_boxes=4)
         # or
+    instance = create_random_instance(nb_boxes=50, seed=0)
+        # or
     instance = Instance.init_example()
 
     vizualisation = True
@@ -39,4 +58,5 @@ def main():
         
     solution.vizualise_3D()
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+import copy, random, sys, time
+import numpy as np
+import pytest
+import data_structures
+from data_structures import CORNER_ORDERS, ROTATIONS, Box, Container, HeightMap, Instance, Kernel, Solution, Stats
+from greedy import (StreamLoader, compute_position, greedy, greedy_fleet, greedy_lookahead, greedy_multi_start, greedy_order,
+                    local_search, multi_start_variants, replay)
+from main import create_random_instance
+
+
+def random_instance(n, seed, minSupport=0.0, cogEnvelope=None):
+    instance = create_random_instance(n, seed)
+    boxes = instance.boxList
+    return Instance(n, [box.w for box in boxes], [box.h for box in boxes], [box.d for box in boxes],
+                    [box.wgt for box in boxes], [box.id for box in boxes], 100, 120, 100, 3000,
+                    cogEnvelope=cogEnvelope, minSupport=minSupport)
+
+
+def place_all(instance, **options):
+    solution = Solution(instance, **options)
+    for box in instance.boxList:
+        box = copy.deepcopy(box)
+        if compute_position(box, solution):
+            solution.add_box(box)
+    return solution
+
+
+def placed(solution):
+    return [(box.id, box.x, box.y, box.z, box.w, box.d, box.h) for box in solution.boxList]
+
+
+@pytest.mark.skipif(Kernel is None, reason="placement kernel not built")
+@pytest.mark.parametrize("minSupport", [0.0, 0.5, 1.0])
+@pytest.mark.parametrize("seed", range(4))
+def test_kernel_matches_python_engine(seed, minSupport):
+    instance = random_instance(50, seed, minSupport, cogEnvelope=(30.0, 70.0, 20.0, 80.0) if seed % 2 else None)
+    kernel = place_all(instance, debugCorners=True)
+    python = place_all(instance, useKernel=False, debugCorners=True)
+    assert kernel.kernel is not None and python.kernel is None
+    assert placed(kernel) == placed(python)
+    assert [(c.x, c.y, c.z, c.w, c.d, c.h) for c in kernel.get_cornerList()] == \
+           [(c.x, c.y, c.z, c.w, c.d, c.h) for c in python.get_cornerList()]
+
+
+@pytest.mark.skipif(Kernel is None, reason="placement kernel not built")
+@pytest.mark.parametrize("rotation", ROTATIONS)
+@pytest.mark.parametrize("seed", range(3))
+def test_kernel_matches_python_engine_in_xy_order(seed, rotation):
+    instance = random_instance(50, seed, 0.5)
+    kernel = place_all(instance, rotation=rotation, cornerOrder="xy")
+    python = place_all(instance, useKernel=False, rotation=rotation, cornerOrder="xy")
+    assert placed(kernel) == placed(python)
+    # A clone keeps the (x, y) tree of its kernel
+    clone = kernel.clone()
+    for w, d, h in ((10, 10, 10), (30, 20, 40), (20, 50, 10)):
+        expected = python.first_fit_corner(w, d, h, rotation=True)
+        for solution in (kernel, clone):
+            corner = solution.first_fit_corner(w, d, h, rotation=True)
+            assert (corner is None) == (expected is None)
+            if corner is not None:
+                assert (corner.x, corner.y, corner.z) == (expected.x, expected.y, expected.z)
+
+
+@pytest.mark.parametrize("placement, useKernel", [("corners", True), ("corners", False), ("extreme_points", True)])
+def test_corner_order_picks_the_first_corner_along_x(placement, useKernel):
+    # After a box up to the roof at the origin, the free corners are (10, 0) and (0, 10)
+    instance = Instance(2, [10, 10], [120, 10], [10, 10], [1, 1], [1, 2], 100, 120, 100, 3000)
+    first = {}
+    for cornerOrder in CORNER_ORDERS:
+        solution = Solution(instance, useKernel=useKernel, placement=placement, cornerOrder=cornerOrder)
+        box, other = copy.deepcopy(instance.boxList)
+        box.centerPoint = [5, 5]
+        solution.add_box(box)
+        assert compute_position(other, solution)
+        first[cornerOrder] = (other.x, other.y, other.z)
+    assert first == {"yx": (10, 0, 0), "xy": (0, 10, 0)}
+
+
+@pytest.mark.parametrize("rotation", ROTATIONS)
+def test_rotation_rule(rotation):
+    # A 10 x 40 box turned at the origin: no better by the loading meters, but it fits
+    instance = Instance(1, [10], [10], [40], [1], [1], 100, 120, 100, 3000)
+    box = copy.deepcopy(instance.boxList[0])
+    assert compute_position(box, Solution(instance, rotation=rotation))
+    assert (box.w, box.d) == ((40, 10) if rotation == "always" else (10, 40))
+    if rotation == "never":
+        solution = Solution(random_instance(60, 3), rotation=rotation)
+        for box in random_instance(60, 3).boxList:
+            original = (box.w, box.d)
+            if compute_position(box, solution):
+                solution.add_box(box)
+                assert (box.w, box.d) == original
+
+
+def test_the_rules_are_checked():
+    instance = random_instance(5, 0)
+    with pytest.raises(ValueError):
+        Solution(instance, rotation="sometimes")
+    with pytest.raises(ValueError):
+        Solution(instance, cornerOrder="zx")
+    if Kernel is not None:
+        with pytest.raises(ValueError):
+            Kernel(100, 120, 100).first_fit(10, 10, 10, xFirst=True)
+
+
+@pytest.mark.skipif(Kernel is None, reason="placement kernel not built")
+def test_kernel_support_matches_height_map():
+    instance = random_instance(50, 0, 0.5)
+    kernel = place_all(instance)
+    python = place_all(instance, useKernel=False)
+    for x in range(0, 100, 10):
+        for y in range(0, 100, 10):
+            for w, d in ((10, 10), (30, 20), (100 - x, 100 - y)):
+                if x + w <= 100 and y + d <= 100:
+                    assert kernel.support(x, y, w, d) == pytest.approx(python.support(x, y, w, d))
+
+
+@pytest.mark.parametrize("placement, useKernel", [("corners", True), ("corners", False), ("extreme_points", True)])
+def test_boxes_never_overlap(placement, useKernel):
+    # Without minSupport, a box still goes on top of the highest cell under its whole footprint
+    solution = place_all(random_instance(80, 5), placement=placement, useKernel=useKernel)
+    boxes = placed(solution)
+    assert len(boxes) > 20
+    for k, (_, x, y, z, w, d, h) in enumerate(boxes):
+        assert z + h <= 120
+        for _, x2, y2, z2, w2, d2, h2 in boxes[k + 1:]:
+            assert x + w <= x2 or x2 + w2 <= x or y + d <= y2 or y2 + d2 <= y or z + h <= z2 or z2 + h2 <= z
+
+
+def state(solution):
+    # Totals, boxes, corners and height map of a solution
+    xs, ys, cells = solution.get_heightMatrix()
+    return (solution.totalWeight, solution.totalHeight, solution.totalDeep, solution.totalWidth,
+            np.asarray(solution.gravityCenter[0]).tolist(), solution.gravityCenter[1], placed(solution),
+            solution.corner_array().tolist(), np.asarray(xs).tolist(), np.asarray(ys).tolist(), np.asarray(cells).tolist())
+
+
+def add_boxes(solution, boxes):
+    for box in copy.deepcopy(boxes):
+        if compute_position(box, solution):
+            solution.add_box(box)
+
+
+@pytest.mark.parametrize("placement, useKernel", [("corners", True), ("corners", False), ("extreme_points", True)])
+def test_undo_restores_the_solution(placement, useKernel):
+    instance = random_instance(40, 6, 0.5)
+    solution = Solution(instance, undo=True, placement=placement, useKernel=useKernel)
+    states, added = [], []
+    for i, box in enumerate(copy.deepcopy(instance.boxList)):
+        if compute_position(box, solution):
+            states.append(state(solution))
+            solution.add_box(box)
+            added.append((i, box))
+    assert len(added) > 10
+    expected = placed(solution)
+    while len(added) > 5:
+        assert solution.undo() is added.pop()[1]
+        assert state(solution) == states.pop()
+    # The boxes placed again from there go where they went the first time
+    add_boxes(solution, instance.boxList[added[-1][0] + 1:])
+    assert placed(solution) == expected
+
+
+@pytest.mark.parametrize("placement, useKernel", [("corners", True), ("corners", False), ("extreme_points", True)])
+def test_clones_and_snapshots_are_independent(placement, useKernel):
+    instance = random_instance(40, 7)
+    parent = Solution(instance, placement=placement, useKernel=useKernel)
+    add_boxes(parent, instance.boxList[:15])
+    before = state(parent)
+    clone = parent.clone()
+    add_boxes(clone, instance.boxList[15:])
+    assert state(parent) == before
+    cloned = state(clone)
+    add_boxes(parent, instance.boxList[15:])
+    assert state(clone) == cloned and state(parent) == cloned
+
+    # A snapshot is unchanged by the boxes added after it, and can be restored again
+    snapshot = clone.snapshot()
+    for _ in range(2):
+        add_boxes(clone, random_instance(10, 8).boxList)
+        assert len(clone.boxList) > len(cloned[6])
+        clone.restore(snapshot)
+        assert state(clone) == cloned
+
+
+@pytest.mark.parametrize("useKernel", [True, False])
+def test_a_box_goes_on_top_of_a_taller_neighbour(useKernel):
+    # The scans of the corner at (10, 0) only see the floor along their row and
+    # columns, not the tall box inside the footprint of the flat one
+    instance = Instance(3, [10, 10, 90], [10, 50, 10], [10, 10, 100], [1, 1, 1], [1, 2, 3], 100, 120, 100, 3000)
+    solution = Solution(instance, useKernel=useKernel)
+    small, tall, flat = copy.deepcopy(instance.boxList)
+    small.centerPoint = [5, 5]
+    tall.x, tall.y, tall.centerPoint = 50, 30, [55, 35]
+    solution.add_box(small)
+    solution.add_box(tall)
+    assert compute_position(flat, solution)
+    assert (flat.x, flat.y, flat.z) == (10, 0, 50)
+    solution.add_box(flat)
+    assert solution.support(10, 0, 90, 100)[:2] == (60, 60)
+
+
+def test_height_map_support_matches_a_scan():
+    rng = random.Random(0)
+    heightMap = HeightMap(100, 100)
+    for _ in range(80):
+        # Half of the blocks on the grid lines already there, which update the index instead of rebuilding it
+        if rng.random() < 0.5:
+            x, y = rng.randrange(0, 95), rng.randrange(0, 95)
+            x_end, y_end = rng.randint(x + 1, 100), rng.randint(y + 1, 100)
+        else:
+            x, x_end = sorted(rng.sample(heightMap.xs, 2))
+            y, y_end = sorted(rng.sample(heightMap.ys, 2))
+        heightMap.stamp(x, x_end, y, y_end, rng.randint(0, 50))
+        for _ in range(5):
+            x, y = rng.randrange(0, 100), rng.randrange(0, 100)
+            w, d = rng.randint(1, 100 - x), rng.randint(1, 100 - y)
+            j0, j1 = np.searchsorted(heightMap.xs, x, "right") - 1, np.searchsorted(heightMap.xs, x + w)
+            i0, i1 = np.searchsorted(heightMap.ys, y, "right") - 1, np.searchsorted(heightMap.ys, y + d)
+            block = heightMap.cells[i0:i1, j0:j1]
+            widths = np.diff(np.clip(heightMap.xs[j0:j1 + 1], x, x + w))
+            depths = np.diff(np.clip(heightMap.ys[i0:i1 + 1], y, y + d))
+            area = (depths[:, None] * widths)[block == block.max()].sum()
+            assert heightMap.support(x, y, w, d) == pytest.approx((block.max(), block.min(), area))
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_placements_are_supported(placement):
+    minSupport = 0.75
+    solution = place_all(random_instance(60, 3, minSupport), placement=placement)
+    for box in solution.boxList:
+        if box.z == 0:
+            continue
+        area = sum(max(0, min(box.x + box.w, other.x + other.w) - max(box.x, other.x))
+                   * max(0, min(box.y + box.d, other.y + other.d) - max(box.y, other.y))
+                   for other in solution.boxList if other.z + other.h == box.z)
+        assert area >= minSupport * box.w * box.d
+
+
+def test_multi_start_is_reproducible_and_no_worse_than_greedy():
+    instance = create_random_instance(40, 2)
+    solution, variant, scores = greedy_multi_start(instance)
+    again = greedy_multi_start(instance)
+    assert placed(again[0]) == placed(solution) and again[1] == variant
+    assert len(solution.boxList) == max(scores)[0]
+    assert len(solution.boxList) >= len(place_all(instance).boxList)
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_multi_start_keeps_to_the_given_engines(placement):
+    variants = multi_start_variants(perturbations=2, placements=(placement,))
+    assert {variant["placement"] for variant in variants} == {placement}
+    assert {(variant["rotation"], variant["cornerOrder"]) for variant in variants} == \
+           {(rotation, cornerOrder) for rotation in ROTATIONS for cornerOrder in CORNER_ORDERS}
+    assert greedy_multi_start(create_random_instance(30, 0), variants)[0].placement == placement
+
+
+def test_local_search_keeps_or_improves_the_order():
+    instance = create_random_instance(40, 1)
+    order = list(range(instance.n))
+    start = place_all(instance)
+    solution, best = local_search(instance, order, 0.5, seed=0)
+    assert len(solution.boxList) >= len(start.boxList)
+    assert sorted(best) == order
+    replayed = Solution(instance)
+    replay(instance, best, replayed)
+    assert placed(replayed) == placed(solution)
+
+
+def test_local_search_starts_from_the_given_pass():
+    # Searched to the end, the start only saves placing the order once
+    instance = create_random_instance(22, 2)
+    order = greedy_order(instance, "volume")
+    solution = Solution(instance)
+    states = [solution.snapshot()]
+    taken = replay(instance, order, solution, states)
+    assert not all(taken)
+    started, startedOrder = local_search(instance, order, 60, seed=0, start=(solution, states, taken))
+    fresh, freshOrder = local_search(instance, order, 60, seed=0)
+    assert startedOrder == freshOrder
+    assert placed(started) == placed(fresh)
+    assert len(greedy(instance, sort="volume", localSearch=60).boxList) > sum(taken)
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_fit_matrix_matches_the_corner_checks(placement):
+    instance = create_random_instance(40, 4)
+    solution = place_all(instance, placement=placement)
+    corners = solution.get_cornerList()
+    assert solution.corner_array().tolist() == [[c.x, c.y, c.z, c.w, c.d, c.h] for c in corners]
+    fits, fitsRotated, score = solution.fit_matrix(instance.boxList)
+    for k, box in enumerate(instance.boxList):
+        for c, corner in enumerate(corners):
+            assert fits[k, c] == box.fitInCorner(corner)
+            assert fitsRotated[k, c] == (box.possible_rotation(corner) and box.h <= corner.h)
+            meters = [max(solution.totalWidth, corner.x + w) + max(solution.totalDeep, corner.y + d)
+                      for w, d, ok in ((box.w, box.d, fits[k, c]), (box.d, box.w, fitsRotated[k, c])) if ok]
+            assert score[k, c] == min(meters, default=float("inf"))
+
+
+@pytest.mark.parametrize("late", [False, True])
+def test_a_refused_box_is_left_as_it_was(late):
+    # The wide box only fits on the floor beside the first one, which moves
+    # the centre of gravity out of the envelope
+    instance = Instance(2, [10, 40], [10, 10], [10, 10], [1, 1], [1, 2], 100, 120, 100, 3000,
+                        cogEnvelope=(0.0, 10.0, 0.0, 10.0))
+    solution = Solution(instance)
+    first, box = copy.deepcopy(instance.boxList)
+    assert compute_position(first, solution)
+    solution.add_box(first)
+    before = (box.x, box.y, box.z, box.w, box.d, box.centerPoint)
+    assert not compute_position(box, solution, deadline=time.perf_counter() - 1 if late else None)
+    assert (box.x, box.y, box.z, box.w, box.d, box.centerPoint) == before
+
+
+def box_at(x, y, w, d, wgt):
+    box = Box(x, y, 0, w, 10, d, wgt, 1)
+    box.centerPoint = [x + (w/2), y + (d/2)]
+    return box
+
+
+def test_can_carry_checks_the_weight_limit_and_the_envelope():
+    solution = Solution(Instance(0, [], [], [], [], [], 100, 120, 100, 100, cogEnvelope=(40.0, 60.0, 40.0, 60.0)))
+    # The first box may start outside the envelope, the next ones may not move the centre away from it
+    assert solution.can_carry(box_at(0, 0, 20, 20, 10))
+    solution.add_box(box_at(40, 40, 20, 20, 60))
+    assert solution.can_carry(box_at(40, 40, 20, 20, 40))
+    assert not solution.can_carry(box_at(40, 40, 20, 20, 41))
+    assert not solution.can_carry(box_at(0, 0, 10, 10, 30))
+    assert solution.can_carry(box_at(45, 0, 10, 80, 30))
+
+
+def test_axle_loads_and_load_distribution_add_up_to_the_load():
+    solution = Solution(Instance(0, [], [], [], [], [], 100, 120, 100, 3000, 10))
+    for box in (box_at(0, 0, 20, 50, 100), box_at(50, 50, 50, 50, 300), box_at(20, 70, 10, 30, 40)):
+        solution.add_box(box)
+    front, rear = solution.axle_loads(0, 100)
+    assert front + rear == pytest.approx(solution.totalWeight)
+    assert rear == pytest.approx(solution.totalWeight * solution.gravityCenter[0][1] / 100)
+    # Supports under the centre of gravity carry it all on one side
+    assert solution.axle_loads(solution.gravityCenter[0][1], 100) == pytest.approx((solution.totalWeight, 0))
+    xs, ys, loads = solution.load_distribution()
+    assert (len(xs), len(ys), loads.shape) == (11, 11, (10, 10))
+    assert loads.sum() == pytest.approx(solution.totalWeight)
+    assert loads[:5, :2].sum() == pytest.approx(100) and loads[5:, 5:].sum() == pytest.approx(300)
+    assert loads[:5, 5:].sum() == 0
+    assert solution.load_distribution(50)[2] == pytest.approx(np.array([[100, 0], [40, 300]]))
+
+
+def test_lookahead_places_valid_boxes():
+    instance = create_random_instance(40, 5)
+    solution = greedy_lookahead(instance)
+    boxes = solution.boxList
+    assert boxes and solution.totalWeight <= instance.container.Wgt
+    for i, a in enumerate(boxes):
+        assert a.x + a.w <= 100 and a.y + a.d <= 100 and a.z + a.h <= 120
+        for b in boxes[i + 1:]:
+            assert (a.x + a.w <= b.x or b.x + b.w <= a.x or a.y + a.d <= b.y or b.y + b.d <= a.y
+                    or a.z + a.h <= b.z or b.z + b.h <= a.z)
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_stream_loader_matches_greedy(placement):
+    instance = create_random_instance(40, 6)
+    loader = StreamLoader(instance.container, instance.resolution, placement=placement)
+    taken = loader.feed(copy.deepcopy(instance.boxList[i]) for i in greedy_order(instance))
+    expected = Solution(instance, placement=placement)
+    replay(instance, greedy_order(instance), expected)
+    assert placed(loader.solution) == placed(expected)
+    assert sum(taken) + len(loader.refused) == len(loader.latencies) == instance.n
+    latency = loader.latency()
+    assert set(latency) == {"p50", "p90", "p99", "max"}
+    assert latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+
+
+@pytest.mark.parametrize("placement, useKernel", [("corners", True), ("corners", False), ("extreme_points", True)])
+def test_stream_loader_time_limit(placement, useKernel):
+    instance = Instance.init_example()
+    stats = Stats()
+    loader = StreamLoader(instance.container, 10, placement=placement, timeLimit=1e-9, stats=stats)
+    if not useKernel:
+        loader.solution = Solution(Instance(0, [], [], [], [], [], 2550, 2700, 3950, 30000, 10),
+                                   stats=stats, useKernel=False, placement=placement)
+    assert not any(loader.feed(copy.deepcopy(box) for box in instance.boxList))
+    assert stats.counters["timed out placements"] == instance.n
+    assert loader.solution.boxList == []
+
+
+def test_stream_loader_checks_the_resolution():
+    loader = StreamLoader(Container(100, 100, 100, 100), 10)
+    assert loader.latency() == {}
+    with pytest.raises(ValueError):
+        loader.place(Box(0, 0, 0, 15, 10, 10, 1, 1))
+
+
+def test_fleet_loads_every_box_once_within_the_weight_limits(monkeypatch):
+    # The workers pickle the boxes by module name, which the ant colony tests reuse
+    monkeypatch.setitem(sys.modules, "data_structures", data_structures)
+    instance = create_random_instance(120, 4)
+    containers = [instance.container, Container(60, 120, 60, 1500)]
+    fleet = greedy_fleet(instance, containers)
+    assert fleet.nTrucks > 1 and not fleet.unplaced
+    kind = lambda box : (box.id, box.h, min(box.w, box.d), max(box.w, box.d), box.wgt)
+    assert sorted(kind(box) for box, _ in fleet.assignments()) == sorted(map(kind, instance.boxList))
+    for solution in fleet.solutions:
+        assert solution.totalWeight == sum(box.wgt for box in solution.boxList) <= solution.container.Wgt
+    # Packing the trucks on several processes gives the same fleet
+    trucks = lambda fleet : [((s.container.W, s.container.H, s.container.D), placed(s)) for s in fleet.solutions]
+    assert trucks(greedy_fleet(instance, containers, workers=2)) == trucks(fleet)
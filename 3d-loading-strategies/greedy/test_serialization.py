@@ -0,0 +1,57 @@
+import copy
+import numpy as np
+import pytest
+import data_structures as ds
+from common import serialization
+from data_structures import Instance, Solution, PLACEMENTS
+from greedy import compute_position, greedy_order, replay
+from main import create_random_instance
+
+
+def items():
+    result = []
+    for seed in range(2):
+        instance = create_random_instance(40, seed)
+        result.append(instance)
+        for placement in PLACEMENTS:
+            solution = Solution(instance, placement=placement)
+            replay(instance, greedy_order(instance, "volume", seed), solution)
+            result.append(solution)
+    instance = Instance(5, [10] * 5, [10] * 5, [10] * 5, [1] * 5, [1, 2, 3, 4, 5], 50, 50, 50, 100, 10,
+                        (10.0, 40.5, 5.0, 45.0), 0.5)
+    solution = Solution(instance)
+    for box in copy.deepcopy(instance.boxList):
+        if compute_position(box, solution):
+            solution.add_box(box)
+    return result + [instance, solution, Solution(instance)]
+
+
+def state(item):
+    container = item.container
+    common = (container.W, container.H, container.D, container.Wgt, container.cogEnvelope,
+              item.resolution, item.minSupport)
+    if isinstance(item, Instance):
+        return common + (item.n, [(box.w, box.h, box.d, box.wgt, box.id) for box in item.boxList])
+    return common + (item.nTotalBox, item.placement, item.totalWeight, item.totalWidth, item.totalDeep,
+                     item.totalHeight, item.gravityCenter[0].tolist(), item.gravityCenter[1],
+                     [(box.x, box.y, box.z, box.w, box.d, box.h, box.id, box.wgt) for box in item.boxList],
+                     item.corner_array().tolist())
+
+
+@pytest.mark.parametrize("how", ["load", "loads"])
+def test_round_trip(tmp_path, how):
+    original = items()
+    if how == "load":
+        serialization.save(tmp_path / "plans.npy", original)
+        archive = serialization.load(tmp_path / "plans.npy", ds)
+        assert isinstance(archive.boxes, np.memmap)
+    else:
+        archive = serialization.loads(serialization.dumps(original), ds)
+    assert len(archive) == len(original)
+    assert [state(item) for item in archive] == [state(item) for item in original]
+
+
+def test_empty_archive(tmp_path):
+    serialization.save(tmp_path / "empty.npy", [])
+    assert len(serialization.load(tmp_path / "empty.npy", ds)) == 0
+    assert list(serialization.loads(serialization.dumps([]), ds)) == []
@@ -1,32 +1,81 @@
 import random
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+import numpy as np
+
+# Corners of the unit cube, and the 4 corners of each of its faces
+CUBE_CORNERS = np.array([
+    [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+    [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+])
+CUBE_FACES = np.array([
+    [0, 1, 2, 3],
+    [4, 5, 6, 7],
+    [0, 1, 5, 4],
+    [2, 3, 7, 6],
+    [1, 2, 6, 5],
+    [0, 3, 7, 4],
+])
+
+def box_array(boxList) -> np.ndarray:
+    """ (n, 6) array of the x, y, z, w, d, h of the boxes """
+    return np.array([(box.x, box.y, box.z, box.w, box.d, box.h) for box in boxList], dtype=float).reshape(-1, 6)
+
+def cube_vertices(boxes:np.ndarray) -> np.ndarray:
+    """ (n, 8, 3) corners of the boxes given as (n, 6) x, y, z, w, d, h rows """
+    return boxes[:, None, :3] + CUBE_CORNERS[None] * boxes[:, None, 3:]
+
+def cube_faces(boxes:np.ndarray) -> np.ndarray:
+    """ (6 n, 4, 3) faces of the boxes given as (n, 6) x, y, z, w, d, h rows """
+    return cube_vertices(boxes)[:, CUBE_FACES].reshape(-1, 4, 3)
+
+def create_cubes(boxes:np.ndarray, ax, op, face_colors):
+    """
+    Adds the boxes ((n, 6) x, y, z, w, d, h rows) to the axes as a single
+    collection, box i with face_colors[i]. Returns the collection.
+    """
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+    collection = Poly3DCollection(cube_faces(boxes), facecolors=np.repeat(face_colors, 6, axis=0),
+                                  linewidths=1, edgecolors='black', alpha=op)
+    ax.add_collection3d(collection)
+    return collection
 
 def create_cube(w,d,h, x,y,z, ax,op, face_color):
-    # corners of the cube
-    corners = [
-        [x, y, z],
-        [x + w, y, z],
-        [x + w, y + d, z],
-        [x, y + d, z],
-        [x, y, z + h],
-        [x + w, y, z + h],
-        [x + w, y + d, z + h],
-        [x, y + d, z + h]
-    ]
-
-    # faces of the cube 
-    faces = [
-        [corners[0], corners[1], corners[2], corners[3]],
-        [corners[4], corners[5], corners[6], corners[7]],
-        [corners[0], corners[1], corners[5], corners[4]],
-        [corners[2], corners[3], corners[7], corners[6]],
-        [corners[1], corners[2], corners[6], corners[5]],
-        [corners[0], corners[3], corners[7], corners[4]]
-    ]
-    # color of the cube
-    #face_color = colors_dict[cube_id]
     # display the cube
-    ax.add_collection3d(Poly3DCollection(faces, facecolors=[face_color]*6, linewidths=1, edgecolors='black', alpha=op))
-    # ax.add_collection3d(Poly3DCollection(faces, facecolors=[(random.random(), random.random(), random.random())]*6, linewidths=1, edgecolors='black', alpha=op))
-
+    create_cubes(np.array([[x, y, z, w, d, h]], dtype=float), ax, op, [face_color])
     return ax
+
+def setup_axes(ax, W, D, H):
+    # Same scale on each axis, and the container
+    l = max(W,D,H)
+    ax.auto_scale_xyz([0,l], [0,l], [0,l])
+    ax.set_xlabel('X')
+    ax.set_ylabel('Y')
+    ax.set_zlabel('Z')
+    create_cube(W,D,H,0,0,0,ax,0,(0,0,0))
+
+def export_boxes(path:str, W:int, D:int, H:int, boxes:np.ndarray, colors, dpi:int = 150) -> None:
+    """
+    Writes the boxes ((n, 6) x, y, z, w, d, h rows, box i with colors[i])
+    without any display: a Wavefront mesh with vertex colors when path ends
+    with .obj, else an image in the format of its extension (.png, .svg, ...).
+    """
+    if path.lower().endswith(".obj"):
+        vertices = cube_vertices(boxes)
+        rgb = np.repeat(np.asarray(colors, dtype=float).reshape(-1, 3), 8, axis=0)
+        faces = (CUBE_FACES[None] + 8 * np.arange(len(boxes))[:, None, None]).reshape(-1, 4) + 1
+        with open(path, "w") as f:
+            f.write(f"# {len(boxes)} boxes in a {W} x {D} x {H} container\n")
+            np.savetxt(f, np.hstack((vertices.reshape(-1, 3), rgb)), fmt="v %g %g %g %.4f %.4f %.4f")
+            np.savetxt(f, faces, fmt="f %d %d %d %d")
+        return
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    setup_axes(ax, W, D, H)
+    if len(boxes):
+        create_cubes(boxes, ax, 0.9, colors)
+    fig.savefig(path, dpi=dpi)
@@ -1,8 +1,16 @@
+import os, sys
+# The modules shared with the greedy solver (common/) are in the parent directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
 import data_structures as ds
-import matplotlib.pyplot as plt 
+from common.local_search import NEIGHBOURHOODS, local_search as search_order, replay as replay_order
 
 import numpy as np
-import copy, random, math, time
+import copy, random, math, time, threading
+import collections
+import multiprocessing, multiprocessing.pool
 
 def ant_colony(
     instance: ds.Instance, 
@@ -10,6 +18,19 @@ def ant_colony(
     maxAnt : int,
     rE : float,
     rD : float,
+    workers : int = 1,
+    seed : int = None,
+    profile : bool = False,
+    threads : bool = False,
+    placement : str = "corners",
+    timeBudget : float = None,
+    deadline : float = None,
+    patience : int = None,
+    minEntropy : float = None,
+    report : bool = False,
+    cacheSize : int = 0,
+    cacheStride : int = 4,
+    localSearch : float = None,
         ) -> ds.Solution: 
     """
     This function implements the ant colony optimization algorithm to solve the given instance.
@@ -20,6 +41,38 @@ def ant_colony(
     - maxAnt: The maximum number of ants.
     - rE: The evaporation rate for the pheromone.
     - rD: The deposition rate for the pheromone.
+    - workers: The number of processes the ants of an iteration are spread over.
+    - seed: Seed of the ant random generators (drawn from `random` if None).
+      Each ant gets its own generator, so the result does not depend on `workers`.
+    - profile: If True, the phases of the solve are timed and counted in a ds.Stats
+      (the times of the ants run by the workers are summed).
+    - threads: If True, the workers are threads instead of processes. The placement
+      kernel runs without the GIL, so only that part of the ants runs in parallel,
+      but nothing is sent between processes.
+    - placement: The placement engine of the solutions: "corners" of the height map,
+      or "extreme_points" of the placed boxes.
+    - timeBudget: Seconds the solve may take, or None.
+    - deadline: Wall clock time (time.time()) the solve has to end by, or None.
+      Once the time is up, no new ant is started (a running iteration stops between
+      ants, or after its ants with workers) and the best solution so far is returned.
+      At least one ant is always built.
+    - patience: Stop when the best value did not improve during that many iterations, or None.
+    - minEntropy: Stop when the mean entropy of the pheromone rows, divided by log(n),
+      falls below this value (the colony has converged), or None.
+    - report: If True, a dict describing the run is returned after the other values:
+      "stop" the rule that ended it ("maxIter", "timeBudget", "deadline", "patience"
+      or "minEntropy"), "iterations" and "ants" completed, "time" in seconds, and
+      "curve" the (seconds, iteration, ants, bestZ) of every improvement of the best value
+      (with workers, the ants of an iteration all end with it).
+    - cacheSize: The number of partial solutions kept in a PrefixCache (0: no cache).
+      An ant resumes from the longest cached prefix of its box order instead of
+      placing those boxes again, which does not change the result. With process
+      workers, each worker has its own cache of that size. With `report`, the run
+      also gives "cache", the PrefixCache.info() of all the caches.
+    - cacheStride: The cache keeps the partial solutions after every cacheStride boxes.
+    - localSearch: Seconds of local_search on the order of the best ant at the end
+      (within the time budget or the deadline), or None. With `report`, the run also
+      gives "localSearch", the bestZ before and after it.
     
     Returns:
     - bestSolution_boxList: The list of boxes in the best solution found.
@@ -27,33 +80,328 @@ def ant_colony(
     - allZ: The list of objective function values for each iteration.
     - allBestZ: The list of best objective function values for each iteration.
     - bestZ: The best objective function value found.
+    - stats: The ds.Stats of the solve, only when `profile` is True.
+    - run: The report of the run, only when `report` is True.
     """
+    stats = ds.Stats() if profile else None
+    start = time.perf_counter()
+    # Time (perf_counter) the solve has to end by, and the rule it comes from
+    limit, limitRule = np.inf, None
+    if timeBudget is not None:
+        limit, limitRule = start + timeBudget, "timeBudget"
+    if deadline is not None and start + deadline - time.time() < limit:
+        limit, limitRule = start + deadline - time.time(), "deadline"
+    stop = "maxIter"
+    curve = []
+    ants = 0
+    lastImprovement = 0
     bestZ = np.inf
     stepList = []
     n = instance.get_n()
     phi_box = np.full((n, n), 1/n)
+    seeds = random.Random(seed if seed is not None else random.getrandbits(64))
     
     allZ = []
     allBestZ = []
-    for i in range(maxIter):
-        
-        for ant in range(maxAnt):
-            print("*",end="", flush=True)
-            solution,stepList = generate_solution(instance,phi_box,i+1,maxIter)
-            z = solution.evaluate()
-            allZ.append(z)
-            if z <= bestZ :
-                bestZ = z
-                bestStepList = list(stepList)
-                bestSolution_boxList = copy.deepcopy(solution.get_boxList())
-                bestSolution_color_dict = copy.deepcopy(solution.get_colors_dict())
-
-        managePhi(n,phi_box,bestStepList,rE,rD)
-        phi_box = normalize(phi_box)
+    # Prefix caches of this process and (by process id) of the pool workers
+    cache = PrefixCache(cacheSize, cacheStride) if cacheSize > 0 else None
+    workerCaches = {}
+    pool = None
+    if workers > 1:
+        pool = (multiprocessing.pool.ThreadPool(workers) if threads
+                else multiprocessing.Pool(workers, initializer=_init_worker, initargs=(instance, cacheSize, cacheStride)))
+    try:
+        for i in range(maxIter):
+            antSeeds = [seeds.getrandbits(64) for ant in range(maxAnt)]
+
+            if pool is None:
+                results = []
+                finished = []
+                for antSeed in antSeeds:
+                    if (ants or results) and time.perf_counter() >= limit:
+                        break
+                    results.append(run_ant(instance, phi_box, i+1, maxIter, antSeed, profile, placement, cache))
+                    finished.append(time.perf_counter())
+            elif threads:
+                results = pool.starmap(run_ant, [(instance, phi_box, i+1, maxIter, antSeed, profile, placement, cache)
+                                                 for antSeed in antSeeds])
+            else:
+                # One chunk of ants per worker, so phi_box is sent once per worker
+                chunks = [(phi_box, i+1, maxIter, antSeeds[k::workers], profile, placement) for k in range(workers)]
+                chunkResults = pool.map(_run_ants, chunks)
+                results = [None] * maxAnt
+                for k, (chunkResult, pid, cacheInfo) in enumerate(chunkResults):
+                    results[k::workers] = chunkResult
+                    if cacheInfo is not None:
+                        workerCaches[pid] = cacheInfo
+
+            if pool is not None:
+                finished = [time.perf_counter()] * len(results)
+
+            for (stepList, z, antStats), end in zip(results, finished):
+                print("*",end="", flush=True)
+                ants += 1
+                allZ.append(z)
+                if z < bestZ:
+                    curve.append((end - start, i+1, ants, z))
+                    lastImprovement = i
+                if z <= bestZ :
+                    bestZ = z
+                    bestStepList = stepList
+                if stats is not None:
+                    stats.merge(antStats)
+            allBestZ.append(bestZ)
+
+            # Stopping rules, checked after each iteration
+            if time.perf_counter() >= limit:
+                stop = limitRule
+                break
+            if patience is not None and i - lastImprovement >= patience:
+                stop = "patience"
+                break
+
+            if stats is not None:
+                t = time.perf_counter()
+            managePhi(n,phi_box,bestStepList,rE,rD)
+            if stats is not None:
+                t = stats.lap("managePhi", t)
+            phi_box = normalize(phi_box)
+            if stats is not None:
+                stats.lap("normalize", t)
+            if minEntropy is not None and pheromone_entropy(phi_box) < minEntropy:
+                stop = "minEntropy"
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
         
     print()
+    if localSearch is not None:
+        searched = bestZ
+        seconds = min(localSearch, limit - time.perf_counter())
+        if seconds > 0:
+            solution, bestStepList = local_search(instance, [step[0] for step in bestStepList], seconds,
+                                                  placement=placement, seed=seeds.getrandbits(64), stats=stats)
+            bestZ = solution.evaluate()
     print(bestStepList)
-    return bestSolution_boxList, bestSolution_color_dict, allZ, allBestZ, bestZ
+    if stats is not None:
+        t = time.perf_counter()
+    bestSolution = rebuild_solution(instance, bestStepList, placement)
+    bestSolution_boxList = bestSolution.get_boxList()
+    bestSolution_color_dict = bestSolution.get_colors_dict()
+    result = (bestSolution_boxList, bestSolution_color_dict, allZ, allBestZ, bestZ)
+    if stats is not None:
+        stats.lap("rebuild_solution", t)
+        stats.lap("ant_colony", start)
+        result += (stats,)
+    if report:
+        run = {"stop": stop, "iterations": len(allBestZ), "ants": ants,
+               "time": time.perf_counter() - start, "curve": curve}
+        if localSearch is not None:
+            run["localSearch"] = {"before": searched, "after": bestZ}
+        if cacheSize > 0:
+            infos = list(workerCaches.values())
+            if cache is not None:
+                infos.append(cache.info())
+            run["cache"] = PrefixCache.merge_info(infos)
+        result += (run,)
+    return result
+
+def run_ant(instance, phi_box, iter, maxIter, seed, profile=False, placement="corners", cache=None):
+    """
+    Builds the solution of one ant with its own random generator and returns
+    only its step list, its score and its ds.Stats (None without `profile`).
+    """
+    stats = ds.Stats() if profile else None
+    solution, stepList = generate_solution(instance, phi_box, iter, maxIter, random.Random(seed), stats, placement, cache)
+    return stepList, solution.evaluate(), stats
+
+# Instance and prefix cache of the pool workers, set once when the worker starts
+_workerInstance = None
+_workerCache = None
+
+def _init_worker(instance, cacheSize=0, cacheStride=4):
+    global _workerInstance, _workerCache
+    _workerInstance = instance
+    _workerCache = PrefixCache(cacheSize, cacheStride) if cacheSize > 0 else None
+
+def _run_ants(chunk):
+    phi_box, iter, maxIter, antSeeds, profile, placement = chunk
+    results = [run_ant(_workerInstance, phi_box, iter, maxIter, antSeed, profile, placement, _workerCache)
+               for antSeed in antSeeds]
+    return results, os.getpid(), _workerCache.info() if _workerCache is not None else None
+
+def rebuild_solution(instance, stepList, placement="corners") -> ds.Solution:
+    """
+    Replays a step list returned by generate_solution on a new Solution.
+    
+    Parameters:
+    - instance: The instance the steps were taken on.
+    - stepList: The list of steps taken by the ant.
+    - placement: The placement engine the steps were taken with.
+    
+    Returns:
+    - solution: The same solution the ant built.
+    
+    Raises ValueError when a box the steps took is refused here (the steps
+    were not taken on this instance or with this placement engine).
+    """
+    solution = ds.Solution(instance.get_n(), instance.get_container(), step=instance.get_resolution(),
+                           minSupport=instance.get_minSupport(), placement=placement)
+    boxList = [copy.copy(box) for box in instance.get_boxList()]
+
+    for step in stepList:
+        if step[1]:
+            newBox = boxList[step[0]]
+            if not compute_position(newBox, solution)[0]:
+                raise ValueError(f"box {step[0]} of the steps does not fit in the rebuilt solution")
+            solution.add_box(newBox)
+
+    return solution
+
+def local_search(
+    instance, order, timeLimit, neighbourhoods = NEIGHBOURHOODS, placement = "corners", seed = None, stats = None
+        ):
+    """
+    Improves the loading obtained by placing the boxes of the instance in the
+    given order, each with compute_position (see common/local_search.py).
+    
+    Parameters:
+    - instance: The instance of the problem.
+    - order: The indices of the boxes, in the order they are placed in.
+    - timeLimit: The seconds the search may take.
+    - neighbourhoods: The moves tried on the order, among NEIGHBOURHOODS.
+    - placement: The placement engine of the solution.
+    - seed: The seed of the order the moves are tried in.
+    - stats: The ds.Stats the moves are counted in (None: not instrumented).
+    
+    Returns:
+    - solution: The improved solution.
+    - stepList: Its steps, as taken by an ant (see rebuild_solution).
+    """
+    boxList = instance.get_boxList()
+    newSolution = lambda: ds.Solution(instance.get_n(), instance.get_container(), step=instance.get_resolution(),
+                                      minSupport=instance.get_minSupport(), placement=placement)
+    solution, order, results = search_order(boxList, [box.get_id() for box in boxList],
+                                            [box.get_w() * box.get_d() * box.get_h() for box in boxList],
+                                            order, timeLimit, newSolution, compute_position,
+                                            neighbourhoods, seed, stats)
+    return solution, [[i, isPossible, isRight] for i, (isPossible, isRight) in zip(order, results)]
+
+def replay(instance, order, solution, states = None, maxRejected = None):
+    """
+    Places the boxes of the given indices on the solution and returns the steps
+    taken ([index, isPossible, isRight]). With `states`, the snapshot of the
+    solution after each box is appended to it. With maxRejected, returns None as
+    soon as more boxes are rejected.
+    """
+    results = replay_order(instance.get_boxList(), order, solution, compute_position, states, maxRejected)
+    if results is None:
+        return None
+    return [[i, isPossible, isRight] for i, (isPossible, isRight) in zip(order, results)]
+
+def ant_colony_fleet(
+    instance: ds.Instance,
+    maxIter : int,
+    maxAnt : int,
+    rE : float,
+    rD : float,
+    containers : list = None,
+    workers : int = 1,
+    seed : int = None,
+        ):
+    """
+    Loads every box of the instance, opening a new container when a box fits
+    in none of the open ones, then packs each truck with the ant colony.
+    
+    Parameters:
+    - instance: The instance of the problem to be solved (its container is the default container type).
+    - maxIter, maxAnt, rE, rD: The parameters of ant_colony for each truck.
+    - containers: The container types a new truck can be chosen among.
+    - workers: The number of processes the trucks are packed on.
+    - seed: Seed of the ant colonies (truck k uses seed + k).
+    
+    The boxes are first split between the trucks: a box goes to the first open
+    truck it fits in (within its weight limit), otherwise to a new truck of the
+    largest type it fits in. Each truck is then packed on its own, in parallel,
+    in the smallest container type the ant colony loads all its boxes in. If
+    the colony cannot load them all, the truck keeps the packing of the split.
+    
+    Returns:
+    - trucks: The list of (container, boxList, colors_dict) of each truck, len(trucks) trucks are used.
+    - unplaced: The list of boxes too large for every container type.
+    """
+    types = sorted(containers or [instance.get_container()],
+                   key= lambda c : c.get_W() * c.get_H() * c.get_D())
+    boxList = instance.get_boxList()
+
+    solutions = []
+    split = []
+    unplaced = []
+    for i, box in enumerate(boxList):
+        newBox = copy.copy(box)
+        for solution, indices in zip(solutions, split):
+            if compute_position(newBox, solution)[0]:
+                solution.add_box(newBox)
+                indices.append(i)
+                break
+        else:
+            for container in reversed(types):
+                solution = ds.Solution(0, container, step=math.gcd(instance.get_resolution(), container.get_W(), container.get_D()),
+                                       minSupport=instance.get_minSupport())
+                if compute_position(newBox, solution)[0]:
+                    solution.add_box(newBox)
+                    solutions.append(solution)
+                    split.append([i])
+                    break
+            else:
+                unplaced.append(box)
+
+    tasks = []
+    for k, (solution, indices) in enumerate(zip(solutions, split)):
+        volume = sum(box.get_w() * box.get_d() * box.get_h() for box in solution.get_boxList())
+        candidates = [c for c in types if volume <= c.get_W() * c.get_H() * c.get_D()
+                      and solution.get_totalWeight() <= c.get_Wgt()]
+        truckSeed = None if seed is None else seed + k
+        tasks.append((sub_instance(instance, indices, solution.get_container()), candidates,
+                      maxIter, maxAnt, rE, rD, truckSeed))
+
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            trucks = pool.map(_pack_container, tasks)
+    else:
+        trucks = [_pack_container(task) for task in tasks]
+
+    return trucks, unplaced
+
+def _pack_container(task):
+    instance, candidates, maxIter, maxAnt, rE, rD, seed = task
+    n = instance.get_n()
+    for container in candidates:
+        subInstance = sub_instance(instance, range(n), container)
+        boxList, colors_dict = ant_colony(subInstance, maxIter, maxAnt, rE, rD, seed=seed)[:2]
+        if len(boxList) == n:
+            return container, boxList, colors_dict
+
+    # Boxes taken in their order, as in the split
+    solution = rebuild_solution(instance, [[i, True] for i in range(n)])
+    return instance.get_container(), solution.get_boxList(), solution.get_colors_dict()
+
+def sub_instance(instance, indices, container) -> ds.Instance:
+    """
+    Returns the instance with the boxes of the given indices, loaded in container,
+    at the resolution of the instance (reduced to divide the container).
+    """
+    boxList = instance.get_boxList()
+    boxes = [boxList[i] for i in indices]
+    return ds.Instance(len(boxes),
+                       [box.get_w() for box in boxes], [box.get_h() for box in boxes],
+                       [box.get_d() for box in boxes], [box.get_wgt() for box in boxes],
+                       [box.get_id() for box in boxes],
+                       container.get_W(), container.get_H(), container.get_D(), container.get_Wgt(),
+                       math.gcd(instance.get_resolution(), container.get_W(), container.get_D()),
+                       container.get_cogEnvelope(), instance.get_minSupport())
 
 def managePhi(n, phi_box, bestStepList, rE, rD):
     """
@@ -74,6 +422,24 @@ def managePhi(n, phi_box, bestStepList, rE, rD):
         phi_box[i, bestStepList[i][0]] /= rE
         phi_box[i, bestStepList[i][0]] *= rD
         
+def pheromone_entropy(phi):
+    """
+    Mean entropy of the rows of the pheromone matrix, divided by log(n): 1 while
+    the boxes are equally likely at every step, towards 0 as the colony converges.
+
+    Parameters:
+    phi (numpy.ndarray): The pheromone matrix.
+
+    Returns:
+    float: The normalized entropy (1 when n < 2).
+    """
+    n = len(phi)
+    if n < 2:
+        return 1.0
+    p = phi / np.sum(phi, axis=1, keepdims=True)
+    entropy = -np.sum(p * np.log(p, out=np.zeros_like(p), where=p > 0), axis=1)
+    return float(np.mean(entropy) / math.log(n))
+
 def normalize(phi):
     """
     Normalize the input matrix phi by dividing each element by the sum of its corresponding row.
@@ -91,8 +457,199 @@ def normalize(phi):
     phi = phi / sum_lines
     return phi
 
+class PheromoneSampler:
+    """
+    Proportional sampling of the boxes not chosen yet, row by row of the
+    pheromone matrix.
+
+    Every row is kept as a Fenwick tree of its pheromones: drawing a box
+    proportionally to a row and removing a chosen box from a row both take
+    O(log n), and the matrix is never renormalised.
+    """
+    def __init__(self, phi_box):
+        self.n = len(phi_box)
+        self.weights = np.array(phi_box, dtype=float)
+
+        # Fenwick trees of all rows at once: tree[:, k] = sum of weights (k - lowbit(k), k]
+        positions = np.arange(1, self.n + 1)
+        prefix = np.zeros((self.n, self.n + 1))
+        np.cumsum(self.weights, axis=1, out=prefix[:, 1:])
+        self.tree = np.zeros((self.n, self.n + 1))
+        self.tree[:, 1:] = prefix[:, positions] - prefix[:, positions - (positions & -positions)]
+
+        self.highBit = 1 << (self.n.bit_length() - 1)
+
+    def remove(self, box_index, first_row):
+        """
+        Removes a box from the rows first_row, first_row + 1, ...
+        """
+        position = box_index + 1
+        updated = []
+        while position <= self.n:
+            updated.append(position)
+            position += position & -position
+        self.tree[first_row:, updated] -= self.weights[first_row:, box_index, None]
+        self.weights[first_row:, box_index] = 0
+
+    def total(self, row):
+        tree = self.tree[row]
+        total = 0.0
+        position = self.n
+        while position:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    def sample(self, row, rand_num):
+        """
+        Index of the box drawn from `row` for a uniform number rand_num in [0, 1).
+        """
+        tree = self.tree[row]
+        target = rand_num * self.total(row)
+
+        # Largest position whose prefix sum does not exceed the target
+        position = 0
+        step = self.highBit
+        while step:
+            if position + step <= self.n and tree[position + step] <= target:
+                position += step
+                target -= tree[position]
+            step //= 2
+
+        if position >= self.n:
+            # Rounding pushed the target past the last box: take the last box left
+            position = int(np.flatnonzero(self.weights[row])[-1])
+        return position
+
+    def argmax(self, row):
+        return np.argmax(self.weights[row])
+
+class PrefixCache:
+    """
+    Partial solutions of the ants, in a trie of their box orders: the node of
+    the prefix i0, i1, ..., ik keeps the step taken for ik and, every `stride`
+    boxes, a snapshot of the solution after the prefix.
+
+    Snapshots are copy-on-write, so keeping one costs the copy of the state
+    the next add_box makes (the kernel or the extreme points, and the lists
+    of the solution). At most `size` snapshots are kept: the least recently
+    used one is dropped first, and a node without snapshot or children is
+    removed from the trie. The cache can be shared by threads.
+    """
+    class Node:
+        __slots__ = ("parent", "index", "step", "children", "snapshot", "nbytes")
+
+        def __init__(self, parent, step):
+            self.parent = parent
+            self.index = step[0] if step is not None else None
+            self.step = step
+            self.children = {}
+            self.snapshot = None
+            self.nbytes = 0
+
+    def __init__(self, size, stride=4):
+        self.size = size
+        self.stride = stride
+        self.root = PrefixCache.Node(None, None)
+        # Nodes holding a snapshot, least recently used first
+        self.lru = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.nodes = 0
+        self.nbytes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.stepsReused = 0
+        self.evictions = 0
+
+    def lookup(self, order):
+        """
+        Longest prefix of the box indices `order` with a snapshot: returns
+        copies of its steps and its snapshot (an empty list and None when
+        there is none).
+        """
+        with self.lock:
+            self.lookups += 1
+            node = self.root
+            best = None
+            for index in order:
+                node = node.children.get(index)
+                if node is None:
+                    break
+                if node.snapshot is not None:
+                    best = node
+            if best is None:
+                return [], None
+
+            self.hits += 1
+            self.lru.move_to_end(best)
+            stepList = []
+            node = best
+            while node.parent is not None:
+                stepList.append(list(node.step))
+                node = node.parent
+            stepList.reverse()
+            self.stepsReused += len(stepList)
+            return stepList, best.snapshot
+
+    def insert(self, stepList, snapshot, nbytes):
+        """
+        Keeps the snapshot of the solution after the steps of stepList.
+        """
+        with self.lock:
+            node = self.root
+            for step in stepList:
+                parent = node
+                node = parent.children.get(step[0])
+                if node is None:
+                    node = PrefixCache.Node(parent, tuple(step))
+                    parent.children[step[0]] = node
+                    self.nodes += 1
+            if node.snapshot is None:
+                node.snapshot = snapshot
+                node.nbytes = nbytes
+                self.nbytes += nbytes
+            self.lru[node] = None
+            self.lru.move_to_end(node)
+            while len(self.lru) > self.size:
+                self.evict(self.lru.popitem(last=False)[0])
+
+    def evict(self, node):
+        # Drops the snapshot of a node, and the nodes left without snapshot and children
+        node.snapshot = None
+        self.nbytes -= node.nbytes
+        node.nbytes = 0
+        self.evictions += 1
+        while node.parent is not None and node.snapshot is None and not node.children:
+            del node.parent.children[node.index]
+            self.nodes -= 1
+            node = node.parent
+
+    def info(self):
+        """
+        Counters of the cache: lookups, hits (lookups that resumed an ant),
+        stepsReused (steps not computed again), evictions, snapshots and
+        nodes in the trie, and nbytes, the bytes held by the snapshots.
+        """
+        with self.lock:
+            return {"lookups": self.lookups, "hits": self.hits, "stepsReused": self.stepsReused,
+                    "evictions": self.evictions, "snapshots": len(self.lru), "nodes": self.nodes,
+                    "nbytes": self.nbytes}
+
+    @staticmethod
+    def merge_info(infos):
+        """
+        Sum of the counters of several caches, with hitRate, the fraction of
+        the lookups that were hits.
+        """
+        merged = {"lookups": 0, "hits": 0, "stepsReused": 0, "evictions": 0, "snapshots": 0, "nodes": 0, "nbytes": 0}
+        for info in infos:
+            for key in merged:
+                merged[key] += info[key]
+        merged["hitRate"] = merged["hits"] / merged["lookups"] if merged["lookups"] else 0.0
+        return merged
+
 def generate_solution(
-    instance, phi_box, iter, maxIter
+    instance, phi_box, iter, maxIter, rng = random, stats = None, placement = "corners", cache = None
         ) -> ds.Solution:
     """
     This function generates a solution using the ant colony optimization algorithm.
@@ -102,70 +659,105 @@ def generate_solution(
     - phi_box: The pheromone matrix for the boxes.
     - iter: The current iteration number.
     - maxIter: The maximum number of iterations.
+    - rng: The random generator of the ant.
+    - stats: The ds.Stats the phases of the ant are added to (None: not instrumented).
+    - placement: The placement engine of the solution ("corners" or "extreme_points").
+    - cache: The PrefixCache the ant resumes from and adds its partial solutions to (None: no cache).
     
     Returns:
     - solution: The generated solution.
     - stepList: The list of steps taken by the ants.
     """
-    temp_phi = copy.copy(phi_box)
-    stepList = []
-    solution = ds.Solution(instance.get_n(), instance.get_container())
-    boxList = list(instance.get_boxList())
+    if stats is not None:
+        start = time.perf_counter()
+    n = instance.get_n()
+    sampler = PheromoneSampler(phi_box)
+    solution = ds.Solution(n, instance.get_container(), stats=stats, step=instance.get_resolution(),
+                           minSupport=instance.get_minSupport(), placement=placement)
+    boxList = instance.get_boxList()
     
     P = math.log10(iter) / math.log10(maxIter)
 
-    for i in range(instance.get_n()):
-    
-        isRandom = random.random() > P
-        step = next_step(temp_phi[i], isRandom)
+    # The order of the boxes only depends on the pheromones and the random
+    # generator, not on the placements, so it is drawn first
+    order = []
+    for i in range(n):
     
-        newBox = boxList[step[0]]
-        temp_phi[i+1:, step[0]] = 0   
-        temp_phi = normalize(temp_phi)
+        if stats is not None:
+            t = time.perf_counter()
+        isRandom = rng.random() > P
+        step = next_step(sampler, i, isRandom, rng)
+        order.append(step)
+        # The box can no longer be chosen at the next steps
+        sampler.remove(step[0], i+1)
+        if stats is not None:
+            stats.lap("next_step", t)
 
+    # Boxes placed by an ant that took the same first boxes
+    stepList = []
+    if cache is not None:
+        stepList, snapshot = cache.lookup([step[0] for step in order])
+        if stepList:
+            solution.restore(snapshot, private=True)
+        if stats is not None:
+            stats.count("prefix cache steps reused", len(stepList))
+
+    for step in order[len(stepList):]:
+
+        if stats is not None:
+            t = time.perf_counter()
+        # Own copy: compute_position moves and rotates the box
+        newBox = copy.copy(boxList[step[0]])
         isPossible, isRight = compute_position(newBox, solution)
+        if stats is not None:
+            stats.lap("compute_position", t)
         step.append(isPossible)
         step.append(isRight)
         stepList.append(step)
         if isPossible:
             solution.add_box(newBox)
+        if cache is not None and len(stepList) % cache.stride == 0:
+            cache.insert(stepList, solution.snapshot(), solution.nbytes())
 
+    if stats is not None:
+        stats.lap("generate_solution", start)
     return solution, stepList
 
 def next_step(
-    phi_box,
-    isRandom
+    sampler,
+    row,
+    isRandom,
+    rng = random
 ) :
     step = []
-    box_index = choose_box(phi_box, isRandom)
+    box_index = choose_box(sampler, row, isRandom, rng)
     step.append(box_index)
     return step
 
 
 def choose_box(
-    phi_box : list, 
-    isRandom : bool):
+    sampler : PheromoneSampler,
+    row : int,
+    isRandom : bool,
+    rng = random):
     """
-    Choose a box based on the given probabilities.
+    Choose a box based on the pheromones of a row.
 
     Parameters:
-    phi_box (list): A list of probabilities for each box.
-    isRandom (bool): If True, choose a box randomly based on the probabilities. 
-                     If False, choose the box with the highest probability.
+    sampler (PheromoneSampler): The pheromones of the boxes not chosen yet.
+    row (int): The row of the pheromone matrix (the current step).
+    isRandom (bool): If True, choose a box randomly based on the pheromones. 
+                     If False, choose the box with the highest pheromone.
+    rng: The random generator used for the random choice.
 
     Returns:
     int: The index of the chosen box.
 
     """
     if isRandom:
-        prob_cumulatives = [sum(phi_box[:i+1]) for i in range(len(phi_box))]
-        rand_num = random.random()
-
-        for i, prob_cumulative in enumerate(prob_cumulatives):
-            if rand_num <= prob_cumulative:
-                return i
+        return sampler.sample(row, rng.random())
     else:
-        return np.argmax(phi_box)
+        return sampler.argmax(row)
 
 
 
@@ -186,32 +778,66 @@ def compute_position(
         for the box, and the second value indicates whether the box was placed on the right side of the corner.
 
     """
-    # Iterate over each corner in the solution
-    for corner in solution.get_cornerList():
-
-        if box.fitInCorner(corner):
-            isRight = False
-            if box.possible_rotation(corner) and corner.is_betterWithRotation(solution, box):
-                # Rotate the box if it provides a better fit with rotation
-                temp = box.get_w()
-                box.set_w(box.get_d())
-                box.set_d(temp)
-
-            # Check if the box provides a better fit on the right side of the corner
-            if corner.is_betterOnRight(solution, box) :#or True:
-                # Set the position of the box on the right side of the corner
-                box.set_x(corner.get_x())
-                box.set_y(corner.get_y())
-                box.set_z(corner.get_z())
-                box.set_centerPoint([corner.get_x() + (box.get_w() / 2), corner.get_y() + (box.get_d() / 2)])
-                isRight = True
-            else:
-                # Set the position of the box on the left side of the corner
-                box.set_x(corner.get_x() + corner.get_w() - box.get_w())
-                box.set_y(corner.get_y())
-                box.set_z(corner.get_z())
-                box.set_centerPoint([corner.get_x() + (box.get_w() / 2), corner.get_y() + (box.get_d() / 2)])
+    # Weight limit of the container
+    if solution.get_totalWeight() + box.get_wgt() > solution.get_container().get_Wgt():
+        if solution.stats is not None:
+            solution.stats.count("failed placements")
+        return False, False
+
+    # First corner of the solution the box fits in
+    corner = solution.first_fit_corner(box.get_w(), box.get_d(), box.get_h())
+    if corner is None:
+        if solution.stats is not None:
+            solution.stats.count("failed placements")
+        return False, False
+
+    isRight = False
+    # The box is left as it was when it is refused below
+    original = (box.get_x(), box.get_y(), box.get_z(), box.get_w(), box.get_d(), box.get_centerPoint())
+    w, d = box.get_w(), box.get_d()
+    if box.possible_rotation(corner) and corner.is_betterWithRotation(solution, box):
+        # Rotate the box if it provides a better fit with rotation
+        temp = box.get_w()
+        box.set_w(box.get_d())
+        box.set_d(temp)
+
+    # Check if the box provides a better fit on the right side of the corner
+    if corner.is_betterOnRight(solution, box) :#or True:
+        # Set the position of the box on the right side of the corner
+        box.set_x(corner.get_x())
+        box.set_y(corner.get_y())
+        box.set_z(corner.get_z())
+        box.set_centerPoint([corner.get_x() + (box.get_w() / 2), corner.get_y() + (box.get_d() / 2)])
+        isRight = True
+    else:
+        # Set the position of the box on the left side of the corner
+        box.set_x(corner.get_x() + corner.get_w() - box.get_w())
+        box.set_y(corner.get_y())
+        box.set_z(corner.get_z())
+        box.set_centerPoint([box.get_x() + (box.get_w() / 2), corner.get_y() + (box.get_d() / 2)])
+
+    # The footprint checked by first_fit_corner is the fallback when the
+    # rotated or shifted one does not fit
+    if not solution.settle(box):
+        box.set_w(w)
+        box.set_d(d)
+        box.set_x(corner.get_x())
+        box.set_y(corner.get_y())
+        box.set_z(corner.get_z())
+        box.set_centerPoint([corner.get_x() + (w / 2), corner.get_y() + (d / 2)])
+        isRight = True
 
-            return True, isRight
+    # Centre of gravity envelope of the container, at the chosen position
+    if not solution.can_carry(box):
+        if solution.stats is not None:
+            solution.stats.count("failed placements")
+        x, y, z, w, d, centerPoint = original
+        box.set_x(x)
+        box.set_y(y)
+        box.set_z(z)
+        box.set_w(w)
+        box.set_d(d)
+        box.set_centerPoint(centerPoint)
+        return False, False
 
-    return False, False
\ No newline at end of file
+    return True, isRight
@@ -1,21 +1,25 @@
 import numpy as np 
 cimport numpy as np
-import matplotlib.pyplot as plt 
-from utils import create_cube
-import time, sys, random
+from common.placement_kernel cimport Kernel, Corner_t
+import time, sys, random, math
+from common.load_distribution import envelope_gap, load_grid
+from common.stats import Stats
 
 cdef class Container:
     cdef int W, H, D, Wgt
+    # (xmin, xmax, ymin, ymax) the centre of gravity of the load must stay in (None: anywhere)
+    cdef tuple cogEnvelope
 
-    def __cinit__(self, int W, int H, int D, int Wgt):
+    def __cinit__(self, int W, int H, int D, int Wgt, tuple cogEnvelope=None):
         self.W = W
         self.H = H
         self.D = D
         self.Wgt = Wgt
+        self.cogEnvelope = cogEnvelope
 
     def __reduce__(self):
         # Retourne un tuple contenant une fonction de réduction et un tuple d'arguments
-        return (self.__class__, (self.W, self.H, self.D, self.Wgt))
+        return (self.__class__, (self.W, self.H, self.D, self.Wgt, self.cogEnvelope))
     
     # Méthode pour recréer l'objet Cython à partir de ses états
     @staticmethod
@@ -35,6 +39,9 @@ cdef class Container:
     cpdef int get_Wgt(self):
         return self.Wgt
 
+    cpdef tuple get_cogEnvelope(self):
+        return self.cogEnvelope
+
 cdef class Corner:
     cdef int x, y, z, w, d, h
 
@@ -119,6 +126,8 @@ cdef class Box:
 
     cpdef void set_centerPoint(self, list centerPoint):
         self.centerPoint = centerPoint
+    cpdef list get_centerPoint(self):
+        return self.centerPoint
 
     cpdef int get_w(self):
         return self.w
@@ -134,6 +143,8 @@ cdef class Box:
         return self.z
     cpdef int get_id(self):
         return self.id
+    cpdef int get_wgt(self):
+        return self.wgt
 
     cpdef bint fitInCorner(self, corner) except *:
         cdef Corner c = <Corner>corner
@@ -148,16 +159,32 @@ cdef class Instance:
     cdef int n
     cdef list boxList
     cdef Container container
+    # Step of the corner computation, a divisor of every floor dimension
+    cdef int resolution
+    # Fraction of the base of a box that has to rest on the boxes below (0: off)
+    cdef double minSupport
 
-    def __cinit__(self, int n, list w, list h, list d, list wgt, list ids, int W, int H, int D, int Wgt):
+    def __cinit__(self, int n, list w, list h, list d, list wgt, list ids, int W, int H, int D, int Wgt,
+                  int resolution=0, tuple cogEnvelope=None, double minSupport=0.0):
         self.n = n
         self.boxList = []
-        self.container = Container(W, H, D, Wgt)
+        self.container = Container(W, H, D, Wgt, cogEnvelope)
 
         cdef int i
         for i in range(n):
             self.boxList.append(Box(0, 0, 0, w[i], h[i], d[i], wgt[i], ids[i]))
 
+        # The largest step dividing W, D and the w and d of the boxes, or the given one (0: detect)
+        cdef int common = math.gcd(W, D, *w[:n], *d[:n])
+        if resolution == 0:
+            resolution = common
+        elif resolution < 0 or common % resolution:
+            raise ValueError(f"resolution {resolution} does not divide the floor dimensions (their gcd is {common})")
+        self.resolution = max(resolution, 1)
+        if not 0 <= minSupport <= 1:
+            raise ValueError(f"minSupport {minSupport} is not between 0 and 1")
+        self.minSupport = minSupport
+
     cpdef int get_n(self):
         return self.n
 
@@ -167,6 +194,25 @@ cdef class Instance:
     cpdef Container get_container(self):
         return self.container
 
+    cpdef int get_resolution(self):
+        return self.resolution
+
+    cpdef double get_minSupport(self):
+        return self.minSupport
+
+    def __reduce__(self):
+        cdef Box box
+        return (self.__class__, (
+            self.n,
+            [box.w for box in self.boxList],
+            [box.h for box in self.boxList],
+            [box.d for box in self.boxList],
+            [box.wgt for box in self.boxList],
+            [box.id for box in self.boxList],
+            self.container.W, self.container.H, self.container.D, self.container.Wgt,
+            self.resolution, self.container.cogEnvelope, self.minSupport,
+            ))
+
     def init_example(cls):
         cdef int W = 2550
         cdef int H = 2700
@@ -201,6 +247,13 @@ cdef class Instance:
         print(len(w),"-",n)
         return cls(n, w, h, d, wgt, ids, W, H, D, Wgt)
 
+def _box_top(Box box):
+    return box.z + box.h
+
+# Placement engines of a Solution: the corners of the height map, or the
+# extreme points of the placed boxes
+PLACEMENTS = ("corners", "extreme_points")
+
 cdef class Solution:
     cdef int nTotalBox
     cdef Container container
@@ -209,37 +262,54 @@ cdef class Solution:
     cdef int totalDeep
     cdef int totalWidth
     cdef list boxList
-    cdef list cornerList
-    cdef list coordonateCornerList
     cdef dict colors_dict
     cdef list gravityCenter
-    cdef heightMatrix
-    cdef weightMatrix
-
-    def __cinit__(self, int n, Container container):
+    # Height map, corners and first-fit index, in C (placement_kernel)
+    cdef Kernel kernel
+    cdef bint incremental, debugCorners
+    cdef bint shared
+    cdef list undoLog
+    # Step of the corner computation (Instance resolution)
+    cdef int step
+    # Fraction of the base of a box that has to be supported (Instance minSupport)
+    cdef double minSupport
+    # Placement engine: "corners" of the kernel height map, or "extreme_points"
+    # of the placed boxes (common.extreme_points.ExtremePoints, None with the corners)
+    cdef str placement
+    cdef object extremePoints
+    # Instrumentation of add_box and the corner computation (None: off)
+    cdef public object stats
+
+    def __cinit__(self, int n, Container container, bint incremental=True, bint debugCorners=False, bint undo=False,
+                  object stats=None, int step=1, double minSupport=0.0, str placement="corners"):
+        if placement not in PLACEMENTS:
+            raise ValueError(f"placement must be one of {PLACEMENTS}, not {placement!r}")
         self.nTotalBox = n
+        self.step = step
+        self.minSupport = minSupport
         self.container = container
+        self.stats = stats
         self.totalWeight = 0
         self.totalHeight = 0
         self.totalDeep = 0
         self.totalWidth = 0
         self.boxList = []
-        self.heightMatrix = np.zeros((self.container.D, self.container.W), dtype=np.float64)
-        self.weightMatrix = np.zeros((self.container.D, self.container.W), dtype=np.float64)
-        self.cornerList = [Corner(
-            x=0, y=0, z=0,
-            w=self.container.W, d=self.container.D, h=self.container.H)]
-        self.coordonateCornerList = []
+        self.kernel = Kernel(container.W, container.H, container.D, False, incremental, step, minSupport)
+        self.placement = placement
+        self.extremePoints = None
+        if placement == "extreme_points":
+            from common.extreme_points import ExtremePoints
+            self.extremePoints = ExtremePoints(container.W, container.H, container.D, minSupport)
+        self.incremental = incremental
+        self.debugCorners = debugCorners
         self.colors_dict = {} 
 
         self.gravityCenter = [np.array([0, 0], dtype=np.float64), 0]
-        
 
-    cpdef void set_heightMatrix(self, value):
-        self.heightMatrix = value 
-    
-    cpdef void set_weightMatrix(self, value):
-        self.weightMatrix = value 
+        # True while the state is shared with a snapshot or a clone
+        self.shared = False
+        # Snapshots taken before each add_box, to undo them
+        self.undoLog = [] if undo else None
 
     cpdef void set_totalWeight(self, value):
         self.totalWeight = value
@@ -256,18 +326,15 @@ cdef class Solution:
     cpdef void set_boxList(self, value):
         self.boxList = value
 
-    cpdef void set_cornerList(self, value):
-        self.cornerList = value
-
-    cpdef void set_coordonateCornerList(self, value):
-        self.coordonateCornerList = value
-
     cpdef void set_colors_dict(self, value):
         self.colors_dict = value
 
     cpdef void set_gravityCenter(self, value):
         self.gravityCenter = value
 
+    cpdef Container get_container(self):
+        return self.container
+
     cpdef int get_totalWeight(self):
         return self.totalWeight
 
@@ -284,10 +351,12 @@ cdef class Solution:
         return self.boxList
 
     cpdef list get_cornerList(self):
-        return self.cornerList
+        if self.extremePoints is not None:
+            return [Corner(*corner) for corner in self.extremePoints.corners()]
+        return [Corner(*corner) for corner in self.kernel.corners()]
 
     cpdef list get_coordonateCornerList(self):
-        return self.coordonateCornerList
+        return self.kernel.points()
 
     cpdef dict get_colors_dict(self):
         return self.colors_dict
@@ -295,11 +364,62 @@ cdef class Solution:
     cpdef list get_gravityCenter(self):
         return self.gravityCenter
 
-    cpdef get_heightMatrix(self):
-        return self.heightMatrix
-
-    cpdef get_weightMatrix(self):
-        return self.weightMatrix
+    cpdef tuple get_heightMatrix(self):
+        """ (xs, ys, cells) of the coordinate-compressed height map """
+        return self.top_view().height_map()
+
+    cpdef Kernel top_view(self):
+        # The kernel, or with the extreme points a kernel of the placed boxes built on demand
+        cdef Box box
+        cdef Kernel kernel
+        if self.extremePoints is None:
+            return self.kernel
+        kernel = Kernel(self.container.W, self.container.H, self.container.D, True, True, self.step, self.minSupport)
+        for box in sorted(self.boxList, key=_box_top):
+            kernel.add_box(box.x, box.y, box.z, box.w, box.d, box.h, box.wgt)
+        return kernel
+
+    cpdef tuple get_weightMatrix(self):
+        return self.load_distribution()
+
+    def load_distribution(self, int resolution=0):
+        """
+        (xs, ys, loads) of the floor cut in resolution x resolution cells (the
+        step of the solution by default): cell (i, j) covers
+        [xs[j], xs[j+1]) x [ys[i], ys[i+1]) and carries the weight of the boxes
+        spread evenly over their footprint. Computed from boxList on each call;
+        loads.sum(axis=1) is the load profile along the depth.
+        """
+        cdef Box box
+        boxes = np.array([(box.x, box.y, box.w, box.d, box.wgt) for box in self.boxList], dtype=float).reshape(-1, 5)
+        return load_grid(boxes, self.container.W, self.container.D, resolution if resolution > 0 else self.step)
+
+    cpdef tuple axle_loads(self, double front, double rear):
+        """
+        (front load, rear load) on two supports at depths front < rear (e.g.
+        kingpin and rear axle group), from the centre of gravity of the load.
+        """
+        cdef double rearLoad = self.totalWeight * (self.gravityCenter[0][1] - front) / (rear - front)
+        return self.totalWeight - rearLoad, rearLoad
+
+    cpdef bint can_carry(self, Box box) except *:
+        """
+        Whether the load stays within the weight limit of the container with
+        box at its position, and its centre of gravity within the envelope of
+        the container (or no further from it than without the box), in O(1).
+        """
+        cdef int weight = self.totalWeight + box.wgt
+        cdef double x, y
+        cdef tuple envelope = self.container.cogEnvelope
+        if weight > self.container.Wgt:
+            return False
+        if envelope is None or weight == 0:
+            return True
+        gcCdnt, gcWgt = self.gravityCenter
+        x = (gcCdnt[0] * gcWgt + box.centerPoint[0] * box.wgt) / weight
+        y = (gcCdnt[1] * gcWgt + box.centerPoint[1] * box.wgt) / weight
+        # The first boxes start outside: they may not move it away from the envelope
+        return gcWgt == 0 or envelope_gap(envelope, x, y) <= envelope_gap(envelope, gcCdnt[0], gcCdnt[1])
     
     cpdef double evaluate(self) :
         return -len(self.boxList)
@@ -309,98 +429,201 @@ cdef class Solution:
         return np.linalg.norm([goodCenterPoint[0] - gravityCenterPoint[0], goodCenterPoint[1] - gravityCenterPoint[1]])
     
     def __reduce__(self):
-        return (self.__class__, (
+        # Only the placed boxes are kept, the rest is rebuilt by replaying them
+        return (_solution_from_boxList, (
             self.nTotalBox,
             self.container,
-            self.totalWeight,
-            self.totalHeight,
-            self.totalDeep,
-            self.totalWidth,
-            self.heightMatrix,
-            self.weightMatrix,
-            self.cornerList,
-            self.coordonateCornerList,
+            self.boxList,
             self.colors_dict,
             self.gravityCenter,
+            self.incremental,
+            self.debugCorners,
+            self.undoLog is not None,
+            self.step,
+            self.minSupport,
+            self.placement,
             ))
 
-
-
-    @staticmethod
-    cdef create_from_states(cls,
-        nTotalBox,
-        container,
-        totalWeight,
-        totalHeight,
-        totalDeep,
-        totalWidth,
-        heightMatrix,
-        weightMatrix,
-        cornerList,
-        coordonateCornerList,
-        colors_dict,
-        gravityCenter,
-    ):
-        obj = cls.__new__(cls)
-        obj.container = container
-        obj.set_totalWeight(totalWeight)
-        obj.set_totalHeight(totalHeight)
-        obj.set_totalDeep(totalDeep)
-        obj.set_totalWidth(totalWidth)
-        obj.set_heightMatrix(heightMatrix)
-        obj.set_weightMatrix(weightMatrix)
-        obj.set_cornerList(cornerList)
-        obj.set_coordonateCornerList(coordonateCornerList)
-        obj.set_colors_dict(colors_dict)
-        obj.set_gravityCenter(gravityCenter)
-        return obj
-
-
-    cdef void computeCorner(self, int x_start, int y_start):
-        cdef int ground_level, w, d1, d2, d_min
-        cdef int x_end, y_end
- 
-        ground_level = self.heightMatrix[y_start, x_start]
-        w = 0
-        d1 = 0
-        d2 = 0
-        d_min = self.container.D
-        x_end = self.container.W 
-        y_end = self.container.D
-
-        while (x_start + w) < x_end and self.heightMatrix[y_start, x_start + w] == ground_level:
-            w += 10
-        
-        while (y_start + d1) < y_end and self.heightMatrix[y_start + d1, x_start] == ground_level:
-            d1 += 10
-
-        new_start = x_start + w - 1
-        while (y_start + d2) < y_end and self.heightMatrix[y_start + d2, new_start] == ground_level:
-            d2 += 10
- 
-        d_min = min(d1, d2)
-        self.cornerList.append(Corner(x_start, y_start, ground_level, w, d_min, self.container.H - ground_level))
-        
-    cdef void update_heightMatrix(self, Box box):
-        cdef int x_start = box.x 
-        cdef int x_end = x_start + box.w 
-        cdef int y_start = box.y 
-        cdef int y_end = y_start + box.d 
-        cdef int height = box.z + box.h 
-
-        self.heightMatrix[y_start:y_end,x_start:x_end] = max(height,self.heightMatrix[y_start,x_start])
-        self.weightMatrix[y_start:y_end,x_start:x_end] += box.wgt
-
-    cdef void recompute_cornerList(self):
-        cdef int i, x, y
-        self.cornerList = []
-
-        for (x,y) in self.coordonateCornerList:
-            if (y < self.container.D and x < self.container.W):
-                self.computeCorner(x, y)  
+    cpdef tuple snapshot(self):
+        """
+        Returns the current state of the solution. It stays shared with the
+        solution until one of them is changed (copy-on-write), so taking a
+        snapshot does not copy anything.
+        """
+        self.shared = True
+        return (self.totalWeight, self.totalHeight, self.totalDeep, self.totalWidth,
+                self.boxList, self.colors_dict, self.gravityCenter, self.kernel, self.extremePoints)
+
+    cpdef void restore(self, tuple snapshot, bint private=False):
+        """
+        Goes back to a snapshot. With `private`, the state is copied at once
+        instead of on the next change, so the snapshot is never queried by this
+        solution (the kernel updates its support index on queries, so a
+        snapshot used by several threads has to be restored this way).
+        """
+        (self.totalWeight, self.totalHeight, self.totalDeep, self.totalWidth,
+         self.boxList, self.colors_dict, self.gravityCenter, self.kernel, self.extremePoints) = snapshot
+        self.shared = True
+        if private:
+            self.unshare()
+
+    cpdef Solution clone(self):
+        cdef Solution other = Solution(self.nTotalBox, self.container, self.incremental, self.debugCorners,
+                                       self.undoLog is not None, self.stats, self.step, self.minSupport, self.placement)
+        other.restore(self.snapshot())
+        return other
+
+    cpdef long nbytes(self):
+        """
+        Bytes held by the state of the solution (its placement engine and
+        lists, not the boxes), as kept by a snapshot.
+        """
+        cdef long size = sys.getsizeof(self.boxList) + sys.getsizeof(self.colors_dict)
+        if self.extremePoints is None:
+            return size + self.kernel.nbytes()
+        return size + self.extremePoints.nbytes()
+
+    cdef void unshare(self):
+        # Copy the state shared with snapshots before changing it
+        self.boxList = list(self.boxList)
+        self.colors_dict = dict(self.colors_dict)
+        self.gravityCenter = list(self.gravityCenter)
+        if self.extremePoints is None:
+            self.kernel = self.kernel.copy()
+        else:
+            self.extremePoints = self.extremePoints.copy()
+        self.shared = False
+
+    cpdef Box undo(self):
+        """
+        Removes the last box added and returns it (needs Solution(undo=True)).
+        """
+        cdef Box box = self.boxList[-1]
+        self.restore(self.undoLog.pop())
+        return box
+
+    cpdef tuple computeCorner(self, int x_start, int y_start):
+        """
+        Returns the corner at (x_start, y_start) and the last y it sampled,
+        which bounds the area a later placement has to touch to change it.
+        """
+        cdef int reach
+        cdef Corner_t corner = self.kernel.corner_at(x_start, y_start, &reach)
+        return Corner(corner.x, corner.y, corner.z, corner.w, corner.d, corner.h), reach
+
+    cpdef Corner first_fit_corner(self, int w, int d, int h, bint rotation=False):
+        """
+        First corner of the corner list a w x d x h box fits in, or None.
+        With the extreme points, the first point the box fits at and its
+        residual space.
+        """
+        cdef Corner_t corner
+        cdef bint found
+        if self.extremePoints is not None:
+            point = self.extremePoints.first_fit(w, d, h, rotation)
+            if self.stats is not None:
+                self.count_kernel()
+            return None if point is None else Corner(*point)
+        with nogil:
+            found = self.kernel.first_fit_corner(w, d, h, rotation, &corner)
+        if self.stats is not None:
+            self.count_kernel()
+        if not found:
+            return None
+        return Corner(corner.x, corner.y, corner.z, corner.w, corner.d, corner.h)
+
+    def corner_array(self):
+        """
+        (n, 6) int64 array of the x, y, z, w, d, h of the corners, in the order of get_cornerList.
+        """
+        if self.extremePoints is not None:
+            return self.extremePoints.points.copy()
+        return self.kernel.corner_array()
+
+    def fit_matrix(self, boxes):
+        """
+        Every box against every corner of corner_array() in one call. boxes is
+        a list of Box or an (m, 3) array of their w, d, h. Returns (m, n)
+        arrays (fits, fitsRotated, score): whether the box fits in the space
+        of the corner as it is (fitInCorner) and turned so that its w goes
+        along y, and the loading meters (test_loading_meters) with the box at
+        the corner in the best orientation that fits (inf if none does).
+        As with fitInCorner, the support of the box is not checked.
+        """
+        corners = self.corner_array()
+        if not isinstance(boxes, np.ndarray):
+            boxes = np.array([(box.get_w(), box.get_d(), box.get_h()) for box in boxes], dtype=np.int64).reshape(-1, 3)
+        w, d, h = (boxes[:, k, None] for k in range(3))
+        x, y, cw, cd, ch = (corners[None, :, k] for k in (0, 1, 3, 4, 5))
+        fits = (w <= cw) & (d <= cd) & (h <= ch)
+        fitsRotated = (d <= cw) & (w <= cd) & (h <= ch)
+        score = np.where(fits, np.maximum(self.totalWidth, x + w) + np.maximum(self.totalDeep, y + d), np.inf)
+        scoreRotated = np.where(fitsRotated, np.maximum(self.totalWidth, x + d) + np.maximum(self.totalDeep, y + w), np.inf)
+        return fits, fitsRotated, np.minimum(score, scoreRotated)
+
+    cpdef double get_minSupport(self):
+        return self.minSupport
+
+    cpdef int get_nTotalBox(self):
+        return self.nTotalBox
+
+    cpdef int get_step(self):
+        return self.step
+
+    cpdef str get_placement(self):
+        return self.placement
+
+    cpdef tuple support(self, int x, int y, int w, int d):
+        """
+        (highest, lowest, area at the highest) of the height map under the
+        w x d footprint at (x, y), with range max queries.
+        """
+        return self.top_view().support(x, y, w, d)
+
+    cpdef bint settle(self, Box box) except *:
+        """
+        Lowers the box onto the highest cell under its footprint and returns
+        whether it fits under the roof and rests on at least minSupport of its
+        base, so that it never cuts into a taller neighbour. With the extreme
+        points, whether the box fits where it is (ExtremePoints.fits).
+        """
+        if self.extremePoints is not None:
+            return self.extremePoints.fits(box.x, box.y, box.z, box.w, box.d, box.h)
+        ok, z = self.kernel.is_supported(box.x, box.y, box.w, box.d, box.h)
+        if ok:
+            box.z = z
+        return ok
+
+    cdef void count_kernel(self):
+        engine = self.kernel if self.extremePoints is None else self.extremePoints
+        cornersEvaluated, fitTests, cellsScanned = engine.take_counters()
+        if cornersEvaluated:
+            self.stats.count("corners evaluated", cornersEvaluated)
+            self.stats.count("cells scanned", cellsScanned)
+        if fitTests:
+            self.stats.count("fit tests", fitTests)
+
+    cpdef void check_cornerList(self) except *:
+        # Debug: compare the current corners with a full recompute
+        if self.extremePoints is not None:
+            self.extremePoints.check()
+            return
+        current = self.kernel.corners()
+        self.kernel.recompute()
+        if current != self.kernel.corners():
+            raise RuntimeError(f"Incremental corner list differs from full recompute after {len(self.boxList)} boxes")
 
     cpdef void add_box(self, Box box):
-        cdef int x, y
+        cdef object stats = self.stats
+        cdef double start, t
+        cdef int failed
+        if stats is not None:
+            start = t = time.perf_counter()
+
+        if self.undoLog is not None:
+            self.undoLog.append(self.snapshot())
+        if self.shared:
+            self.unshare()
         
         self.boxList.append(box)
 
@@ -414,43 +637,40 @@ cdef class Solution:
 
         if box.id not in self.colors_dict:
             self.colors_dict[box.id] = (random.random(), random.random(), random.random())
-
-        x = box.x
-        y = box.y
-
-        if (x,y) not in self.coordonateCornerList:
-            self.coordonateCornerList.append((x,y))
-        if (x + box.w,y) not in self.coordonateCornerList:
-            self.coordonateCornerList.append((x + box.w,y))
-        if (x,y + box.d) not in self.coordonateCornerList:
-            self.coordonateCornerList.append((x,y + box.d))
-        if (x + box.w,y + box.d) not in self.coordonateCornerList:
-            self.coordonateCornerList.append((x + box.w,y + box.d))
-        
-        self.update_heightMatrix(box)
-        self.recompute_cornerList()
+        if stats is not None:
+            t = stats.lap("add_box bookkeeping", t)
+
+        # Corner points, height map, corners and index (or the extreme points)
+        if self.extremePoints is not None:
+            self.extremePoints.add_box(box.x, box.y, box.z, box.w, box.d, box.h, box.wgt)
+        else:
+            with nogil:
+                failed = self.kernel.place(box.x, box.y, box.z, box.w, box.d, box.h, box.wgt)
+            if failed:
+                raise MemoryError()
+        if stats is not None:
+            t = stats.lap("place", t)
+            self.count_kernel()
+
+        if self.debugCorners:
+            self.check_cornerList()
+
+        if stats is not None:
+            stats.lap("add_box", start)
 
     cpdef void vizualise_3D(self):
-        cdef int W = self.container.W
-        cdef int D = self.container.D
-        cdef int H = self.container.H
-        
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
-        
-        cdef int l = max(W, D, H)
-        ax.auto_scale_xyz([0, l], [0, l], [0, l])
-        
-        ax.set_xlabel('X')
-        ax.set_ylabel('Y')
-        ax.set_zlabel('Z')
-        
-        for box in self.boxList:
-            ax = create_cube(box.get_w(), box.get_d(), box.get_h(), box.get_x(), box.get_y(), box.get_z(), ax, 0.9, self.colors_dict[box.get_id()])
+        from utils import visualize_3D_boxList
+
+        visualize_3D_boxList(self.container, self.boxList, self.colors_dict)
 
-        ax = create_cube(W, D, H, 0, 0, 0, ax, 0, (0, 0, 0))
+    cpdef void export(self, str path, int dpi=150):
+        """
+        Writes the solution without any display: a mesh (.obj) or an image
+        (.png, .svg, ...), see utils.export_boxes.
+        """
+        from utils import export_boxList
 
-        plt.show()
+        export_boxList(path, self.container, self.boxList, self.colors_dict, dpi)
 
     def __str__(self):
         cdef str result = "Solution:\n"
@@ -465,3 +685,13 @@ cdef class Solution:
 
         return result
 
+def _solution_from_boxList(int n, Container container, list boxList, dict colors_dict, list gravityCenter,
+                           bint incremental, bint debugCorners, bint undo, int step, double minSupport=0.0,
+                           str placement="corners"):
+    # Unpickling: replay the placed boxes on a new Solution
+    cdef Solution solution = Solution(n, container, incremental, debugCorners, undo, None, step, minSupport, placement)
+    solution.colors_dict = dict(colors_dict)
+    for box in boxList:
+        solution.add_box(box)
+    solution.gravityCenter = list(gravityCenter)
+    return solution
@@ -1,17 +1,17 @@
-import matplotlib.pyplot as plt 
 import numpy as np 
 import time
-import data_structures as ds
+# Puts the modules shared with the greedy solver on sys.path before data_structures needs them
 from ACO import ant_colony
-from utils import visualize_3D_boxList
+import data_structures as ds
 
-def create_random_instance(nb_boxes):
-    # Generate random dimensions and weights for boxes
-    d = 10*np.random.randint(2, 5, nb_boxes)
-    w = 10*np.random.randint(2, 5, nb_boxes)
-    h = 10*np.random.randint(2, 5, nb_boxes)
-    wgt = 10*np.random.randint(2, 5, nb_boxes)
-    ids = np.random.randint(2, 5, nb_boxes)
+def create_random_instance(nb_boxes, seed=None):
+    # Generate random dimensions and weights for boxes (the same ones for a given seed)
+    rng = np.random.RandomState(seed)
+    d = 10*rng.randint(2, 5, nb_boxes)
+    w = 10*rng.randint(2, 5, nb_boxes)
+    h = 10*rng.randint(2, 5, nb_boxes)
+    wgt = 10*rng.randint(2, 5, nb_boxes)
+    ids = rng.randint(2, 5, nb_boxes)
 
     # Define container dimensions and weight
     W = 100
@@ -19,7 +19,7 @@ def create_random_instance(nb_boxes):
     D = 100
     Wgt = 3000
 
-    return list(d),list(h),list(w),list(ids),list(wgt),D,H,W,Wgt
+    return ds.Instance(nb_boxes, w.tolist(), h.tolist(), d.tolist(), wgt.tolist(), ids.tolist(), W, H, D, Wgt)
 
 def main():
     """
@@ -29,10 +29,11 @@ def main():
         - maxAnt : The number of ant for each iteration (10 by default)
         - rE : Rate of evaporation of the pheromones after each iteration (0.8 by default)
         - rD : Rate of deposition of the pheromones after each iteration (1.2 by default)")
+        - workers : Number of processes the ants of an iteration are spread over (1 by default)
     """
     # Choose an instance to solve
     
-    # instance = create_random_instance(nb_boxes = 50)
+    # instance = create_random_instance(nb_boxes = 50, seed = 0)
     instance = ds.Instance.init_example(ds.Instance)
 
     # Define parameters for reinforcement learning
@@ -40,19 +41,23 @@ def main():
     maxAnt = 10
     rE = 0.8
     rD = 1.2
+    workers = 1
 
-    print(f"Parameters :\n\t- maxIter = {maxIter}\n\t- maxAnt = {maxAnt}\n\t- rE = {rE}\n\t- rD = {rD}")
+    print(f"Parameters :\n\t- maxIter = {maxIter}\n\t- maxAnt = {maxAnt}\n\t- rE = {rE}\n\t- rD = {rD}\n\t- workers = {workers}")
     # Run reinforcement learning and measure time
     t = time.time()
-    solution_boxList, colors_dict, allZ, allBestZ, bestZ = ant_colony(instance,maxIter,maxAnt,rE,rD)
+    solution_boxList, colors_dict, allZ, allBestZ, bestZ = ant_colony(instance,maxIter,maxAnt,rE,rD,workers)
     print("----------------------------------------")
     print("bestZ = ", bestZ)
     print("total time = ", time.time() - t)
 
     # Visualize solution and plot evolution of best Z value
+    import matplotlib.pyplot as plt
+    from utils import visualize_3D_boxList
     visualize_3D_boxList(instance.get_container(),solution_boxList,colors_dict)
     plt.plot(range(len(allZ)), allZ, marker='o', linestyle='-')
     plt.title(f'Evolution of the Z value, Iterations = {maxIter}, Ants = {maxAnt}, rho_E = {rE}, rho_D = {rD}')
     plt.show()
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 """
-Not necessary to use
+Builds the Cython modules in place:
+    python setup.py build_ext --inplace
+The placement kernel they use is built first, from the parent directory (see its setup.py).
 """
 
-from setuptools import setup
+from setuptools import setup, Extension
 from Cython.Build import cythonize
+import numpy, os
 
 setup(
-    ext_modules=cythonize("data_structures.pyx"),
+    ext_modules=cythonize([
+        Extension("data_structures", ["data_structures.pyx"], include_dirs=[numpy.get_include()]),
+    ], include_path=[os.pardir]),
 )
@@ -0,0 +1,275 @@
+import contextlib, copy, io, random, time
+import numpy as np
+import pytest
+import data_structures as ds
+from ACO import (PheromoneSampler, PrefixCache, ant_colony, ant_colony_fleet, compute_position, generate_solution,
+                 local_search, managePhi, normalize, rebuild_solution, replay)
+from main import create_random_instance
+
+
+def placed(boxList):
+    return [(box.get_id(), box.get_x(), box.get_y(), box.get_z(), box.get_w(), box.get_d(), box.get_h())
+            for box in boxList]
+
+
+def solve(instance, **options):
+    # The colony reports its progress on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = ant_colony(instance, 3, 4, 0.8, 1.2, seed=7, **options)
+    return placed(result[0]), result[3]
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_ant_colony_seed_does_not_depend_on_workers(placement):
+    instance = create_random_instance(30, 0)
+    expected = solve(instance, placement=placement)
+    assert solve(instance, placement=placement, workers=2) == expected
+    assert solve(instance, placement=placement, workers=2, threads=True) == expected
+    assert solve(instance, placement=placement, workers=2, cacheSize=16) == expected
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_boxes_never_overlap(placement):
+    # Without minSupport, a box still goes on top of the highest cell under its whole footprint
+    instance = create_random_instance(80, 5)
+    solution = ds.Solution(instance.get_n(), instance.get_container(), step=instance.get_resolution(), placement=placement)
+    replay(instance, list(range(instance.get_n())), solution)
+    boxes = placed(solution.get_boxList())
+    H = instance.get_container().get_H()
+    for k, (_, x, y, z, w, d, h) in enumerate(boxes):
+        assert z + h <= H
+        for _, x2, y2, z2, w2, d2, h2 in boxes[k + 1:]:
+            assert x + w <= x2 or x2 + w2 <= x or y + d <= y2 or y2 + d2 <= y or z + h <= z2 or z2 + h2 <= z
+
+
+def test_local_search_keeps_or_improves_the_order():
+    instance = create_random_instance(40, 1)
+    order = list(range(instance.get_n()))
+    start = ds.Solution(instance.get_n(), instance.get_container(), step=instance.get_resolution())
+    replay(instance, order, start)
+    solution, stepList = local_search(instance, order, 0.5, seed=0)
+    assert len(solution.get_boxList()) >= len(start.get_boxList())
+    assert placed(rebuild_solution(instance, stepList).get_boxList()) == placed(solution.get_boxList())
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_fit_matrix_matches_the_corner_checks(placement):
+    instance = create_random_instance(40, 4)
+    solution = ds.Solution(instance.get_n(), instance.get_container(), placement=placement)
+    replay(instance, list(range(instance.get_n())), solution)
+    corners = solution.get_cornerList()
+    assert solution.corner_array().tolist() == [[c.get_x(), c.get_y(), c.get_z(), c.get_w(), c.get_d(), c.get_h()]
+                                                for c in corners]
+    boxes = instance.get_boxList()
+    fits, fitsRotated, score = solution.fit_matrix(boxes)
+    for k, box in enumerate(boxes):
+        for c, corner in enumerate(corners):
+            assert fits[k, c] == box.fitInCorner(corner)
+            assert fitsRotated[k, c] == (box.possible_rotation(corner) and box.get_h() <= corner.get_h())
+
+
+def state(solution):
+    # Totals, boxes, corners and height map of a solution
+    xs, ys, cells = solution.get_heightMatrix()
+    center, weight = solution.get_gravityCenter()
+    return (solution.get_totalWeight(), solution.get_totalHeight(), solution.get_totalDeep(), solution.get_totalWidth(),
+            np.asarray(center).tolist(), weight, placed(solution.get_boxList()), solution.corner_array().tolist(),
+            np.asarray(xs).tolist(), np.asarray(ys).tolist(), np.asarray(cells).tolist())
+
+
+def new_solution(instance, placement, undo=False):
+    return ds.Solution(instance.get_n(), instance.get_container(), undo=undo, placement=placement)
+
+
+def add_boxes(solution, boxes):
+    for box in boxes:
+        box = copy.copy(box)
+        if compute_position(box, solution)[0]:
+            solution.add_box(box)
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_undo_restores_the_solution(placement):
+    instance = create_random_instance(40, 6)
+    boxes = instance.get_boxList()
+    solution = new_solution(instance, placement, undo=True)
+    states, added = [], []
+    for i, box in enumerate(boxes):
+        box = copy.copy(box)
+        if compute_position(box, solution)[0]:
+            states.append(state(solution))
+            solution.add_box(box)
+            added.append((i, box))
+    assert len(added) > 10
+    expected = placed(solution.get_boxList())
+    while len(added) > 5:
+        assert solution.undo() is added.pop()[1]
+        assert state(solution) == states.pop()
+    # The boxes placed again from there go where they went the first time
+    add_boxes(solution, boxes[added[-1][0] + 1:])
+    assert placed(solution.get_boxList()) == expected
+
+
+@pytest.mark.parametrize("placement", ["corners", "extreme_points"])
+def test_clones_and_snapshots_are_independent(placement):
+    instance = create_random_instance(40, 7)
+    boxes = instance.get_boxList()
+    parent = new_solution(instance, placement)
+    add_boxes(parent, boxes[:15])
+    before = state(parent)
+    clone = parent.clone()
+    add_boxes(clone, boxes[15:])
+    assert state(parent) == before
+    cloned = state(clone)
+    add_boxes(parent, boxes[15:])
+    assert state(clone) == cloned and state(parent) == cloned
+
+    # A snapshot is unchanged by the boxes added after it, and can be restored again
+    snapshot = clone.snapshot()
+    for private in (False, True):
+        add_boxes(clone, create_random_instance(10, 8).get_boxList())
+        assert len(clone.get_boxList()) > len(cloned[6])
+        clone.restore(snapshot, private)
+        assert state(clone) == cloned
+
+
+def test_a_refused_box_is_left_as_it_was():
+    # The wide box only fits on the floor beside the first one, which moves
+    # the centre of gravity out of the envelope
+    instance = ds.Instance(2, [10, 40], [10, 10], [10, 10], [1, 1], [1, 2], 100, 120, 100, 3000,
+                           cogEnvelope=(0.0, 10.0, 0.0, 10.0))
+    solution = ds.Solution(instance.get_n(), instance.get_container())
+    first, box = (copy.copy(box) for box in instance.get_boxList())
+    assert compute_position(first, solution)[0]
+    solution.add_box(first)
+    state = lambda: (box.get_x(), box.get_y(), box.get_z(), box.get_w(), box.get_d(), box.get_centerPoint())
+    before = state()
+    assert compute_position(box, solution) == (False, False)
+    assert state() == before
+
+
+def box_at(x, y, w, d, wgt):
+    box = ds.Box(x, y, 0, w, 10, d, wgt, 1)
+    box.set_centerPoint([x + (w/2), y + (d/2)])
+    return box
+
+
+def test_can_carry_checks_the_weight_limit_and_the_envelope():
+    solution = ds.Solution(0, ds.Container(100, 120, 100, 100, (40.0, 60.0, 40.0, 60.0)))
+    # The first box may start outside the envelope, the next ones may not move the centre away from it
+    assert solution.can_carry(box_at(0, 0, 20, 20, 10))
+    solution.add_box(box_at(40, 40, 20, 20, 60))
+    assert solution.can_carry(box_at(40, 40, 20, 20, 40))
+    assert not solution.can_carry(box_at(40, 40, 20, 20, 41))
+    assert not solution.can_carry(box_at(0, 0, 10, 10, 30))
+    assert solution.can_carry(box_at(45, 0, 10, 80, 30))
+
+
+def test_axle_loads_and_load_distribution_add_up_to_the_load():
+    solution = ds.Solution(0, ds.Container(100, 120, 100, 3000), step=10)
+    for box in (box_at(0, 0, 20, 50, 100), box_at(50, 50, 50, 50, 300), box_at(20, 70, 10, 30, 40)):
+        solution.add_box(box)
+    weight = solution.get_totalWeight()
+    depth = solution.get_gravityCenter()[0][1]
+    front, rear = solution.axle_loads(0, 100)
+    assert front + rear == pytest.approx(weight)
+    assert rear == pytest.approx(weight * depth / 100)
+    # Supports under the centre of gravity carry it all on one side
+    assert solution.axle_loads(depth, 100) == pytest.approx((weight, 0))
+    xs, ys, loads = solution.load_distribution()
+    assert (len(xs), len(ys), loads.shape) == (11, 11, (10, 10))
+    assert loads.sum() == pytest.approx(weight)
+    assert loads[:5, :2].sum() == pytest.approx(100) and loads[5:, 5:].sum() == pytest.approx(300)
+    assert loads[:5, 5:].sum() == 0
+    assert solution.load_distribution(50)[2] == pytest.approx(np.array([[100, 0], [40, 300]]))
+
+
+def test_rebuild_solution_checks_the_steps():
+    instance = create_random_instance(10, 0)
+    solution = rebuild_solution(instance, [[i, True] for i in range(10)])
+    assert len(solution.get_boxList()) == 10
+    # A box the container cannot hold
+    big = ds.Instance(1, [200], [10], [10], [10], [1], 100, 120, 100, 3000)
+    with pytest.raises(ValueError):
+        rebuild_solution(big, [[0, True]])
+
+
+def test_fleet_loads_every_box_once_within_the_weight_limits():
+    instance = create_random_instance(80, 4)
+    containers = [instance.get_container(), ds.Container(60, 120, 60, 1500)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        trucks, unplaced = ant_colony_fleet(instance, 2, 3, 0.8, 1.2, containers, seed=3)
+        again = ant_colony_fleet(instance, 2, 3, 0.8, 1.2, containers, workers=2, seed=3)
+    assert len(trucks) > 1 and not unplaced
+    kind = lambda box : (box.get_id(), box.get_h(), min(box.get_w(), box.get_d()), max(box.get_w(), box.get_d()),
+                         box.get_wgt())
+    assert sorted(kind(box) for _, boxList, _ in trucks for box in boxList) == sorted(map(kind, instance.get_boxList()))
+    for container, boxList, _ in trucks:
+        assert sum(box.get_wgt() for box in boxList) <= container.get_Wgt()
+    # Packing the trucks on several processes gives the same fleet
+    shape = lambda trucks : [((c.get_W(), c.get_H(), c.get_D()), placed(boxList)) for c, boxList, _ in trucks]
+    assert shape(again[0]) == shape(trucks)
+
+
+def test_pheromone_sampler_draws_in_proportion_to_the_row():
+    rng = np.random.RandomState(0)
+    n, draws = 8, 10000
+    phi = np.full((n, n), 1/n)
+    # A few iterations of deposits on the best steps, then an evaporation without normalisation
+    for _ in range(3):
+        managePhi(n, phi, [[i] for i in rng.permutation(n)], 0.8, 1.2)
+        phi = normalize(phi)
+    managePhi(n, phi, [[i] for i in rng.permutation(n)], 0.5, 1.5)
+    phi *= 0.8
+    sampler = PheromoneSampler(phi)
+
+    def check(row, removed):
+        expected = phi[row].copy()
+        expected[removed] = 0
+        expected /= expected.sum()
+        counts = np.bincount([sampler.sample(row, r) for r in rng.random_sample(draws)], minlength=n)
+        assert sampler.total(row) == pytest.approx(phi[row].sum() - phi[row, removed].sum())
+        assert counts[removed].sum() == 0
+        assert np.all(np.abs(counts / draws - expected) <= 5 * np.sqrt(expected * (1 - expected) / draws) + 1e-9)
+
+    for row in (0, 3, 7):
+        check(row, [])
+    # The boxes chosen at step 3 are gone from that row on
+    sampler.remove(2, 3)
+    sampler.remove(5, 3)
+    check(0, [])
+    for row in (3, 7):
+        check(row, [2, 5])
+
+
+@pytest.mark.parametrize("rule, iterations", [("maxIter", 4), ("timeBudget", 1), ("deadline", 1), ("patience", 2),
+                                              ("minEntropy", 1)])
+def test_each_stopping_rule_ends_the_run(rule, iterations):
+    # Every ant takes the 8 boxes, so the second iteration does not improve
+    options = {"maxIter": {}, "timeBudget": {"timeBudget": 0.0}, "deadline": {"deadline": time.time()},
+               "patience": {"patience": 1}, "minEntropy": {"minEntropy": 1.0}}[rule]
+    with contextlib.redirect_stdout(io.StringIO()):
+        run = ant_colony(create_random_instance(8, 0), 4, 2, 0.8, 1.2, seed=1, report=True, **options)[-1]
+    assert run["stop"] == rule and run["iterations"] == iterations
+    # Out of time, only the first ant runs
+    assert run["ants"] == (1 if rule in ("timeBudget", "deadline") else 2 * iterations)
+
+
+def test_prefix_cache_resumes_a_repeated_prefix():
+    instance = create_random_instance(12, 0)
+    phi = np.full((12, 12), 1/12)
+    solve = lambda cache : generate_solution(instance, phi, 1, 3, random.Random(5), cache=cache)
+    expected, expectedSteps = solve(None)
+    cache = PrefixCache(4, stride=4)
+    for _ in range(2):
+        solution, stepList = solve(cache)
+        assert stepList == expectedSteps and placed(solution.get_boxList()) == placed(expected.get_boxList())
+    # The second ant took the same boxes: it resumed after all of them
+    info = cache.info()
+    assert (info["lookups"], info["hits"], info["stepsReused"], info["snapshots"]) == (2, 1, 12, 3)
+    # Another order with the same first five boxes resumes after the first four
+    order = [step[0] for step in expectedSteps]
+    steps, snapshot = cache.lookup(order[:5] + order[:4:-1])
+    assert steps == expectedSteps[:4] and snapshot is not None
+    assert cache.info()["hits"] == 2
+    assert cache.lookup(order[1:] + order[:1]) == ([], None)
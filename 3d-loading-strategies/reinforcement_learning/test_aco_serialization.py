@@ -0,0 +1,51 @@
+import random
+import numpy as np
+import pytest
+import data_structures as ds
+from common import serialization
+from ACO import rebuild_solution, replay
+from main import create_random_instance
+
+
+def items():
+    result = []
+    for seed in range(2):
+        instance = create_random_instance(40, seed)
+        result.append(instance)
+        for placement in ds.PLACEMENTS:
+            order = list(range(instance.get_n()))
+            random.Random(seed).shuffle(order)
+            solution = ds.Solution(instance.get_n(), instance.get_container(), step=instance.get_resolution(),
+                                   minSupport=instance.get_minSupport(), placement=placement)
+            replay(instance, order, solution)
+            result.append(solution)
+    instance = ds.Instance(5, [10] * 5, [10] * 5, [10] * 5, [1] * 5, [1, 2, 3, 4, 5], 50, 50, 50, 100, 10,
+                           (10.0, 40.5, 5.0, 45.0), 0.5)
+    return result + [instance, rebuild_solution(instance, [(i, True) for i in range(5)])]
+
+
+def state(item):
+    container = item.get_container()
+    common = (container.get_W(), container.get_H(), container.get_D(), container.get_Wgt(),
+              container.get_cogEnvelope(), item.get_minSupport())
+    if isinstance(item, ds.Instance):
+        return common + (item.get_n(), item.get_resolution(),
+                         [(b.get_w(), b.get_h(), b.get_d(), b.get_wgt(), b.get_id()) for b in item.get_boxList()])
+    return common + (item.get_nTotalBox(), item.get_step(), item.get_placement(), item.get_totalWeight(),
+                     item.get_totalWidth(), item.get_totalDeep(), item.get_totalHeight(), str(item.get_gravityCenter()),
+                     [(b.get_x(), b.get_y(), b.get_z(), b.get_w(), b.get_d(), b.get_h(), b.get_id(), b.get_wgt())
+                      for b in item.get_boxList()],
+                     item.corner_array().tolist(), item.evaluate())
+
+
+@pytest.mark.parametrize("how", ["load", "loads"])
+def test_round_trip(tmp_path, how):
+    original = items()
+    if how == "load":
+        serialization.save(tmp_path / "plans.npy", original)
+        archive = serialization.load(tmp_path / "plans.npy", ds)
+        assert isinstance(archive.boxes, np.memmap)
+    else:
+        archive = serialization.loads(serialization.dumps(original), ds)
+    assert len(archive) == len(original)
+    assert [state(item) for item in archive] == [state(item) for item in original]
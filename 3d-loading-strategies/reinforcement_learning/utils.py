@@ -1,64 +1,116 @@
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-import matplotlib.pyplot as plt
+import numpy as np
+
+# Corners of the unit cube, and the 4 corners of each of its faces
+CUBE_CORNERS = np.array([
+    [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+    [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+])
+CUBE_FACES = np.array([
+    [0, 1, 2, 3],
+    [4, 5, 6, 7],
+    [0, 1, 5, 4],
+    [2, 3, 7, 6],
+    [1, 2, 6, 5],
+    [0, 3, 7, 4],
+])
+
+def box_array(boxList):
+    """(n, 6) array of the x, y, z, w, d, h of the boxes."""
+    return np.array([(box.get_x(), box.get_y(), box.get_z(), box.get_w(), box.get_d(), box.get_h()) for box in boxList],
+                    dtype=float).reshape(-1, 6)
+
+def cube_vertices(boxes):
+    """(n, 8, 3) corners of the boxes given as (n, 6) x, y, z, w, d, h rows."""
+    return boxes[:, None, :3] + CUBE_CORNERS[None] * boxes[:, None, 3:]
+
+def cube_faces(boxes):
+    """(6 n, 4, 3) faces of the boxes given as (n, 6) x, y, z, w, d, h rows."""
+    return cube_vertices(boxes)[:, CUBE_FACES].reshape(-1, 4, 3)
+
+def create_cubes(boxes, ax, op, face_colors):
+    """Add the boxes to the axes as a single collection (box i with face_colors[i]) and return it."""
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+    collection = Poly3DCollection(cube_faces(boxes), facecolors=np.repeat(face_colors, 6, axis=0),
+                                  linewidths=1, edgecolors='black', alpha=op)
+    ax.add_collection3d(collection)
+    return collection
 
 def create_cube(w, d, h, x, y, z, ax, op, face_color):
     """Create a 3D cube on a given axes."""
-    # Define corners of the cube
-    corners = [
-        [x, y, z],
-        [x + w, y, z],
-        [x + w, y + d, z],
-        [x, y + d, z],
-        [x, y, z + h],
-        [x + w, y, z + h],
-        [x + w, y + d, z + h],
-        [x, y + d, z + h]
-    ]
-
-    # Define faces of the cube 
-    faces = [
-        [corners[0], corners[1], corners[2], corners[3]],
-        [corners[4], corners[5], corners[6], corners[7]],
-        [corners[0], corners[1], corners[5], corners[4]],
-        [corners[2], corners[3], corners[7], corners[6]],
-        [corners[1], corners[2], corners[6], corners[5]],
-        [corners[0], corners[3], corners[7], corners[4]]
-    ]
-
-    # Add the cube to the axes
-    ax.add_collection3d(Poly3DCollection(faces, facecolors=[face_color]*6, linewidths=1, edgecolors='black', alpha=op))
-
+    create_cubes(np.array([[x, y, z, w, d, h]], dtype=float), ax, op, [face_color])
     return ax
 
-def visualize_3D_boxList(container, boxList, colors_dict):
-    """Visualize a list of 3D boxes in a container."""
-    W, D, H = container.get_W(), container.get_D(), container.get_H()
-    
-    # Create figure and axes
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection='3d')
-    
-    # Set axes limits and labels
+def setup_axes(ax, W, D, H):
+    """Set the same scale on each axis and draw the container."""
     l = max(W, D, H)
     ax.auto_scale_xyz([0, l], [0, l], [0, l])
     ax.set_xlabel('X')
     ax.set_ylabel('Y')
     ax.set_zlabel('Z')
+    create_cube(W, D, H, 0, 0, 0, ax, 0, (0, 0, 0))
+
+def export_boxes(path, W, D, H, boxes, colors, dpi=150):
+    """
+    Write the boxes ((n, 6) x, y, z, w, d, h rows, box i with colors[i]) without any display:
+    a Wavefront mesh with vertex colors for .obj, else an image in the format of the extension.
+    """
+    if path.lower().endswith(".obj"):
+        vertices = cube_vertices(boxes)
+        rgb = np.repeat(np.asarray(colors, dtype=float).reshape(-1, 3), 8, axis=0)
+        faces = (CUBE_FACES[None] + 8 * np.arange(len(boxes))[:, None, None]).reshape(-1, 4) + 1
+        with open(path, "w") as f:
+            f.write(f"# {len(boxes)} boxes in a {W} x {D} x {H} container\n")
+            np.savetxt(f, np.hstack((vertices.reshape(-1, 3), rgb)), fmt="v %g %g %g %.4f %.4f %.4f")
+            np.savetxt(f, faces, fmt="f %d %d %d %d")
+        return
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    setup_axes(ax, W, D, H)
+    if len(boxes):
+        create_cubes(boxes, ax, 0.9, colors)
+    fig.savefig(path, dpi=dpi)
+
+def export_boxList(path, container, boxList, colors_dict, dpi=150):
+    """Export a list of boxes in a container to an image or a mesh, see export_boxes."""
+    export_boxes(path, container.get_W(), container.get_D(), container.get_H(),
+                 box_array(boxList), [colors_dict[box.get_id()] for box in boxList], dpi)
+
+def visualize_3D_boxList(container, boxList, colors_dict, step=False, pause=0.0):
+    """
+    Visualize a list of 3D boxes in a container. All the boxes are drawn at
+    once, or with `step` one after the other (each one appended to the figure,
+    after `pause` seconds or a key press when pause is 0).
+    """
+    import matplotlib.pyplot as plt
+
+    W, D, H = container.get_W(), container.get_D(), container.get_H()
+
+    # Create figure and axes
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+    setup_axes(ax, W, D, H)
+
+    boxes = box_array(boxList)
+    colors = [colors_dict[box.get_id()] for box in boxList]
+    if not step:
+        if len(boxes):
+            create_cubes(boxes, ax, 0.9, colors)
+        plt.show()
+        return
 
-    # Create container
-    ax = create_cube(W, D, H, 0, 0, 0, ax, 0, (0, 0, 0))
-
-    # Create each box
-    for i, box in enumerate(boxList):
-        ax = create_cube(box.get_w(), box.get_d(), box.get_h(), box.get_x(), box.get_y(), box.get_z(), ax, 0.9, colors_dict[box.get_id()])
-        plt.show(block=False)
-        plt.pause(0.5)
-        # if i < len(boxList) - 1:
-        #     input("Press Enter to add the next box...")
-        # else:
-        plt.waitforbuttonpress()
-        if i == len(boxList) - 1:
-            plt.close()
-
-    # Show plot
-    plt.show()
\ No newline at end of file
+    # Append each box to the figure
+    plt.show(block=False)
+    for i in range(len(boxes)):
+        create_cubes(boxes[i:i + 1], ax, 0.9, colors[i:i + 1])
+        plt.draw()
+        if pause > 0:
+            plt.pause(pause)
+        else:
+            plt.waitforbuttonpress()
+    plt.show()
@@ -0,0 +1,14 @@
+"""
+Builds the placement kernel shared by both solvers (common/placement_kernel.pyx) in place:
+    python setup.py build_ext --inplace
+The ant colony's own module is then built in reinforcement_learning/ (see its setup.py).
+"""
+
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+setup(
+    ext_modules=cythonize([
+        Extension("common.placement_kernel", ["common/placement_kernel.pyx"]),
+    ]),
+)